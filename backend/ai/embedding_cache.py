@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import glob
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace differences should not produce a different cache entry; case can (cased models)."""
+    return " ".join((text or "").split())
+
+
+def embedding_key(model_name: str, text: str, image_url: Optional[str] = None) -> str:
+    """Content address of one embedding: sha256 over model, normalized text and image URL."""
+    h = hashlib.sha256()
+    for part in (model_name, normalize_text(text), (image_url or "").strip()):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    In-process LRU of embeddings, backed by one ``.npy`` file per key under ``directory``
+    (shared across workers and restarts, at most ``max_disk_entries`` files).
+    """
+
+    def __init__(
+        self, max_entries: int = 10_000, directory: Optional[str] = None, max_disk_entries: int = 100_000
+    ) -> None:
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self._disk_entries: Optional[int] = None  # counted on the first write
+        self._disk_lock = threading.Lock()  # guards the count; never held while walking the directory
+        self._disk_walking = False
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return vec
+        if self.directory:
+            try:
+                vec = np.load(self._path(key))
+            except (OSError, ValueError):
+                vec = None
+            if vec is not None:
+                self._touch(key)
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, vec)
+                return vec
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, vec: np.ndarray) -> None:
+        vec = np.asarray(vec, dtype="float32")
+        vec.setflags(write=False)  # shared between callers
+        with self._lock:
+            self._remember(key, vec)
+        if self.directory:
+            path = self._path(key)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as fh:
+                    np.save(fh, vec)
+                os.replace(tmp, path)
+                self._count_disk_entry()
+
+    def _touch(self, key: str) -> None:
+        # The file's mtime is its last use, which the disk eviction goes by
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _disk_files(self) -> List[str]:
+        return glob.glob(os.path.join(self.directory, "??", "*.npy"))
+
+    def _count_disk_entry(self) -> None:
+        with self._disk_lock:
+            if self._disk_walking:
+                return  # another thread is recounting
+            if self._disk_entries is not None:
+                self._disk_entries += 1
+                if self._disk_entries <= self.max_disk_entries:
+                    return
+            self._disk_walking = True
+        count = None
+        try:
+            # Other workers write to the same directory, so recount while pruning; the walk holds
+            # no lock, so gets and other puts carry on meanwhile
+            count = self._prune_disk(self.max_disk_entries, self.max_disk_entries - max(1, self.max_disk_entries // 10))
+        finally:
+            with self._disk_lock:
+                self._disk_entries = count
+                self._disk_walking = False
+
+    def _prune_disk(self, limit: int, keep: int) -> int:
+        """Count the disk tier and, above ``limit`` files, drop the least recently used down to ``keep``."""
+        files = []
+        for path in self._disk_files():
+            try:
+                files.append((os.stat(path).st_mtime, path))
+            except OSError:
+                pass  # removed by another worker
+        if len(files) <= limit:
+            return len(files)
+        files.sort()
+        stale = files[: max(0, len(files) - keep)]
+        for _, path in stale:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self.disk_evictions += len(stale)
+        return len(files) - len(stale)
+
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Forget the in-memory tier (the disk tier is left alone)."""
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._lru),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+            }
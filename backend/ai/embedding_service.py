@@ -1,19 +1,37 @@
 from __future__ import annotations
 
-import io
 import os
 import threading
-from typing import Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
-import requests
-from PIL import Image
-from sentence_transformers import SentenceTransformer
+
+from backend.ai.batching import MicroBatcher
+from backend.ai.embedding_cache import EmbeddingCache, embedding_key
+from backend.ai.image_fetcher import get_image_fetcher
+from backend.ai.model_backends import TORCH, load_model
+
+if TYPE_CHECKING:
+    # torch and sentence-transformers take seconds to import; they load with the model
+    from sentence_transformers import SentenceTransformer
 
 
 _model_lock = threading.Lock()
 _model: Optional[SentenceTransformer] = None
 _model_name: Optional[str] = None
+_batchers: Dict[str, MicroBatcher] = {}
+_cache: Optional[EmbeddingCache] = None
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+
+def model_name() -> str:
+    return _model_name or os.getenv("EMBEDDING_MODEL", DEFAULT_MODEL)
+
+
+def embedding_backend() -> str:
+    """``EMBEDDING_BACKEND``: torch (default), onnx or onnx-int8; see ``model_backends.load_model``."""
+    return os.getenv("EMBEDDING_BACKEND", TORCH)
 
 
 def _get_model() -> SentenceTransformer:
@@ -22,18 +40,60 @@ def _get_model() -> SentenceTransformer:
         return _model
     with _model_lock:
         if _model is None:
-            _model_name = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
-            _model = SentenceTransformer(_model_name)
+            _model_name = os.getenv("EMBEDDING_MODEL", DEFAULT_MODEL)
+            _model = load_model(_model_name, embedding_backend())
     return _model
 
 
-def _fetch_image(image_url: str) -> Optional[Image.Image]:
-    try:
-        resp = requests.get(image_url, timeout=10)
-        resp.raise_for_status()
-        return Image.open(io.BytesIO(resp.content)).convert("RGB")
-    except Exception:
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Process-wide embedding cache, or None when ``EMBEDDING_CACHE_SIZE=0``; ``EMBEDDING_CACHE_DIR``
+    (empty disables it) and ``EMBEDDING_CACHE_DISK_ENTRIES`` configure the disk tier.
+    """
+    global _cache
+    if _cache is None:
+        size = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+        if size <= 0:
+            return None
+        with _model_lock:
+            if _cache is None:
+                directory = os.getenv("EMBEDDING_CACHE_DIR", os.path.join("backend", "embedding_cache"))
+                _cache = EmbeddingCache(
+                    max_entries=size,
+                    directory=directory or None,
+                    max_disk_entries=int(os.getenv("EMBEDDING_CACHE_DISK_ENTRIES", "100000")),
+                )
+    return _cache
+
+
+def _encode_now(items: List) -> np.ndarray:
+    return _get_model().encode(items, convert_to_numpy=True, normalize_embeddings=True)
+
+
+def _get_batcher(kind: str) -> Optional[MicroBatcher]:
+    """Shared micro-batcher per input kind (text, image); ``EMBEDDING_MICROBATCH=0`` turns it off."""
+    if os.getenv("EMBEDDING_MICROBATCH", "1") == "0":
         return None
+    batcher = _batchers.get(kind)
+    if batcher is None:
+        with _model_lock:
+            batcher = _batchers.get(kind)
+            if batcher is None:
+                batcher = MicroBatcher(
+                    lambda items: list(_encode_now(items)),
+                    max_batch_size=int(os.getenv("EMBEDDING_MAX_BATCH", "64")),
+                    max_wait_ms=float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5")),
+                    name=f"embedding-{kind}-batcher",
+                )
+                _batchers[kind] = batcher
+    return batcher
+
+
+def _encode(items: List, kind: str) -> np.ndarray:
+    batcher = _get_batcher(kind)
+    if batcher is None or not items:
+        return _encode_now(items)
+    return np.vstack(batcher.map(items))
 
 
 def _normalize(vec: np.ndarray) -> np.ndarray:
@@ -52,27 +112,70 @@ def get_waste_embedding(text_description: str, image_url: Optional[str] = None)
     - If image_url is provided and downloadable, encode image via CLIP image encoder
     - Normalize both vectors and take the average, then re-normalize
     """
-    model = _get_model()
-
-    text_vec = model.encode([text_description], convert_to_numpy=True, normalize_embeddings=True)[0]
-
-    image_vec = None
-    if image_url:
-        pil_img = _fetch_image(image_url)
-        if pil_img is not None:
-            try:
-                image_vec = model.encode([pil_img], convert_to_numpy=True, normalize_embeddings=True)[0]
-            except Exception:
-                image_vec = None
-
-    if image_vec is None:
-        return _normalize(text_vec)
-
-    combined = _normalize(text_vec) + _normalize(image_vec)
-    return _normalize(combined)
+    return get_waste_embeddings([text_description], [image_url])[0]
+
+
+def get_waste_embeddings(
+    text_descriptions: Sequence[str], image_urls: Optional[Sequence[Optional[str]]] = None
+) -> np.ndarray:
+    """Batched ``get_waste_embedding`` returning an ``(n, dim)`` matrix; cached embeddings skip the model."""
+    texts = list(text_descriptions)
+    urls = list(image_urls) if image_urls is not None else [None] * len(texts)
+    if len(urls) != len(texts):
+        raise ValueError("text_descriptions and image_urls must have the same length")
+
+    cache = get_embedding_cache()
+    if cache is None or not texts:
+        return _compute_embeddings(texts, urls)[0]
+    # Quantized backends give slightly different vectors, so they get their own entries
+    backend = embedding_backend()
+    name = model_name() if backend == TORCH else f"{model_name()}@{backend}"
+    keys = [embedding_key(name, text, url) for text, url in zip(texts, urls)]
+    found = [cache.get(key) for key in keys]
+    missing = [i for i, vec in enumerate(found) if vec is None]
+    if missing:
+        computed, complete = _compute_embeddings([texts[i] for i in missing], [urls[i] for i in missing])
+        for i, vec, ok in zip(missing, computed, complete):
+            # A text-only fallback for a failed image download is served but not cached
+            if ok:
+                cache.put(keys[i], vec)
+            found[i] = vec
+    return np.vstack(found)
+
+
+def _compute_embeddings(texts: List[str], urls: List[Optional[str]]) -> Tuple[np.ndarray, List[bool]]:
+    """Embeddings for ``texts``/``urls`` plus, per row, whether its image (if any) was used."""
+    # Start the downloads first so they run while the text is encoded
+    pending = get_image_fetcher().submit(urls)
+    text_vecs = _encode(texts, "text")
+
+    images = [(i, future.result()) for i, future in enumerate(pending) if future is not None]
+    images = [(i, img) for i, img in images if img is not None]
+    image_vecs = {}
+    if images:
+        try:
+            encoded = _encode([img for _, img in images], "image")
+            image_vecs = {i: vec for (i, _), vec in zip(images, encoded)}
+        except Exception:
+            image_vecs = {}
+
+    out = np.empty_like(text_vecs)
+    for i, text_vec in enumerate(text_vecs):
+        image_vec = image_vecs.get(i)
+        if image_vec is None:
+            out[i] = _normalize(text_vec)
+        else:
+            out[i] = _normalize(_normalize(text_vec) + _normalize(image_vec))
+    return out, [not url or i in image_vecs for i, url in enumerate(urls)]
 
 
 def get_embedding_dimension() -> int:
     return int(_get_model().get_sentence_embedding_dimension())
 
 
+def warmup() -> int:
+    """Load the model and run one forward pass (bypassing the cache); returns the embedding dimension."""
+    _encode_now(["warmup"])
+    return get_embedding_dimension()
+
+
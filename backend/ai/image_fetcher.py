@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import io
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+
+logger = logging.getLogger(__name__)
+
+
+class ImageFetcher:
+    """
+    Downloads listing images concurrently over pooled connections, at most ``max_bytes`` and ``timeout``
+    seconds each, downscaled while decoding to about ``target_size`` and LRU-cached by URL.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 10 * 1024 * 1024,
+        target_size: int = 224,
+        timeout: float = 5.0,
+        workers: int = 8,
+        cache_size: int = 256,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.target_size = target_size
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-fetch")
+        self._cache: "OrderedDict[str, Image.Image]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # -- download and decode ---------------------------------------------------------
+
+    @staticmethod
+    def _chunks(resp: requests.Response, size: int = 64 * 1024) -> Iterator[bytes]:
+        """The body as it arrives; ``iter_content`` waits for ``size`` bytes of a Content-Length body."""
+        read1 = getattr(resp.raw, "read1", None)  # urllib3 >= 2.3
+        if read1 is None:
+            yield from resp.iter_content(chunk_size=size)
+            return
+        while True:
+            chunk = read1(size, decode_content=True)
+            if not chunk:
+                return
+            yield chunk
+
+    def _download(self, url: str) -> Optional[bytes]:
+        # ``timeout`` alone bounds each socket read, so a server dripping bytes could hold a worker forever
+        deadline = time.monotonic() + self.timeout
+        with self.session.get(url, timeout=self.timeout, stream=True) as resp:
+            resp.raise_for_status()
+            declared = resp.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                logger.info("Skipping image %s: %s bytes is over the %d byte cap", url, declared, self.max_bytes)
+                return None
+            chunks: List[bytes] = []
+            size = 0
+            for chunk in self._chunks(resp):
+                if time.monotonic() > deadline:
+                    logger.info("Skipping image %s: download took over %.1fs", url, self.timeout)
+                    return None
+                size += len(chunk)
+                if size > self.max_bytes:
+                    logger.info("Skipping image %s: body is over the %d byte cap", url, self.max_bytes)
+                    return None
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    def _decode(self, data: bytes) -> Image.Image:
+        img = Image.open(io.BytesIO(data))
+        # JPEG only: decode straight at a reduced scale that is still >= target_size
+        img.draft("RGB", (self.target_size, self.target_size))
+        img = img.convert("RGB")
+        shorter = min(img.size)
+        if shorter > self.target_size:
+            scale = self.target_size / shorter
+            size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            img = img.resize(size, Image.BICUBIC)
+        return img
+
+    def fetch(self, url: str) -> Optional[Image.Image]:
+        """The downscaled image at ``url``, or None if it cannot be fetched or decoded."""
+        with self._lock:
+            img = self._cache.get(url)
+            if img is not None:
+                self._cache.move_to_end(url)
+                return img
+        try:
+            data = self._download(url)
+            if data is None:
+                return None
+            img = self._decode(data)
+        except Exception:
+            return None
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[url] = img
+                self._cache.move_to_end(url)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return img
+
+    # -- concurrency ------------------------------------------------------------------
+
+    def submit(self, urls: Sequence[Optional[str]]) -> List[Optional["Future[Optional[Image.Image]]"]]:
+        """Start fetching every URL in the background; None entries stay None. Duplicates share a future."""
+        futures: Dict[str, Future] = {}
+        out: List[Optional[Future]] = []
+        for url in urls:
+            if not url:
+                out.append(None)
+                continue
+            if url not in futures:
+                futures[url] = self._executor.submit(self.fetch, url)
+            out.append(futures[url])
+        return out
+
+    def fetch_many(self, urls: Sequence[Optional[str]]) -> List[Optional[Image.Image]]:
+        return [f.result() if f is not None else None for f in self.submit(urls)]
+
+
+_fetcher: Optional[ImageFetcher] = None
+_fetcher_lock = threading.Lock()
+
+
+def get_image_fetcher() -> ImageFetcher:
+    """Process-wide fetcher configured from ``IMAGE_*`` environment variables."""
+    global _fetcher
+    if _fetcher is None:
+        with _fetcher_lock:
+            if _fetcher is None:
+                _fetcher = ImageFetcher(
+                    max_bytes=int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024))),
+                    target_size=int(os.getenv("IMAGE_TARGET_SIZE", "224")),
+                    timeout=float(os.getenv("IMAGE_FETCH_TIMEOUT", "5")),
+                    workers=int(os.getenv("IMAGE_FETCH_WORKERS", "8")),
+                    cache_size=int(os.getenv("IMAGE_CACHE_SIZE", "256")),
+                )
+    return _fetcher
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+
+logger = logging.getLogger(__name__)
+
+# ``EMBEDDING_BACKEND`` values
+TORCH = "torch"
+ONNX = "onnx"
+ONNX_INT8 = "onnx-int8"
+BACKENDS = (TORCH, ONNX, ONNX_INT8)
+
+# Lowest cosine similarity to the torch embedding each backend may have on the same text
+PARITY_MIN_COSINE = {ONNX: 0.999, ONNX_INT8: 0.98}
+
+
+def onnx_model_dir(model_name: str) -> str:
+    """Where the exported (and quantized) ONNX copy of ``model_name`` is kept between runs."""
+    root = os.getenv("EMBEDDING_ONNX_DIR", os.path.join("backend", "onnx_models"))
+    return os.path.join(root, re.sub(r"[^A-Za-z0-9_.-]+", "--", model_name))
+
+
+def load_model(model_name: str, backend: str = TORCH) -> SentenceTransformer:
+    """
+    Load ``model_name`` for CPU inference: torch, onnx or onnx-int8 (quantized for ``EMBEDDING_ONNX_QUANT``).
+    ONNX exports are saved under ``onnx_model_dir``; requires ``sentence-transformers[onnx]``.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    from sentence_transformers import SentenceTransformer
+
+    if backend == TORCH:
+        return SentenceTransformer(model_name)
+
+    local = onnx_model_dir(model_name)
+    if not os.path.isdir(local):
+        # First run: export from the hub checkpoint and keep the result
+        model = SentenceTransformer(model_name, backend="onnx")
+        model.save_pretrained(local)
+    if backend == ONNX:
+        return SentenceTransformer(local, backend="onnx")
+
+    config = os.getenv("EMBEDDING_ONNX_QUANT", "avx2")
+    file_name = f"onnx/model_qint8_{config}.onnx"
+    if not os.path.exists(os.path.join(local, file_name)):
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        logger.info("Quantizing %s to int8 (%s)", model_name, config)
+        export_dynamic_quantized_onnx_model(
+            SentenceTransformer(local, backend="onnx"), config, local, file_suffix=f"qint8_{config}"
+        )
+    return SentenceTransformer(local, backend="onnx", model_kwargs={"file_name": file_name})
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.ai.batching import MicroBatcher
+
+
+def test_concurrent_calls_share_batches():
+    calls = []
+    batcher = MicroBatcher(lambda items: calls.append(list(items)) or [x * 2 for x in items], max_wait_ms=50.0)
+    start = threading.Barrier(16)
+
+    def call(x):
+        start.wait()
+        return batcher.submit(x).result(timeout=5)
+
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(call, range(16)))
+    batcher.close()
+    assert results == [x * 2 for x in range(16)]
+    assert len(calls) < 16 and sorted(x for batch in calls for x in batch) == list(range(16))
+    assert batcher.mean_batch_size > 1
+
+
+def test_batches_are_capped():
+    sizes = []
+    batcher = MicroBatcher(lambda items: sizes.append(len(items)) or list(items), max_batch_size=4, max_wait_ms=20.0)
+    assert batcher.map(list(range(10))) == list(range(10))
+    batcher.close()
+    assert max(sizes) <= 4 and sum(sizes) == 10
+
+
+def test_a_failed_batch_fails_every_caller_in_it():
+    def fn(items):
+        if "bad" in items:
+            raise ValueError("bad input")
+        return items
+
+    batcher = MicroBatcher(fn, max_wait_ms=50.0)
+    futures = batcher.submit_many(["a", "bad", "c"])
+    for future in futures:
+        with pytest.raises(ValueError, match="bad input"):
+            future.result(timeout=5)
+    # The worker survives and serves later batches
+    assert batcher.map(["d"]) == ["d"]
+    batcher.close()
+
+
+def test_wrong_number_of_results_is_an_error():
+    batcher = MicroBatcher(lambda items: items[:-1])
+    with pytest.raises(RuntimeError, match="expected 2 results"):
+        batcher.map(["a", "b"])
+    batcher.close()
+
+
+def test_closed_batcher_rejects_work():
+    batcher = MicroBatcher(lambda items: items)
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit("a")
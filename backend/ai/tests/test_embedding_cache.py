@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import glob
+import os
+import threading
+
+import numpy as np
+
+from backend.ai.embedding_cache import EmbeddingCache, embedding_key
+
+
+def test_key_ignores_whitespace_but_keeps_case():
+    assert embedding_key("m", "  PET   bottles\n") == embedding_key("m", "PET bottles")
+    # Cased models embed "PET" and "pet" differently, so they must not share an entry
+    assert embedding_key("m", "PET bottles") != embedding_key("m", "pet bottles")
+    assert embedding_key("m", "x") != embedding_key("other", "x")
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    EmbeddingCache(directory=str(tmp_path)).put("ab12", np.ones(4))
+    fresh = EmbeddingCache(directory=str(tmp_path))
+    np.testing.assert_array_equal(fresh.get("ab12"), np.ones(4))
+    assert fresh.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_is_capped_and_keeps_recently_used_entries(tmp_path):
+    cache = EmbeddingCache(max_entries=1, directory=str(tmp_path), max_disk_entries=20)
+    keys = [embedding_key("m", f"text {i}") for i in range(60)]
+    for i, key in enumerate(keys):
+        cache.put(key, np.full(4, i, dtype="float32"))
+        # mtimes are coarse on some filesystems, so age every file explicitly
+        os.utime(cache._path(key), (i, i))
+    files = glob.glob(os.path.join(str(tmp_path), "??", "*.npy"))
+    assert len(files) <= 20
+    assert cache.stats()["disk_evictions"] == 60 - len(files)
+    assert cache.get(keys[-1]) is not None
+    assert EmbeddingCache(directory=str(tmp_path)).get(keys[0]) is None
+
+
+def test_gets_are_served_while_the_disk_tier_is_pruned(tmp_path, monkeypatch):
+    cache = EmbeddingCache(directory=str(tmp_path), max_disk_entries=2)
+    cache.put("aa11", np.ones(4))
+    cache.put("dd44", np.ones(4))
+    walking, release = threading.Event(), threading.Event()
+    real = cache._disk_files
+
+    def slow_walk():
+        walking.set()
+        release.wait(5)
+        return real()
+
+    monkeypatch.setattr(cache, "_disk_files", slow_walk)
+    writer = threading.Thread(target=cache.put, args=("bb22", np.zeros(4)))
+    writer.start()
+    assert walking.wait(5)
+    try:
+        np.testing.assert_array_equal(cache.get("aa11"), np.ones(4))
+        cache.put("cc33", np.full(4, 2.0))  # does not wait for the walk either
+    finally:
+        release.set()
+        writer.join()
+    assert len(glob.glob(os.path.join(str(tmp_path), "??", "*.npy"))) == 1  # pruned to 90% of the cap
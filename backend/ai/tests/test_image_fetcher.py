@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import io
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from backend.ai.image_fetcher import ImageFetcher
+
+
+def _jpeg(size) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, (200, 40, 40)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+PHOTO = _jpeg((1000, 600))
+HITS = {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        HITS[self.path] = HITS.get(self.path, 0) + 1
+        if self.path == "/slow.jpg":
+            time.sleep(1.0)
+        if self.path == "/drip.jpg":
+            # Every read well within the timeout, the whole body far beyond it
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(PHOTO)))
+            self.end_headers()
+            for i in range(0, 20 * 64, 64):
+                self.wfile.write(PHOTO[i : i + 64])
+                self.wfile.flush()
+                time.sleep(0.05)
+            return
+        if self.path == "/chunked.jpg":
+            # No Content-Length: only the streamed body can reveal the size
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for _ in range(4):
+                chunk = b"\xff" * 50_000
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        body = b"not an image" if self.path == "/broken.jpg" else PHOTO
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # clients hanging up on capped or timed-out responses
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = _Server(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def test_fetch_downscales_and_caches(server):
+    fetcher = ImageFetcher(target_size=100)
+    img = fetcher.fetch(f"{server}/photo.jpg")
+    assert img is not None and min(img.size) == 100
+    before = HITS.get("/photo.jpg", 0)
+    assert fetcher.fetch(f"{server}/photo.jpg") is img
+    assert HITS.get("/photo.jpg", 0) == before
+
+
+def test_images_over_the_size_cap_are_skipped(server):
+    fetcher = ImageFetcher(max_bytes=len(PHOTO) - 1)
+    assert fetcher.fetch(f"{server}/photo.jpg?declared") is None
+    assert ImageFetcher(max_bytes=100_000).fetch(f"{server}/chunked.jpg") is None
+
+
+def test_slow_and_broken_images_give_none(server):
+    fetcher = ImageFetcher(timeout=0.2)
+    start = time.monotonic()
+    assert fetcher.fetch(f"{server}/slow.jpg") is None
+    assert time.monotonic() - start < 0.9
+    assert fetcher.fetch(f"{server}/broken.jpg") is None
+    assert fetcher.fetch("http://127.0.0.1:1/refused.jpg") is None
+
+
+def test_slow_drip_is_cut_off_at_the_total_timeout(server):
+    fetcher = ImageFetcher(timeout=0.3)
+    start = time.monotonic()
+    assert fetcher.fetch(f"{server}/drip.jpg") is None
+    assert time.monotonic() - start < 0.6
+
+
+def test_fetch_many_keeps_order_and_shares_duplicates(server):
+    fetcher = ImageFetcher(target_size=50)
+    urls = [f"{server}/many.jpg", None, f"{server}/broken.jpg", f"{server}/many.jpg"]
+    before = HITS.get("/many.jpg", 0)
+    images = fetcher.fetch_many(urls)
+    assert images[0] is not None and images[3] is images[0]
+    assert images[1] is None and images[2] is None
+    assert HITS["/many.jpg"] == before + 1
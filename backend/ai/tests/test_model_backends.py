@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pytest
+
+from backend.ai.embedding_service import DEFAULT_MODEL
+from backend.ai.model_backends import ONNX, ONNX_INT8, PARITY_MIN_COSINE, TORCH, load_model
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+
+TEXTS = [
+    "Shredded PET bottles, clear, baled",
+    "Used cooking oil in 200 l drums",
+    "Aluminium swarf, lightly oiled",
+    "Glass cullet, green and brown",
+    "E-waste: old laptops and monitors, some with cracked screens",
+    "Copper wire offcuts with PVC insulation",
+]
+
+
+@pytest.fixture(scope="module")
+def reference():
+    model_name = os.getenv("EMBEDDING_MODEL", DEFAULT_MODEL)
+    try:
+        model = load_model(model_name, TORCH)
+    except Exception as exc:  # offline and not in the local cache
+        pytest.skip(f"model {model_name} unavailable: {exc}")
+    return model_name, model.encode(TEXTS, normalize_embeddings=True)
+
+
+@pytest.mark.parametrize("backend", [ONNX, ONNX_INT8])
+def test_onnx_backends_match_torch(reference, backend, monkeypatch, tmp_path_factory):
+    model_name, expected = reference
+    if "EMBEDDING_ONNX_DIR" not in os.environ:
+        monkeypatch.setenv("EMBEDDING_ONNX_DIR", str(tmp_path_factory.getbasetemp() / "onnx_models"))
+    vecs = load_model(model_name, backend).encode(TEXTS, normalize_embeddings=True)
+    assert np.sum(expected * vecs, axis=1).min() >= PARITY_MIN_COSINE[backend]
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import os
-from typing import Generator
+from typing import TYPE_CHECKING, Generator, Optional
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
 
 load_dotenv()
 
@@ -28,3 +32,43 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
+
+
+def async_database_url(url: str) -> str:
+    """
+    The same database through an asyncio driver: aiosqlite for SQLite, asyncpg for PostgreSQL,
+    replacing any sync driver named in the URL (``postgresql+psycopg2://`` -> ``postgresql+asyncpg://``).
+    """
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+
+_async_engine: Optional[AsyncEngine] = None
+_async_sessions: Optional[async_sessionmaker[AsyncSession]] = None
+
+
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    """
+    Session factory for async handlers, created on first use so only they import the async driver.
+    ``ASYNC_DATABASE_URL`` overrides the URL derived from ``DATABASE_URL``.
+    """
+    global _async_engine, _async_sessions
+    if _async_sessions is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL)
+        _async_sessions = async_sessionmaker(_async_engine, expire_on_commit=False, autoflush=False)
+    return _async_sessions
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_sessions
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = _async_sessions = None
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, TypeVar
+
+
+R = TypeVar("R")
+
+
+class ExecutorBusy(RuntimeError):
+    """Every worker of a ``BoundedExecutor`` is busy and its queue is full."""
+
+
+class BoundedExecutor:
+    """
+    Thread pool awaited from async handlers: at most ``workers`` tasks run and ``max_queue`` wait,
+    beyond that ``run`` raises ``ExecutorBusy``. Cancelling the caller cancels a task not yet started.
+    """
+
+    def __init__(self, name: str, workers: int, max_queue: int) -> None:
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    async def run(self, fn: Callable[..., R], *args, **kwargs) -> R:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorBusy(f"{self.name} executor is saturated")
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        # wrap_future cancels ``future`` when the awaiting task is cancelled
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_executors: Dict[str, BoundedExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(name: str, workers: int, max_queue: int) -> BoundedExecutor:
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = BoundedExecutor(name, workers, max_queue)
+                _executors[name] = executor
+    return executor
+
+
+def model_executor() -> BoundedExecutor:
+    """
+    Embedding work, mostly waiting on downloads and the micro-batcher: ``MODEL_EXECUTOR_WORKERS``
+    (default 16) and ``MODEL_EXECUTOR_QUEUE`` (default 64).
+    """
+    return _get_executor(
+        "model",
+        int(os.getenv("MODEL_EXECUTOR_WORKERS", "16")),
+        int(os.getenv("MODEL_EXECUTOR_QUEUE", "64")),
+    )
+
+
+def search_executor() -> BoundedExecutor:
+    """
+    Vector search and scoring: ``SEARCH_EXECUTOR_WORKERS`` (default one per CPU) and
+    ``SEARCH_EXECUTOR_QUEUE`` (default 128).
+    """
+    return _get_executor(
+        "search",
+        int(os.getenv("SEARCH_EXECUTOR_WORKERS", str(os.cpu_count() or 4))),
+        int(os.getenv("SEARCH_EXECUTOR_QUEUE", "128")),
+    )
+
+
+def executor_stats() -> Dict[str, Dict[str, int]]:
+    return {name: executor.stats() for name, executor in list(_executors.items())}
+
+
+def shutdown_executors() -> None:
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown()
@@ -1,12 +1,33 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from backend.db import dispose_async_engine
+from backend.executors import shutdown_executors
 from backend.routes.match import router as match_router
+from backend.warmup import Warmup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the model and index in the background; /ready flips once both are warm
+    # (only light modules are imported above; torch and sentence-transformers load there)
+    warmup = Warmup()
+    app.state.warmup = warmup
+    warmup.start()
+    try:
+        yield
+    finally:
+        warmup.stop()
+        shutdown_executors()
+        await dispose_async_engine()
 
 
-app = FastAPI(title="Waste Marketplace Matching API")
+app = FastAPI(title="Waste Marketplace Matching API", lifespan=lifespan)
 
 # Allow local Next.js and others
 app.add_middleware(
@@ -25,3 +46,11 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once the model and index are warm, 503 until then."""
+    warmup: Warmup = app.state.warmup
+    body = {"ready": warmup.ready, "timings": warmup.timings}
+    if warmup.error:
+        body["error"] = warmup.error
+    return JSONResponse(body, status_code=200 if warmup.ready else 503)
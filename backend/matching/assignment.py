@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import heapq
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+
+
+@dataclass
+class AssignmentResult:
+    assignments: List[Optional[str]]  # recycler id per listing, None if unassigned
+    scores: List[Optional[float]]
+    bids: int = 0
+    evictions: int = 0
+    prices: Dict[str, float] = field(default_factory=dict)
+    unprocessed: int = 0  # listings still waiting to bid when ``max_bids`` ran out
+
+    @property
+    def bid_limit_reached(self) -> bool:
+        return self.unprocessed > 0
+
+    @property
+    def total_score(self) -> float:
+        return float(sum(s for s in self.scores if s is not None))
+
+
+def auction_assign(
+    quantities: Sequence[float],
+    candidates: Sequence[Sequence[Tuple[str, float]]],
+    capacities: Mapping[str, float],
+    epsilon: float = 1e-3,
+    max_bids: Optional[int] = None,
+) -> AssignmentResult:
+    """
+    Assign each listing to at most one of its ``(recycler_id, score)`` candidates without exceeding any
+    capacity, maximising the total score (auction algorithm); listings left after ``max_bids`` are ``unprocessed``.
+    """
+    n = len(quantities)
+    if len(candidates) != n:
+        raise ValueError("quantities and candidates must have the same length")
+    prices: Dict[str, float] = {}
+    used: Dict[str, float] = {}
+    holders: Dict[str, List[Tuple[float, int]]] = {}  # min-heap of (bid, listing) per recycler
+    assigned: List[Optional[str]] = [None] * n
+    queue: Deque[int] = deque(range(n))
+    limit = max_bids if max_bids is not None else 100 * max(n, 1)
+    bids = evictions = 0
+
+    while queue and bids < limit:
+        i = queue.popleft()
+        best: Optional[str] = None
+        best_net = second_net = 0.0  # the "stay unassigned" option
+        for recycler, score in candidates[i]:
+            if capacities.get(recycler, 0.0) < quantities[i]:
+                continue  # could never fit, however many others leave
+            net = score - prices.get(recycler, 0.0)
+            if best is None or net > best_net:
+                if best is not None:
+                    second_net = max(second_net, best_net)
+                best, best_net = recycler, net
+            elif net > second_net:
+                second_net = net
+        if best is None or best_net < 0:
+            continue  # stays unassigned
+        bids += 1
+        # Outbid by the margin over the next-best option; within n * epsilon of optimal for unit quantities
+        bid = prices.get(best, 0.0) + (best_net - second_net) + epsilon
+        assigned[i] = best
+        heapq.heappush(holders.setdefault(best, []), (bid, i))
+        used[best] = used.get(best, 0.0) + quantities[i]
+
+        evicted = False
+        while used[best] > capacities[best] + 1e-9:
+            _, j = heapq.heappop(holders[best])
+            used[best] -= quantities[j]
+            assigned[j] = None
+            queue.append(j)
+            evictions += 1
+            evicted = True
+        if evicted and holders[best]:
+            prices[best] = max(prices.get(best, 0.0), holders[best][0][0])
+
+    scores: List[Optional[float]] = []
+    for i, recycler in enumerate(assigned):
+        scores.append(next((s for r, s in candidates[i] if r == recycler), None) if recycler is not None else None)
+    return AssignmentResult(
+        assignments=assigned,
+        scores=scores,
+        bids=bids,
+        evictions=evictions,
+        prices=prices,
+        unprocessed=len(queue),
+    )
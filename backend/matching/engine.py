@@ -1,13 +1,22 @@
 from __future__ import annotations
 
+import base64
 from dataclasses import dataclass
+import json
 import os
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 
-from backend.ai.embedding_service import get_waste_embedding
-from backend.vector_store.faiss_store import FAISSVectorStore
+from backend.ai.embedding_service import get_waste_embedding, get_waste_embeddings
+from backend.matching.assignment import auction_assign
+from backend.matching.scoring import jaccard_terms, score_arrays, top_k_order
+from backend.vector_store.geo import haversine_km_array
+
+if TYPE_CHECKING:
+    from backend.matching.recycler_attributes import RecyclerAttributes
+    from backend.vector_store.faiss_store import FAISSVectorStore
+    from backend.vector_store.metadata import MetadataTable
 
 # Tunable weights
 MATERIAL_W = float(os.getenv("MATERIAL_WEIGHT", 0.5))
@@ -16,6 +25,17 @@ CAPACITY_W = float(os.getenv("CAPACITY_WEIGHT", 0.2))
 SUSTAIN_W = float(os.getenv("SUSTAIN_WEIGHT", 0.1))
 
 
+# Adaptive retrieval: first search round fetches top_k * OVERSAMPLE, never more than MAX_CANDIDATES
+OVERSAMPLE = int(os.getenv("MATCH_OVERSAMPLE", 3))
+MAX_CANDIDATES = int(os.getenv("MATCH_MAX_CANDIDATES", 10_000))
+# Only search recyclers that accept the listing's material (MATCH_MATERIAL_FILTER=0 scores everyone)
+MATERIAL_FILTER = os.getenv("MATCH_MATERIAL_FILTER", "1") == "1"
+
+
+def score_weights() -> Dict[str, float]:
+    return {"material": MATERIAL_W, "distance": DISTANCE_W, "capacity": CAPACITY_W, "sustainability": SUSTAIN_W}
+
+
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     import math
 
@@ -48,6 +68,7 @@ class WasteListing:
     location: Dict[str, float]  # {"lat": float, "lng": float}
     tags: List[str]
     vec: Optional[np.ndarray] = None
+    material_type: Optional[str] = None
 
 
 @dataclass
@@ -56,14 +77,52 @@ class RecyclerProfile:
     location: Dict[str, float]
     goals: List[str]
     remaining_capacity: float
-    vec: np.ndarray
+    vec: Optional[np.ndarray] = None
+
+
+def encode_cursor(score: float, internal_id: int, k: int) -> str:
+    """Opaque page cursor: the last (score, id) returned plus the search depth reached."""
+    raw = json.dumps({"s": score, "i": internal_id, "k": k}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return float(data["s"]), int(data["i"]), int(data["k"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid page cursor") from None
 
 
 class MatchingEngine:
-    def __init__(self, vector_store: FAISSVectorStore) -> None:
+    def __init__(
+        self,
+        vector_store: FAISSVectorStore,
+        listing_store: Optional[FAISSVectorStore] = None,
+        attributes: Optional[RecyclerAttributes] = None,
+    ) -> None:
         self.store = vector_store
+        # Listing namespace, for reverse matching (recycler -> listings)
+        self.listing_store = listing_store
+        # Live capacity/location/goals; they take precedence over the values frozen into the index metadata
+        self.attributes = attributes
+
+    def live_recycler(self, recycler: RecyclerProfile) -> RecyclerProfile:
+        """``recycler`` with its live attributes applied, if there are any."""
+        live = self.attributes.get(recycler.id) if self.attributes is not None else None
+        if not live:
+            return recycler
+        return RecyclerProfile(
+            id=recycler.id,
+            location=live.get("location", recycler.location),
+            goals=live.get("goals", recycler.goals),
+            remaining_capacity=live.get("remaining_capacity", recycler.remaining_capacity),
+            vec=recycler.vec,
+        )
 
     def compute_match_score(self, listing: WasteListing, recycler: RecyclerProfile, material_similarity: float) -> Dict[str, float]:
+        recycler = self.live_recycler(recycler)
         distance = haversine_km(
             listing.location.get("lat", 0.0),
             listing.location.get("lng", 0.0),
@@ -89,34 +148,379 @@ class MatchingEngine:
             "sustainability_score": round(float(sustainability_score), 4),
         }
 
-    def find_best_recyclers(self, listing: WasteListing, top_k: int = 10) -> List[Dict]:
+    def _score(
+        self, listing: WasteListing, scores: np.ndarray, ids: np.ndarray, meta: MetadataTable
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        ``compute_match_score`` for all hits of one query at once, from the metadata columns.
+        Returns the scored internal ids and one array per score term.
+        """
+        valid = ids != -1
+        ids, scores = ids[valid], scores[valid]
+        cols = meta.gather(ids, lists=(), bits=("goals",))
+        if not cols["found"].all():
+            # Hits without metadata are skipped, as when decoding records
+            ids, scores = ids[cols["found"]], scores[cols["found"]]
+            cols = meta.gather(ids, lists=(), bits=("goals",))
+        goals = jaccard_terms(cols["goals_bits"], meta.terms, listing.tags)
+        lat, lng, capacity = cols["lat"], cols["lng"], cols["remaining_capacity"]
+        if self.attributes is not None:
+            live = self.attributes.gather(meta, ids)
+            lat = np.where(np.isnan(live["lat"]), lat, live["lat"])
+            lng = np.where(np.isnan(live["lng"]), lng, live["lng"])
+            capacity = np.where(np.isnan(live["remaining_capacity"]), capacity, live["remaining_capacity"])
+            if live["has_goals"].any():
+                live_goals = jaccard_terms(live["goals_bits"], self.attributes.goal_terms, listing.tags)
+                goals = np.where(live["has_goals"], live_goals, goals)
+
+        # material similarity equals vector similarity from FAISS (cosine due to normalization)
+        material = scores.astype("float64")
+        # Missing locations count as (0, 0) and missing capacity as 0, like the dict defaults
+        distance = haversine_km_array(
+            listing.location.get("lat", 0.0),
+            listing.location.get("lng", 0.0),
+            np.nan_to_num(lat, nan=0.0),
+            np.nan_to_num(lng, nan=0.0),
+        )
+        capacity = np.nan_to_num(capacity, nan=0.0)
+        return ids, score_arrays(material, distance, capacity, listing.quantity, goals, score_weights())
+
+    @staticmethod
+    def _results(meta: MetadataTable, ids: np.ndarray, terms: Dict[str, np.ndarray], top_k: int) -> List[Dict]:
+        """Only the final ``top_k`` are turned into dicts."""
+        results: List[Dict] = []
+        for i in top_k_order(terms["match_score"], top_k).tolist():
+            row = meta.get(int(ids[i]))
+            if row is None:
+                continue
+            results.append(
+                {
+                    "recycler_id": row[0],
+                    "match_score": round(float(terms["match_score"][i]), 4),
+                    "material_match": round(float(terms["material_match"][i]), 4),
+                    "distance_km": round(float(terms["distance_km"][i]), 2),
+                    "capacity_score": round(float(terms["capacity_score"][i]), 4),
+                    "sustainability_score": round(float(terms["sustainability_score"][i]), 4),
+                }
+            )
+        return results
+
+    def _rank(self, listing: WasteListing, scores: np.ndarray, ids: np.ndarray, meta: MetadataTable, top_k: int) -> List[Dict]:
+        scored, terms = self._score(listing, scores, ids, meta)
+        return self._results(meta, scored, terms, top_k)
+
+    @staticmethod
+    def _max_non_material(terms: Sequence[str]) -> float:
+        """Upper bound of the distance + capacity + sustainability part of any candidate's score."""
+        weights = score_weights()
+        bound = max(weights["distance"], 0.0) + max(weights["capacity"], 0.0)
+        if terms:  # the Jaccard term is always 0 against an empty tag/goal list
+            bound += max(weights["sustainability"], 0.0)
+        return bound
+
+    @staticmethod
+    def _is_complete(
+        scores: np.ndarray, ids: np.ndarray, final: np.ndarray, eligible: int, top_k: int, max_non_material: float
+    ) -> bool:
+        """Threshold-algorithm stop test: no unretrieved candidate can beat the ``top_k``-th final score."""
+        valid = ids != -1
+        # Compare with the eligible count, not k: HNSW behind a selector can return short
+        if valid.sum() >= eligible:
+            return True  # every candidate was retrieved
+        if len(final) < top_k:
+            return False
+        kth = np.partition(final, len(final) - top_k)[len(final) - top_k]
+        bound = score_weights()["material"] * float(scores[valid].min()) + max_non_material
+        return kth >= bound
+
+    def _widen(
+        self,
+        store: FAISSVectorStore,
+        query: np.ndarray,
+        top_k: int,
+        in_range: Optional[np.ndarray],
+        score: Callable[[np.ndarray, np.ndarray, MetadataTable], Tuple[np.ndarray, Dict[str, np.ndarray]]],
+        max_non_material: float,
+        stats: Optional[Dict],
+        first: Optional[Tuple[np.ndarray, np.ndarray, MetadataTable]] = None,
+        adaptive: bool = True,
+        keep: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None,
+        k: int = 0,
+    ) -> Tuple[MetadataTable, np.ndarray, Dict[str, np.ndarray], int]:
+        """
+        Double ``k`` until ``_is_complete`` holds, the candidates run out or ``MAX_CANDIDATES`` is reached.
+        Returns the metadata table, the ids kept by ``keep``, their score terms and the final ``k``.
+        """
+        total = len(in_range) if in_range is not None else store.ntotal
+        eligible = len(in_range) if in_range is not None else len(store)
+        limit = max(top_k, min(MAX_CANDIDATES, total))
+        k = min(max(k, top_k * OVERSAMPLE), limit)
+        rounds = 0
+        while True:
+            rounds += 1
+            if first is not None:
+                scores, ids, meta = first
+                first = None
+            else:
+                scores, ids, meta = store.search_candidates_batch(query.reshape(1, -1), top_k=k, restrict_to=in_range)
+            scores, ids = scores[0], ids[0]
+            scored, terms = score(scores, ids, meta)
+            scanned = len(scored)
+            if keep is not None:
+                mask = keep(scored, terms["match_score"])
+                scored, terms = scored[mask], {name: values[mask] for name, values in terms.items()}
+            if not adaptive or k >= limit or self._is_complete(
+                scores, ids, terms["match_score"], eligible, top_k, max_non_material
+            ):
+                break
+            k = min(k * 2, limit)
+        if stats is not None:
+            stats["candidates_scanned"] = stats.get("candidates_scanned", 0) + scanned
+            stats["rounds"] = stats.get("rounds", 0) + rounds
+        return meta, scored, terms, k
+
+    def _search_adaptive(
+        self,
+        listing: WasteListing,
+        top_k: int,
+        in_range: Optional[np.ndarray],
+        stats: Optional[Dict],
+        first: Optional[Tuple[np.ndarray, np.ndarray, MetadataTable]] = None,
+        adaptive: bool = True,
+    ) -> List[Dict]:
+        """Best ``top_k`` recyclers for ``listing`` via ``_widen`` over the recycler store."""
+        meta, scored, terms, _ = self._widen(
+            self.store,
+            listing.vec,
+            top_k,
+            in_range,
+            lambda scores, ids, meta: self._score(listing, scores, ids, meta),
+            self._max_non_material(listing.tags),
+            stats,
+            first=first,
+            adaptive=adaptive,
+        )
+        return self._results(meta, scored, terms, top_k)
+
+    def _candidates(self, listing: WasteListing, max_radius_km: Optional[float]) -> Optional[np.ndarray]:
+        """Internal ids within ``max_radius_km`` that accept the listing's material, or None for all recyclers."""
+        allowed = None
+        if max_radius_km is not None:
+            # Recyclers moved since indexing are placed at their live location, as ``_score`` does
+            allowed = self.store.ids_within(
+                listing.location.get("lat", 0.0),
+                listing.location.get("lng", 0.0),
+                max_radius_km,
+                relocated=self.attributes.locations if self.attributes is not None else None,
+            )
+        if MATERIAL_FILTER and listing.material_type:
+            accepting = self.store.ids_accepting(listing.material_type)
+            allowed = accepting if allowed is None else np.intersect1d(allowed, accepting)
+        return allowed
+
+    def find_best_recyclers(
+        self,
+        listing: WasteListing,
+        top_k: int = 10,
+        max_radius_km: Optional[float] = None,
+        stats: Optional[Dict] = None,
+    ) -> List[Dict]:
+        """Best ``top_k`` recyclers for ``listing``; a ``stats`` dict gets ``candidates_scanned`` and ``rounds``."""
         # Ensure embedding
         if listing.vec is None:
             listing.vec = get_waste_embedding(listing.description, listing.image_url)
 
-        # Vector search
-        hits = self.store.search_similar(listing.vec, top_k=top_k * 3)
+        # Recyclers out of range or unable to take the material are never searched or scored
+        allowed = self._candidates(listing, max_radius_km)
+        if allowed is not None and not len(allowed):
+            return []
 
-        results: List[Dict] = []
-        for score, rec in hits:
-            md = rec.metadata or {}
-            recycler = RecyclerProfile(
-                id=rec.item_id,
-                location=md.get("location", {"lat": 0.0, "lng": 0.0}),
-                goals=md.get("goals", []),
-                remaining_capacity=float(md.get("remaining_capacity", 0.0)),
-                vec=rec.vector,
-            )
+        # Vector search over the recycler namespace only, widened as far as re-ranking needs
+        return self._search_adaptive(listing, top_k, allowed, stats)
+
+    def find_best_recyclers_batch(
+        self,
+        listings: Sequence[WasteListing],
+        top_k: int = 10,
+        max_radius_km: Optional[float] = None,
+        stats: Optional[Dict] = None,
+        adaptive: bool = True,
+    ) -> List[List[Dict]]:
+        """
+        ``find_best_recyclers`` for many listings with one encode and one first search round per material.
+        ``adaptive=False`` stops after that round, trading the top-k guarantee for speed.
+        """
+        missing = [l for l in listings if l.vec is None]
+        if missing:
+            vecs = get_waste_embeddings([l.description for l in missing], [l.image_url for l in missing])
+            for listing, vec in zip(missing, vecs):
+                listing.vec = vec
+        if not listings:
+            return []
+
+        if max_radius_km is not None:
+            results = []
+            for listing in listings:
+                allowed = self._candidates(listing, max_radius_km)
+                empty = allowed is not None and not len(allowed)
+                if empty:
+                    results.append([])
+                else:
+                    results.append(self._search_adaptive(listing, top_k, allowed, stats, adaptive=adaptive))
+            return results
+
+        groups: Dict[str, List[int]] = {}
+        for i, listing in enumerate(listings):
+            material = (listing.material_type or "").lower() if MATERIAL_FILTER else ""
+            groups.setdefault(material, []).append(i)
+        results: List[List[Dict]] = [[] for _ in listings]
+        for material, members in groups.items():
+            allowed = self._candidates(listings[members[0]], None)
+            if allowed is not None and not len(allowed):
+                continue
+            total = len(allowed) if allowed is not None else self.store.ntotal
+            k = min(top_k * OVERSAMPLE, max(top_k, min(MAX_CANDIDATES, total)))
+            queries = np.vstack([listings[i].vec for i in members])
+            scores, ids, meta = self.store.search_candidates_batch(queries, top_k=k, restrict_to=allowed)
+            # Listings whose first round is already complete cost nothing more
+            for row, i in enumerate(members):
+                results[i] = self._search_adaptive(
+                    listings[i], top_k, allowed, stats, first=(scores[row : row + 1], ids[row : row + 1], meta),
+                    adaptive=adaptive,
+                )
+        return results
 
-            # material similarity equals vector similarity from FAISS (cosine due to normalization)
-            material_similarity = float(score)
-            breakdown = self.compute_match_score(listing, recycler, material_similarity)
+    def assign_listings(
+        self,
+        listings: Sequence[WasteListing],
+        candidates_per_listing: int = 20,
+        max_radius_km: Optional[float] = None,
+        epsilon: float = 1e-3,
+    ) -> Tuple[List[Dict], Dict]:
+        """
+        Assign each listing at most one recycler without exceeding ``remaining_capacity`` (``auction_assign``).
+        Returns one ``{"listing_id", "recycler_id", "match_score"}`` per listing and run statistics.
+        """
+        stats: Dict = {}
+        # A candidate graph of each listing's first-round hits is enough for the auction
+        ranked = self.find_best_recyclers_batch(
+            listings, candidates_per_listing, max_radius_km, stats, adaptive=False
+        )
+        candidates = [[(r["recycler_id"], r["match_score"]) for r in matches] for matches in ranked]
+        capacities: Dict[str, float] = {}
+        for matches in ranked:
+            for r in matches:
+                if r["recycler_id"] not in capacities:
+                    # A copy: the store hands out its own dict for rows not yet folded into columns
+                    md = dict(self.store.metadata(r["recycler_id"]) or {})
+                    if self.attributes is not None:
+                        md.update(self.attributes.get(r["recycler_id"]) or {})
+                    capacities[r["recycler_id"]] = float(md.get("remaining_capacity", 0.0))
+        result = auction_assign([float(l.quantity) for l in listings], candidates, capacities, epsilon=epsilon)
+        stats.update(
+            {
+                "assigned": sum(1 for r in result.assignments if r is not None),
+                "total_score": round(result.total_score, 4),
+                "bids": result.bids,
+                "evictions": result.evictions,
+                "bid_limit_reached": result.bid_limit_reached,
+                "unprocessed": result.unprocessed,
+            }
+        )
+        assignments = [
+            {"listing_id": listing.id, "recycler_id": recycler, "match_score": score}
+            for listing, recycler, score in zip(listings, result.assignments, result.scores)
+        ]
+        return assignments, stats
 
-            result = {"recycler_id": recycler.id, **breakdown}
-            results.append(result)
+    def _score_listings(
+        self, recycler: RecyclerProfile, scores: np.ndarray, ids: np.ndarray, meta: MetadataTable
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """``_score`` the other way round: one recycler against many listing hits."""
+        valid = ids != -1
+        ids, scores = ids[valid], scores[valid]
+        cols = meta.gather(ids, lists=(), bits=("tags",))
+        if not cols["found"].all():
+            ids, scores = ids[cols["found"]], scores[cols["found"]]
+            cols = meta.gather(ids, lists=(), bits=("tags",))
+        tags = jaccard_terms(cols["tags_bits"], meta.terms, recycler.goals)
+        distance = haversine_km_array(
+            recycler.location.get("lat", 0.0),
+            recycler.location.get("lng", 0.0),
+            np.nan_to_num(cols["lat"], nan=0.0),
+            np.nan_to_num(cols["lng"], nan=0.0),
+        )
+        quantity = np.nan_to_num(cols["quantity"], nan=0.0)
+        return ids, score_arrays(
+            scores.astype("float64"), distance, float(recycler.remaining_capacity), quantity, tags, score_weights()
+        )
 
-        # Sort by final score
-        results.sort(key=lambda r: r["match_score"], reverse=True)
-        return results[:top_k]
+    def find_best_listings(
+        self,
+        recycler: RecyclerProfile,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        max_radius_km: Optional[float] = None,
+        stats: Optional[Dict] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Reverse matching: one page of the listings that best fit ``recycler``, ordered by score then id.
+        Returns the page and the cursor for the next one (None on the last page).
+        """
+        if self.listing_store is None:
+            raise ValueError("MatchingEngine needs a listing_store for reverse matching")
+        recycler = self.live_recycler(recycler)
+        if recycler.vec is None:
+            recycler.vec = self.store.vector(recycler.id)
+        if recycler.vec is None:
+            raise ValueError(f"No profile vector for recycler {recycler.id!r}")
 
+        in_range = None
+        if max_radius_km is not None:
+            in_range = self.listing_store.ids_within(
+                recycler.location.get("lat", 0.0), recycler.location.get("lng", 0.0), max_radius_km
+            )
+            if not len(in_range):
+                return [], None
+
+        keep = None
+        depth = 0
+        if cursor is not None:
+            after_score, after_id, depth = decode_cursor(cursor)
+
+            def keep(ids: np.ndarray, final: np.ndarray) -> np.ndarray:
+                return (final < after_score) | ((final == after_score) & (ids > after_id))
 
+        # One extra hit tells whether another page follows
+        meta, scored, terms, k = self._widen(
+            self.listing_store,
+            recycler.vec,
+            limit + 1,
+            in_range,
+            lambda scores, ids, meta: self._score_listings(recycler, scores, ids, meta),
+            self._max_non_material(recycler.goals),
+            stats,
+            keep=keep,
+            k=depth,
+        )
+        order = np.lexsort((scored, -terms["match_score"]))[: limit + 1]
+        page: List[Dict] = []
+        for i in order[:limit].tolist():
+            row = meta.get(int(scored[i]))
+            if row is None:
+                continue
+            page.append(
+                {
+                    "listing_id": row[0],
+                    "match_score": round(float(terms["match_score"][i]), 4),
+                    "material_match": round(float(terms["material_match"][i]), 4),
+                    "distance_km": round(float(terms["distance_km"][i]), 2),
+                    "capacity_score": round(float(terms["capacity_score"][i]), 4),
+                    "sustainability_score": round(float(terms["sustainability_score"][i]), 4),
+                }
+            )
+        next_cursor = None
+        if len(order) > limit:
+            last = int(order[limit - 1])
+            next_cursor = encode_cursor(float(terms["match_score"][last]), int(scored[last]), k)
+        return page, next_cursor
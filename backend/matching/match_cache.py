@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, FrozenSet, Hashable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from backend.matching import engine
+from backend.matching.engine import WasteListing, score_weights
+from backend.matching.scoring import jaccard_terms, score_arrays
+from backend.vector_store.bitsets import n_words, pack_codes, widen
+from backend.vector_store.geo import haversine_km_array
+from backend.vector_store.metadata import Vocabulary
+
+if TYPE_CHECKING:
+    from backend.matching.recycler_attributes import RecyclerAttributes
+    from backend.vector_store.faiss_store import FAISSVectorStore, StoreChange
+
+
+MatchKey = Tuple[Hashable, ...]
+
+
+def listing_fingerprint(listing: WasteListing) -> str:
+    """Hash of every listing field the ranking depends on, so an edited listing misses the cache."""
+    raw = json.dumps(
+        [
+            listing.description,
+            listing.image_url,
+            listing.quantity,
+            listing.location,
+            listing.tags,
+            listing.material_type,
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class _Entry:
+    listing: WasteListing  # with its embedding, to test whether a changed recycler could enter
+    version: int
+    top_k: int
+    max_radius_km: Optional[float]
+    results: List[Dict]
+    recyclers: FrozenSet[str]
+    expires: float
+    slot: int = -1  # row in its version's _Rows, -1 without an embedding
+
+
+class _Rows:
+    """Scoring inputs of one index version's cached rankings, a row per entry, so invalidation is vectorized."""
+
+    def __init__(self, dim: int) -> None:
+        self.vecs = np.zeros((0, dim), dtype="float32")  # normalized listing embeddings
+        self.cols = np.zeros((6, 0), dtype="float64")  # lat, lng, quantity, radius, score to beat, expiry
+        self.materials = np.zeros(0, dtype="int32")  # interned lower-cased material, -1 for none
+        self.tags = np.zeros((0, 1), dtype="uint64")  # listing tags over the cache's case-folded vocabulary
+        self.filled = np.zeros(0, dtype=bool)
+        self.entries: List[Optional[Tuple[MatchKey, _Entry]]] = []
+        self.free: List[int] = []
+
+    def add(self, key: MatchKey, entry: _Entry, material: int, tags: np.ndarray) -> int:
+        if self.free:
+            slot = self.free.pop()
+        else:
+            slot = len(self.entries)
+            self.entries.append(None)
+            if slot == len(self.materials):
+                # Grow by replacing the arrays, so a snapshot being scored keeps its own
+                size = max(16, 2 * slot)
+                self.vecs = np.concatenate([self.vecs, np.zeros((size - slot, self.vecs.shape[1]), "float32")])
+                self.cols = np.concatenate([self.cols, np.zeros((6, size - slot))], axis=1)
+                self.materials = np.concatenate([self.materials, np.zeros(size - slot, "int32")])
+                self.tags = np.concatenate([self.tags, np.zeros((size - slot, self.tags.shape[1]), "uint64")])
+                self.filled = np.concatenate([self.filled, np.zeros(size - slot, bool)])
+        if len(tags) > self.tags.shape[1]:
+            self.tags = widen(self.tags, len(tags))
+        listing = entry.listing
+        vec = np.asarray(listing.vec, dtype="float32")
+        # Same cosine similarity the store computes (it normalizes queries)
+        self.vecs[slot] = vec / max(float(np.linalg.norm(vec)), 1e-12)
+        full = bool(entry.results) and len(entry.results) >= entry.top_k
+        self.cols[:, slot] = (
+            listing.location.get("lat", 0.0),
+            listing.location.get("lng", 0.0),
+            listing.quantity,
+            np.inf if entry.max_radius_km is None else entry.max_radius_km,
+            # Cached scores are rounded to 4 places, so compare with that much slack
+            entry.results[-1]["match_score"] - 1e-4 if full else -np.inf,
+            entry.expires,
+        )
+        self.materials[slot] = material
+        self.tags[slot] = widen(tags.reshape(1, -1), self.tags.shape[1])[0]
+        self.filled[slot] = True
+        self.entries[slot] = (key, entry)
+        return slot
+
+    def remove(self, slot: int) -> None:
+        self.entries[slot] = None
+        self.cols[5, slot] = -np.inf
+        self.filled[slot] = False
+        self.free.append(slot)
+
+    def __len__(self) -> int:
+        return len(self.entries) - len(self.free)
+
+    def snapshot(self) -> "_Snapshot":
+        n = len(self.entries)
+        # ``filled`` is copied: a slot filled after the snapshot has no entry in it yet
+        filled = self.filled[:n].copy()
+        return self.vecs[:n], self.cols[:, :n], self.materials[:n], self.tags[:n], filled, list(self.entries)
+
+
+_Snapshot = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[Optional[Tuple[MatchKey, _Entry]]]]
+
+
+class MatchCache:
+    """
+    LRU + TTL cache of ranked matches per listing, keyed by listing fingerprint, index version and weights.
+    Live store and attribute changes (``attach``, ``watch_attributes``) drop only the entries they affect.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 300.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lru: "OrderedDict[MatchKey, _Entry]" = OrderedDict()
+        self._by_recycler: Dict[str, Set[MatchKey]] = {}
+        self._rows: Dict[int, _Rows] = {}
+        self._materials: Dict[str, int] = {}
+        self._tags = Vocabulary()
+        self._attached: "weakref.WeakSet[FAISSVectorStore]" = weakref.WeakSet()
+        self._serving: Optional[Tuple[int, FAISSVectorStore]] = None  # most recently attached
+        self._attributes: Optional[RecyclerAttributes] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._changes = 0
+
+    @staticmethod
+    def key(listing: WasteListing, version: int, top_k: int, max_radius_km: Optional[float]) -> MatchKey:
+        weights = tuple(sorted(score_weights().items()))
+        return (listing.id, listing_fingerprint(listing), version, weights, top_k, max_radius_km)
+
+    def get(self, key: MatchKey) -> Optional[List[Dict]]:
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and entry.expires <= time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._lru.move_to_end(key)
+            self.hits += 1
+            return entry.results
+
+    def token(self) -> int:
+        """Take before computing a ranking and pass to ``put``, so a ranking that raced a store change is not cached."""
+        return self._changes
+
+    def put(self, key: MatchKey, listing: WasteListing, results: List[Dict], token: Optional[int] = None) -> None:
+        _, _, version, _, top_k, max_radius_km = key
+        entry = _Entry(
+            listing=listing,
+            version=version,
+            top_k=top_k,
+            max_radius_km=max_radius_km,
+            results=results,
+            recyclers=frozenset(r["recycler_id"] for r in results),
+            expires=time.monotonic() + self.ttl_seconds,
+        )
+        with self._lock:
+            if token is not None and token != self._changes:
+                return
+            if key in self._lru:
+                self._drop(key)
+            self._lru[key] = entry
+            if listing.vec is not None:
+                rows = self._rows.get(version)
+                if rows is None:
+                    rows = self._rows[version] = _Rows(len(listing.vec))
+                material = (listing.material_type or "").lower()
+                code = self._materials.setdefault(material, len(self._materials)) if material else -1
+                codes = [self._tags.code(t) for t in listing.tags]
+                canonical, _ = self._tags.casefolded()
+                tags = pack_codes((int(canonical[c]) for c in codes), n_words(len(canonical)))
+                entry.slot = rows.add(key, entry, code, tags)
+            for recycler_id in entry.recyclers:
+                self._by_recycler.setdefault(recycler_id, set()).add(key)
+            while len(self._lru) > self.max_entries:
+                self._drop(next(iter(self._lru)))
+                self.evictions += 1
+
+    def _drop(self, key: MatchKey) -> None:
+        entry = self._lru.pop(key)
+        if entry.slot >= 0:
+            rows = self._rows[entry.version]
+            rows.remove(entry.slot)
+            if not len(rows):
+                del self._rows[entry.version]
+        for recycler_id in entry.recyclers:
+            keys = self._by_recycler.get(recycler_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_recycler[recycler_id]
+
+    def attach(self, store: FAISSVectorStore, version: int) -> None:
+        """Invalidate entries of index ``version`` whenever recyclers in ``store`` change."""
+        with self._lock:
+            if self._serving is None or self._serving[0] <= version:
+                self._serving = (version, store)
+            if store in self._attached:
+                return
+            self._attached.add(store)
+        store.add_listener(lambda changes: self.recyclers_changed(version, [self._live(c) for c in changes]))
+
+    def watch_attributes(self, attributes: RecyclerAttributes) -> None:
+        """Invalidate like ``recyclers_changed`` whenever a recycler's live attributes change."""
+        self._attributes = attributes
+        attributes.add_listener(self._attributes_changed)
+
+    def _live(self, change: StoreChange) -> StoreChange:
+        """A store change with the recycler's live attributes applied, as the engine scores it."""
+        item_id, metadata, vector = change
+        live = self._attributes.get(item_id) if self._attributes is not None and metadata is not None else None
+        return (item_id, {**metadata, **live}, vector) if live else change
+
+    def _attributes_changed(self, recycler_id: str, values: Dict) -> None:
+        serving = self._serving
+        if serving is None:
+            return
+        version, store = serving
+        metadata = {**(store.metadata(recycler_id) or {}), **values}
+        self.recyclers_changed(version, [(recycler_id, metadata, store.vector(recycler_id))])
+
+    def recyclers_changed(self, version: int, changes: Sequence[StoreChange]) -> None:
+        with self._lock:
+            self._changes += 1
+            stale: Set[MatchKey] = set()
+            for item_id, _, _ in changes:
+                stale.update(self._by_recycler.get(item_id, ()))
+            self._invalidate(stale)
+            rows = self._rows.get(version)
+            snapshot = rows.snapshot() if rows is not None else None
+        if snapshot is None:
+            return
+        # Scored outside the lock: rows written meanwhile belong to entries checked again below
+        entered: List[Tuple[MatchKey, _Entry]] = []
+        for _, metadata, vector in changes:
+            if metadata is not None and vector is not None:
+                entered.extend(self._entered_by(snapshot, metadata, vector))
+        if entered:
+            with self._lock:
+                self._invalidate({key for key, entry in entered if self._lru.get(key) is entry})
+
+    def _invalidate(self, keys: Set[MatchKey]) -> None:
+        for key in keys:
+            if key in self._lru:
+                self._drop(key)
+        self.invalidations += len(keys)
+
+    def _entered_by(self, snapshot: _Snapshot, metadata: Dict, vector: np.ndarray) -> List[Tuple[MatchKey, _Entry]]:
+        """Cached rankings in ``snapshot`` that a recycler with ``metadata``/``vector`` now belongs in."""
+        vecs, cols, materials, tags, filled, entries = snapshot
+        lat, lng, quantity, radius, threshold, expires = cols
+        live = expires > time.monotonic()
+        # A recycler listing accepted materials never enters rankings for other materials
+        accepted = {m.lower() for m in metadata.get("accepted_materials") or []} if engine.MATERIAL_FILTER else set()
+        if accepted:
+            codes = [self._materials[m] for m in accepted if m in self._materials]
+            live &= (materials < 0) | np.isin(materials, codes)
+        location = metadata.get("location") or {}
+        distance = haversine_km_array(location.get("lat", 0.0), location.get("lng", 0.0), lat, lng)
+        live &= distance <= radius
+        rows = np.flatnonzero(live & filled)
+        if not len(rows):
+            return []
+        terms = score_arrays(
+            (vecs[rows] @ np.asarray(vector, dtype="float32")).astype("float64"),
+            distance[rows],
+            float(metadata.get("remaining_capacity", 0.0)),
+            quantity[rows],
+            jaccard_terms(tags[rows], self._tags, metadata.get("goals") or []),
+            score_weights(),
+        )
+        return [entries[i] for i in rows[terms["match_score"] >= threshold[rows]]]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            self._by_recycler.clear()
+            self._rows.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._lru),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache: Optional[MatchCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_match_cache() -> Optional[MatchCache]:
+    """
+    Process-wide match cache, or None when ``MATCH_CACHE_SIZE=0``.
+    ``MATCH_CACHE_TTL_SECONDS`` bounds how stale an entry can get (default 300).
+    """
+    global _cache
+    if _cache is None:
+        size = int(os.getenv("MATCH_CACHE_SIZE", "10000"))
+        if size <= 0:
+            return None
+        with _cache_lock:
+            if _cache is None:
+                _cache = MatchCache(max_entries=size, ttl_seconds=float(os.getenv("MATCH_CACHE_TTL_SECONDS", "300")))
+    return _cache
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import logging
+import threading
+import weakref
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import update
+
+from backend.models import Recycler
+from backend.vector_store.bitsets import n_words, pack_codes, split_terms, widen
+from backend.vector_store.metadata import Vocabulary
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+    from backend.vector_store.metadata import MetadataTable
+
+
+logger = logging.getLogger(__name__)
+
+# Called with (recycler_id, current attributes) after every change
+AttributeListener = Callable[[str, Dict], None]
+
+
+class RecyclerAttributes:
+    """
+    Live remaining capacity, location and goals per recycler, in flat arrays apart from the index.
+    With a ``session_factory`` the ``recyclers`` table stays the source of truth and ``start`` re-reads it.
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None) -> None:
+        self.session_factory = session_factory
+        self.goal_terms = Vocabulary()
+        self._slots: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._capacity = np.empty(0, dtype="float64")
+        self._lat = np.empty(0, dtype="float64")
+        self._lng = np.empty(0, dtype="float64")
+        self._goals: List[Optional[List[str]]] = []
+        self._goal_bits = np.zeros((0, 1), dtype="uint64")
+        self._has_goals = np.zeros(0, dtype=bool)
+        self._generation = 0  # bumped whenever a slot is added
+        self._maps: "weakref.WeakKeyDictionary[MetadataTable, Tuple[Tuple[int, int, int], np.ndarray]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._listeners: List[AttributeListener] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, recycler_id: str) -> bool:
+        return recycler_id in self._slots
+
+    # -- reads ---------------------------------------------------------------------
+
+    def get(self, recycler_id: str) -> Optional[Dict]:
+        """Known attributes of ``recycler_id`` in the metadata layout, or None if it is unknown."""
+        slot = self._slots.get(recycler_id)
+        if slot is None:
+            return None
+        values: Dict = {}
+        if not np.isnan(self._capacity[slot]):
+            values["remaining_capacity"] = float(self._capacity[slot])
+        if not np.isnan(self._lat[slot]):
+            values["location"] = {"lat": float(self._lat[slot]), "lng": float(self._lng[slot])}
+        goals = self._goals[slot]
+        if goals is not None:
+            values["goals"] = list(goals)
+        return values
+
+    def _slot_map(self, meta: MetadataTable) -> np.ndarray:
+        """``internal_id -> slot`` (-1 if unknown) for the rows of ``meta``; rebuilt when either side grows."""
+        signature = (len(meta), meta.max_id(), self._generation)
+        cached = self._maps.get(meta)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        mapping = np.full(signature[1] + 1, -1, dtype="int64")
+        for internal_id, item_id in meta.item_ids():
+            mapping[internal_id] = self._slots.get(item_id, -1)
+        self._maps[meta] = (signature, mapping)
+        return mapping
+
+    def gather(self, meta: MetadataTable, internal_ids: np.ndarray) -> Dict[str, np.ndarray]:
+        """Live capacity, lat/lng (NaN where unknown) and goal bitsets for search hits (internal ids of ``meta``)."""
+        mapping = self._slot_map(meta)
+        ids = np.asarray(internal_ids, dtype="int64")
+        slots = np.full(len(ids), -1, dtype="int64")
+        inside = (ids >= 0) & (ids < len(mapping))
+        slots[inside] = mapping[ids[inside]]
+        found = slots >= 0
+        # One consistent set of arrays; writers replace them instead of growing in place
+        capacity, lat, lng = self._capacity, self._lat, self._lng
+        goal_bits, has_goals = self._goal_bits, self._has_goals
+        out = {name: np.full(len(ids), np.nan) for name in ("remaining_capacity", "lat", "lng")}
+        out["remaining_capacity"][found] = capacity[slots[found]]
+        out["lat"][found] = lat[slots[found]]
+        out["lng"][found] = lng[slots[found]]
+        out["has_goals"] = np.zeros(len(ids), dtype=bool)
+        out["has_goals"][found] = has_goals[slots[found]]
+        out["goals_bits"] = np.zeros((len(ids), goal_bits.shape[1]), dtype="uint64")
+        out["goals_bits"][found] = goal_bits[slots[found]]
+        return out
+
+    def locations(self, meta: MetadataTable) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``(internal_ids, lats, lngs)`` of the rows of ``meta`` with a live location."""
+        mapping = self._slot_map(meta)
+        ids = np.flatnonzero(mapping >= 0)
+        slots = mapping[ids]
+        lat, lng = self._lat, self._lng
+        located = ~np.isnan(lat[slots])
+        return ids[located], lat[slots[located]], lng[slots[located]]
+
+    # -- writes --------------------------------------------------------------------
+
+    def add_listener(self, callback: AttributeListener) -> None:
+        self._listeners.append(callback)
+
+    def _notify(self, recycler_id: str) -> None:
+        values = self.get(recycler_id) or {}
+        for callback in list(self._listeners):
+            try:
+                callback(recycler_id, values)
+            except Exception:
+                logger.exception("Recycler attribute listener failed")
+
+    def _slot_for(self, recycler_id: str) -> int:
+        slot = self._slots.get(recycler_id)
+        if slot is not None:
+            return slot
+        slot = len(self._ids)
+        if slot >= len(self._capacity):
+            # Grow by doubling into new arrays; readers keep the ones they already hold
+            size = max(16, 2 * len(self._capacity))
+            self._capacity, self._lat, self._lng = (
+                np.concatenate([a, np.full(size - len(a), np.nan)]) for a in (self._capacity, self._lat, self._lng)
+            )
+            bits = np.zeros((size, self._goal_bits.shape[1]), dtype="uint64")
+            bits[: len(self._goal_bits)] = self._goal_bits
+            has = np.zeros(size, dtype=bool)
+            has[: len(self._has_goals)] = self._has_goals
+            self._goal_bits, self._has_goals = bits, has
+        self._ids.append(recycler_id)
+        self._goals.append(None)
+        self._slots[recycler_id] = slot
+        self._generation += 1
+        return slot
+
+    def _apply(
+        self,
+        recycler_id: str,
+        remaining_capacity: Optional[float],
+        location: Optional[Dict[str, float]],
+        goals: Optional[Sequence[str]],
+    ) -> bool:
+        """Set the given fields in memory (lock held); returns whether anything changed."""
+        before = self.get(recycler_id)
+        slot = self._slot_for(recycler_id)
+        if remaining_capacity is not None:
+            self._capacity[slot] = float(remaining_capacity)
+        if location is not None:
+            self._lat[slot] = float(location.get("lat", 0.0))
+            self._lng[slot] = float(location.get("lng", 0.0))
+        if goals is not None:
+            codes = [self.goal_terms.code(g) for g in goals]
+            canonical, _ = self.goal_terms.casefolded()
+            words = n_words(len(canonical))
+            if words > self._goal_bits.shape[1]:
+                self._goal_bits = widen(self._goal_bits, words)
+            self._goal_bits[slot] = pack_codes((int(canonical[c]) for c in codes), self._goal_bits.shape[1])
+            self._has_goals[slot] = True
+            self._goals[slot] = list(goals)
+        return self.get(recycler_id) != before
+
+    def set(
+        self,
+        recycler_id: str,
+        remaining_capacity: Optional[float] = None,
+        location: Optional[Dict[str, float]] = None,
+        goals: Optional[Sequence[str]] = None,
+    ) -> Dict:
+        """Update some of a recycler's fields (database first, when configured); returns all its values."""
+        if self.session_factory is not None:
+            values: Dict = {}
+            if remaining_capacity is not None:
+                values["capacity"] = float(remaining_capacity)
+            if location is not None:
+                values["location_lat"] = float(location.get("lat", 0.0))
+                values["location_lng"] = float(location.get("lng", 0.0))
+            if goals is not None:
+                values["sustainability_goals"] = ",".join(goals)
+            if values:
+                db = self.session_factory()
+                try:
+                    result = db.execute(update(Recycler).where(Recycler.id == recycler_id).values(**values))
+                    if result.rowcount == 0:
+                        raise KeyError(recycler_id)
+                    db.commit()
+                finally:
+                    db.close()
+        with self._lock:
+            changed = self._apply(recycler_id, remaining_capacity, location, goals)
+        if changed:
+            self._notify(recycler_id)
+        return self.get(recycler_id) or {}
+
+    def decrement(self, recycler_id: str, amount: float) -> Optional[float]:
+        """
+        Atomically take ``amount`` off a recycler's remaining capacity; returns the new value, or None if
+        less than ``amount`` is left. Raises KeyError for an unknown recycler.
+        """
+        amount = float(amount)
+        if self.session_factory is not None:
+            db = self.session_factory()
+            try:
+                # Check and write in one statement, so two workers can't both take the last units
+                result = db.execute(
+                    update(Recycler)
+                    .where(Recycler.id == recycler_id, Recycler.capacity >= amount)
+                    .values(capacity=Recycler.capacity - amount)
+                )
+                if result.rowcount == 0:
+                    db.rollback()
+                    if db.get(Recycler, recycler_id) is None:
+                        raise KeyError(recycler_id)
+                    return None
+                remaining = float(db.get(Recycler, recycler_id).capacity)
+                db.commit()
+            finally:
+                db.close()
+            with self._lock:
+                self._apply(recycler_id, remaining, None, None)
+        else:
+            with self._lock:
+                slot = self._slots.get(recycler_id)
+                if slot is None or np.isnan(self._capacity[slot]):
+                    raise KeyError(recycler_id)
+                if self._capacity[slot] < amount:
+                    return None
+                self._capacity[slot] -= amount
+                remaining = float(self._capacity[slot])
+        self._notify(recycler_id)
+        return remaining
+
+    # -- loading -------------------------------------------------------------------
+
+    def load(self, rows: Iterable[Recycler]) -> int:
+        """Set every field of ``rows`` (database ``Recycler`` objects); returns how many changed."""
+        changed: List[str] = []
+        with self._lock:
+            for row in rows:
+                if self._apply(
+                    row.id,
+                    float(row.capacity or 0.0),
+                    {"lat": row.location_lat or 0.0, "lng": row.location_lng or 0.0},
+                    split_terms(row.sustainability_goals),
+                ):
+                    changed.append(row.id)
+        for recycler_id in changed:
+            self._notify(recycler_id)
+        return len(changed)
+
+    def refresh(self) -> int:
+        """Re-read the ``recyclers`` table; picks up writes made by other processes."""
+        if self.session_factory is None:
+            return 0
+        db = self.session_factory()
+        try:
+            return self.load(db.query(Recycler).all())
+        finally:
+            db.close()
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Refreshing recycler attributes failed")
+
+    def start(self, interval: float) -> None:
+        if self._thread is not None or interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="recycler-attributes", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import Dict, Sequence, Union
+
+import numpy as np
+
+from backend.vector_store.bitsets import jaccard_bits, n_words, query_bits
+from backend.vector_store.metadata import Vocabulary
+
+
+def jaccard_terms(bits: np.ndarray, vocab: Vocabulary, terms: Sequence[str]) -> np.ndarray:
+    """Case-insensitive ``jaccard_similarity(terms, row)`` for every row bitset over ``vocab``'s codes."""
+    _, index = vocab.casefolded()
+    query, size = query_bits(index, terms, max(bits.shape[1], n_words(len(vocab))))
+    return jaccard_bits(bits, query, size)
+
+
+def top_k_order(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the ``top_k`` largest ``scores``, best first (``argpartition``, then a sort of k)."""
+    if top_k <= 0 or not len(scores):
+        return np.empty(0, dtype="int64")
+    if top_k < len(scores):
+        part = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        part = np.arange(len(scores))
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+def score_arrays(
+    material: np.ndarray,
+    distance_km: np.ndarray,
+    capacity: np.ndarray,
+    quantity: Union[float, np.ndarray],
+    sustainability: np.ndarray,
+    weights: Dict[str, float],
+) -> Dict[str, np.ndarray]:
+    """The ``compute_match_score`` terms for many candidates; ``capacity`` or ``quantity`` may be a scalar."""
+    distance_score = 1.0 / (1.0 + distance_km)
+    capacity_score = np.minimum(1.0, capacity / np.maximum(1.0, quantity))
+    final = (
+        weights["material"] * material
+        + weights["distance"] * distance_score
+        + weights["capacity"] * capacity_score
+        + weights["sustainability"] * sustainability
+    )
+    return {
+        "match_score": final,
+        "material_match": material,
+        "distance_km": distance_km,
+        "capacity_score": capacity_score,
+        "sustainability_score": sustainability,
+    }
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import itertools
+
+import numpy as np
+
+from backend.matching.assignment import auction_assign
+from backend.matching.engine import MatchingEngine, WasteListing
+from backend.matching.recycler_attributes import RecyclerAttributes
+from backend.vector_store.faiss_store import FAISSVectorStore
+
+
+def _best_total(quantities, candidates, capacities) -> float:
+    """Exhaustive optimum over every choice of (recycler or nothing) per listing."""
+    best = 0.0
+    options = [[None] + list(c) for c in candidates]
+    for choice in itertools.product(*options):
+        used = {}
+        for q, pick in zip(quantities, choice):
+            if pick is not None:
+                used[pick[0]] = used.get(pick[0], 0.0) + q
+        if all(used[r] <= capacities[r] for r in used):
+            best = max(best, sum(pick[1] for pick in choice if pick is not None))
+    return best
+
+
+def test_auction_respects_capacity_and_is_near_optimal():
+    rng = np.random.default_rng(0)
+    recyclers = ["a", "b", "c"]
+    for _ in range(20):
+        n = 6
+        candidates = [
+            [(r, float(rng.uniform(0.1, 1.0))) for r in rng.choice(recyclers, size=2, replace=False)] for _ in range(n)
+        ]
+        capacities = {r: float(rng.integers(1, 3)) for r in recyclers}
+        quantities = [1.0] * n
+        epsilon = 1e-3
+        result = auction_assign(quantities, candidates, capacities, epsilon=epsilon)
+
+        load = {}
+        for recycler in result.assignments:
+            if recycler is not None:
+                load[recycler] = load.get(recycler, 0.0) + 1.0
+        assert all(load[r] <= capacities[r] for r in load)
+        assert result.total_score >= _best_total(quantities, candidates, capacities) - n * epsilon - 1e-9
+        assert not result.bid_limit_reached
+
+
+def test_bid_limit_is_reported():
+    candidates = [[("a", 0.9), ("b", 0.8)] for _ in range(10)]
+    result = auction_assign([1.0] * 10, candidates, {"a": 1.0, "b": 1.0}, max_bids=3)
+    assert result.bid_limit_reached
+    assert result.assignments.count(None) >= result.unprocessed > 0
+
+
+def test_assign_listings_does_not_write_live_attributes_into_the_index():
+    store = FAISSVectorStore(dim=4, compaction_threshold=None)
+    store.upsert("r1", np.array([1.0, 0, 0, 0]), {"type": "recycler", "remaining_capacity": 5.0})
+    attributes = RecyclerAttributes()
+    attributes.set("r1", remaining_capacity=50.0)
+    engine = MatchingEngine(vector_store=store, attributes=attributes)
+    listing = WasteListing(
+        id="l1", description="", image_url=None, quantity=10.0, location={}, tags=[],
+        vec=np.array([1.0, 0, 0, 0], dtype="float32"),
+    )
+    assignments, stats = engine.assign_listings([listing])
+    assert assignments[0]["recycler_id"] == "r1"
+    assert store.metadata("r1")["remaining_capacity"] == 5.0
+    assert stats["bid_limit_reached"] is False
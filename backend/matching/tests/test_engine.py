@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+import numpy as np
+import pytest
+
+from backend.matching import engine as engine_module
+from backend.matching.engine import MatchingEngine, RecyclerProfile, WasteListing
+from backend.vector_store.faiss_store import FAISSVectorStore
+from backend.vector_store.index_spec import IndexSpec
+
+DIM = 16
+MATERIALS = ["plastic", "Metal", "glass", "paper", "e-waste"]
+
+
+def _store(spec: str, n: int = 3000, seed: int = 0) -> FAISSVectorStore:
+    rng = np.random.default_rng(seed)
+    store = FAISSVectorStore(dim=DIM, index_spec=IndexSpec.parse(spec), compaction_threshold=None, merge_threshold=500)
+    metadatas = [
+        {
+            "type": "recycler",
+            "location": {"lat": float(rng.uniform(8, 35)), "lng": float(rng.uniform(68, 97))},
+            "goals": list(rng.choice(["circular", "local", "zero-waste"], size=int(rng.integers(0, 3)), replace=False)),
+            # "rare" leaves a small allowed set that HNSW struggles to reach through a selector
+            "accepted_materials": list(rng.choice(MATERIALS, size=int(rng.integers(0, 3)), replace=False))
+            + (["rare"] if rng.random() < 0.002 else []),
+            "remaining_capacity": float(rng.uniform(0, 500)),
+        }
+        for _ in range(n)
+    ]
+    store.add_embeddings([f"r{i}" for i in range(n)], rng.standard_normal((n, DIM)), metadatas)
+    store.delete("r7")
+    return store
+
+
+def _brute_force(
+    engine: MatchingEngine, store: FAISSVectorStore, listing: WasteListing, top_k: int, radius: Optional[float]
+) -> List[float]:
+    query = listing.vec / np.linalg.norm(listing.vec)
+    scores = []
+    for item_id in store.item_ids():
+        md = store.metadata(item_id)
+        accepted = [m.lower() for m in md.get("accepted_materials", [])]
+        if listing.material_type and accepted and listing.material_type.lower() not in accepted:
+            continue
+        recycler = RecyclerProfile(
+            id=item_id, location=md["location"], goals=md["goals"], remaining_capacity=md["remaining_capacity"]
+        )
+        result = engine.compute_match_score(listing, recycler, float(query @ store.vector(item_id)))
+        if radius is None or result["distance_km"] <= radius:
+            scores.append(result["match_score"])
+    return sorted(scores, reverse=True)[:top_k]
+
+
+def _listing(seed: int, material: Optional[str] = None) -> WasteListing:
+    rng = np.random.default_rng(100 + seed)
+    return WasteListing(
+        id=f"l{seed}",
+        description="",
+        image_url=None,
+        quantity=50.0,
+        location={"lat": 19.0, "lng": 73.0},
+        tags=["Circular"],
+        vec=rng.standard_normal(DIM).astype("float32"),
+        material_type=material,
+    )
+
+
+@pytest.mark.parametrize("spec", ["flat", "hnsw"])
+@pytest.mark.parametrize("material", [None, "metal", "rare"])
+@pytest.mark.parametrize("radius", [None, 150.0, 600.0])
+def test_find_best_recyclers_matches_brute_force(spec, material, radius):
+    store = _store(spec)
+    engine = MatchingEngine(vector_store=store)
+    for seed in range(3):
+        listing = _listing(seed, material)
+        got = [r["match_score"] for r in engine.find_best_recyclers(listing, top_k=10, max_radius_km=radius)]
+        assert got == pytest.approx(_brute_force(engine, store, listing, 10, radius), abs=1e-4)
+
+
+def test_restricted_hnsw_search_returns_every_allowed_id():
+    store = _store("hnsw:hnsw_m=4,ef_search=4")
+    allowed = np.array(sorted(store._item_to_id[f"r{i}"] for i in (3, 1500, 2999)), dtype="int64")
+    _, ids, _ = store.search_candidates_batch(np.ones((1, DIM)), top_k=len(allowed), restrict_to=allowed)
+    assert sorted(ids[0].tolist()) == allowed.tolist()
+
+
+def test_short_restricted_result_is_not_taken_as_complete():
+    complete = engine_module.MatchingEngine._is_complete
+    scores = np.array([0.9, 0.8], dtype="float32")
+    ids = np.array([1, 2, -1, -1])
+    final = np.array([0.5, 0.4])
+    # Two hits for four requested, but ten ids were eligible: not proven complete
+    assert not complete(np.append(scores, [0, 0]), ids, final, eligible=10, top_k=3, max_non_material=0.5)
+    assert complete(np.append(scores, [0, 0]), ids, final, eligible=2, top_k=3, max_non_material=0.5)
+
+
+@pytest.mark.parametrize("material", ["metal", "rare"])
+def test_material_filtered_hnsw_keeps_recall_at_low_ef_search(material):
+    # efSearch is scaled up by the selector's selectivity, so filtering costs no recall
+    store = _store("hnsw:ef_search=16")
+    engine = MatchingEngine(vector_store=store)
+    for seed in range(3):
+        listing = _listing(seed, material)
+        got = [r["match_score"] for r in engine.find_best_recyclers(listing, top_k=10)]
+        assert got == pytest.approx(_brute_force(engine, store, listing, 10, None), abs=1e-4)
+
+
+def test_batch_matches_single_listing_search():
+    store = _store("flat")
+    engine = MatchingEngine(vector_store=store)
+    listings = [_listing(seed, material) for seed, material in enumerate([None, "metal", "glass", "rare", "metal"])]
+    batch = engine.find_best_recyclers_batch(listings, top_k=10)
+    for listing, matches in zip(listings, batch):
+        assert matches == engine.find_best_recyclers(listing, top_k=10)
+
+
+def test_material_filter_can_be_disabled(monkeypatch):
+    store = _store("flat")
+    engine = MatchingEngine(vector_store=store)
+    listing = _listing(0, "rare")
+    filtered = engine.find_best_recyclers(listing, top_k=10)
+    monkeypatch.setattr(engine_module, "MATERIAL_FILTER", False)
+    unfiltered = engine.find_best_recyclers(listing, top_k=10)
+    assert unfiltered[0]["match_score"] >= filtered[0]["match_score"]
+    assert len(unfiltered) == 10
+
+
+def test_empty_stores_match_nothing():
+    engine = MatchingEngine(vector_store=FAISSVectorStore(dim=DIM), listing_store=FAISSVectorStore(dim=DIM))
+    assert engine.find_best_recyclers(_listing(0, "metal"), top_k=10) == []
+    assert engine.find_best_recyclers(_listing(0), top_k=10, max_radius_km=50.0) == []
+    recycler = RecyclerProfile(
+        id="r0", location={"lat": 19.0, "lng": 73.0}, goals=["local"], remaining_capacity=50.0, vec=_listing(1).vec
+    )
+    assert engine.find_best_listings(recycler) == ([], None)
+
+
+def test_fully_filtered_store_matches_nothing():
+    engine = MatchingEngine(vector_store=_store("flat", n=200))
+    # No recycler lies within a metre of the listing
+    assert engine.find_best_recyclers(_listing(0, "metal"), top_k=10, max_radius_km=0.001) == []
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.matching.engine import MatchingEngine, WasteListing, score_weights
+from backend.matching.match_cache import MatchCache
+from backend.matching.recycler_attributes import RecyclerAttributes
+from backend.vector_store.faiss_store import FAISSVectorStore
+
+DIM = 16
+TOP_K = 5
+
+
+def _metadata(lat: float = 19.0, capacity: float = 100.0) -> dict:
+    return {"type": "recycler", "location": {"lat": lat, "lng": 73.0}, "goals": [], "remaining_capacity": capacity}
+
+
+@pytest.fixture
+def setup():
+    rng = np.random.default_rng(0)
+    store = FAISSVectorStore(dim=DIM, compaction_threshold=None)
+    store.add_embeddings(
+        [f"r{i}" for i in range(200)],
+        rng.standard_normal((200, DIM)),
+        [_metadata(lat=float(rng.uniform(15, 23))) for _ in range(200)],
+    )
+    attributes = RecyclerAttributes()
+    engine = MatchingEngine(vector_store=store, attributes=attributes)
+    cache = MatchCache()
+    cache.attach(store, version=1)
+    cache.watch_attributes(attributes)
+    listing = WasteListing(
+        id="l1",
+        description="",
+        image_url=None,
+        quantity=10.0,
+        location={"lat": 19.0, "lng": 73.0},
+        tags=[],
+        vec=rng.standard_normal(DIM).astype("float32"),
+    )
+    key = cache.key(listing, 1, TOP_K, None)
+    cache.put(key, listing, engine.find_best_recyclers(listing, top_k=TOP_K))
+    return store, attributes, cache, listing, key
+
+
+def test_hit_until_a_cached_recycler_changes(setup):
+    store, _, cache, _, key = setup
+    cached = cache.get(key)
+    assert cached is not None
+    store.upsert(cached[0]["recycler_id"], np.ones(DIM), _metadata())
+    assert cache.get(key) is None
+
+
+def test_deleting_a_cached_recycler_invalidates(setup):
+    store, _, cache, _, key = setup
+    store.delete(cache.get(key)[-1]["recycler_id"])
+    assert cache.get(key) is None
+
+
+def test_unrelated_recycler_leaves_the_entry_alone(setup):
+    store, _, cache, listing, key = setup
+    # Far away and pointing away from the listing: cannot enter its top-k
+    store.upsert("far", -listing.vec, _metadata(lat=-60.0, capacity=0.0))
+    assert cache.get(key) is not None
+
+
+def test_new_recycler_that_would_rank_drops_the_entry(setup):
+    store, _, cache, listing, key = setup
+    store.upsert("close", listing.vec, _metadata())
+    assert cache.get(key) is None
+
+
+def test_live_attribute_change_of_a_cached_recycler_invalidates(setup):
+    _, attributes, cache, _, key = setup
+    attributes.set(cache.get(key)[0]["recycler_id"], remaining_capacity=0.0)
+    assert cache.get(key) is None
+
+
+def test_ranking_that_raced_a_write_is_not_cached(setup):
+    store, _, cache, listing, key = setup
+    cache.clear()
+    token = cache.token()
+    store.upsert("other", np.ones(DIM), _metadata())
+    cache.put(key, listing, [], token=token)
+    assert cache.get(key) is None
+
+
+@pytest.mark.parametrize("goals, dropped", [(["pet", "BOTTLES"], True), (["pet", "glass"], False), ([], False)])
+def test_shared_goals_decide_whether_a_recycler_enters(goals, dropped):
+    store = FAISSVectorStore(dim=DIM, compaction_threshold=None)
+    cache = MatchCache()
+    cache.attach(store, version=1)
+    vec = np.ones(DIM, dtype="float32")
+    listing = WasteListing(
+        id="l", description="", image_url=None, quantity=10.0, location={"lat": 19.0, "lng": 73.0},
+        tags=["PET", "Bottles"], vec=vec,
+    )
+    key = cache.key(listing, 1, TOP_K, None)
+    # Identical embedding, distance and capacity: only the goal overlap decides the score
+    weights = score_weights()
+    bar = sum(weights.values()) - 0.6 * weights["sustainability"]
+    cache.put(key, listing, [{"recycler_id": "r0", "match_score": bar}] * TOP_K)
+    store.upsert("new", vec, {**_metadata(), "goals": goals})
+    assert (cache.get(key) is None) == dropped
+
+
+def test_entries_expire():
+    cache = MatchCache(ttl_seconds=0.0)
+    listing = WasteListing(id="l", description="", image_url=None, quantity=1.0, location={}, tags=[])
+    key = cache.key(listing, 1, TOP_K, None)
+    cache.put(key, listing, [])
+    assert cache.get(key) is None
+
+
+def test_invalidation_follows_evicted_and_reused_rows(setup):
+    store, _, cache, listing, _ = setup
+    cache.clear()
+    cache.max_entries = 4
+    keys = []
+    for i in range(10):
+        other = WasteListing(**{**vars(listing), "id": f"l{i}", "location": {"lat": 19.0 + 40 * (i % 2), "lng": 73.0}})
+        keys.append(cache.key(other, 1, TOP_K, 500.0))
+        cache.put(keys[-1], other, [{"recycler_id": "r0", "match_score": 0.0}] * TOP_K)
+    # Only the four newest survive; the new recycler is out of range of the odd ones
+    store.upsert("close", listing.vec, _metadata())
+    assert [cache.get(key) is not None for key in keys[-4:]] == [False, True, False, True]
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pytest
+
+from backend.matching.engine import MatchingEngine, RecyclerProfile, WasteListing
+from backend.vector_store.faiss_store import FAISSVectorStore
+from backend.vector_store.index_spec import IndexSpec
+
+DIM = 16
+N = 1500
+
+
+def _listing_store(spec: str) -> FAISSVectorStore:
+    rng = np.random.default_rng(1)
+    store = FAISSVectorStore(dim=DIM, index_spec=IndexSpec.parse(spec), compaction_threshold=None, merge_threshold=400)
+    metadatas = [
+        {
+            "type": "listing",
+            "location": {"lat": float(rng.uniform(8, 35)), "lng": float(rng.uniform(68, 97))},
+            "quantity": float(rng.uniform(1, 200)),
+            "tags": list(rng.choice(["circular", "local", "zero-waste"], size=int(rng.integers(0, 3)), replace=False)),
+        }
+        for _ in range(N)
+    ]
+    store.add_embeddings([f"l{i}" for i in range(N)], rng.standard_normal((N, DIM)), metadatas)
+    return store
+
+
+def _recycler() -> RecyclerProfile:
+    return RecyclerProfile(
+        id="r0",
+        location={"lat": 19.0, "lng": 73.0},
+        goals=["Circular", "local"],
+        remaining_capacity=80.0,
+        vec=np.random.default_rng(7).standard_normal(DIM).astype("float32"),
+    )
+
+
+def _brute_force(engine: MatchingEngine, store: FAISSVectorStore, recycler: RecyclerProfile, radius: Optional[float]):
+    query = recycler.vec / np.linalg.norm(recycler.vec)
+    ranked = []
+    for item_id in store.item_ids():
+        md = store.metadata(item_id)
+        listing = WasteListing(
+            id=item_id,
+            description="",
+            image_url=None,
+            quantity=md["quantity"],
+            location=md["location"],
+            tags=md["tags"],
+        )
+        result = engine.compute_match_score(listing, recycler, float(query @ store.vector(item_id)))
+        if radius is None or result["distance_km"] <= radius:
+            ranked.append((result["match_score"], item_id))
+    return sorted(ranked, reverse=True)
+
+
+def _all_pages(engine: MatchingEngine, recycler: RecyclerProfile, limit: int, radius: Optional[float]):
+    rows, cursor = [], None
+    while True:
+        page, cursor = engine.find_best_listings(recycler, limit=limit, cursor=cursor, max_radius_km=radius)
+        assert len(page) == limit or cursor is None
+        rows.extend(page)
+        if cursor is None:
+            return rows
+
+
+@pytest.mark.parametrize("radius", [None, 800.0])
+def test_pages_concatenate_to_the_exact_ranking(radius):
+    store = _listing_store("flat")
+    engine = MatchingEngine(vector_store=FAISSVectorStore(dim=DIM), listing_store=store)
+    recycler = _recycler()
+    rows = _all_pages(engine, recycler, 40, radius)
+    expected = _brute_force(engine, store, recycler, radius)
+    assert [row["match_score"] for row in rows] == pytest.approx([score for score, _ in expected], abs=1e-4)
+    assert sorted(row["listing_id"] for row in rows) == sorted(item_id for _, item_id in expected)
+
+
+@pytest.mark.parametrize("radius", [None, 800.0])
+def test_hnsw_pages_are_ordered_without_duplicates(radius):
+    store = _listing_store("hnsw")
+    engine = MatchingEngine(vector_store=FAISSVectorStore(dim=DIM), listing_store=store)
+    recycler = _recycler()
+    rows = _all_pages(engine, recycler, 100, radius)
+    ids = [row["listing_id"] for row in rows]
+    assert len(set(ids)) == len(ids)
+    scores = [row["match_score"] for row in rows]
+    assert scores == sorted(scores, reverse=True)
+    expected = {item_id for _, item_id in _brute_force(engine, store, recycler, radius)}
+    if radius is not None:
+        assert set(ids) == expected  # a small candidate set is scored exactly
+    else:
+        # A listing the graph search under-ranks can fall behind the cursor, but the last
+        # pages score every row exactly instead of stopping where HNSW runs dry
+        assert len(set(ids) & expected) >= 0.99 * len(expected)
+
+
+def test_invalid_cursor_is_rejected():
+    engine = MatchingEngine(vector_store=FAISSVectorStore(dim=DIM), listing_store=_listing_store("flat"))
+    with pytest.raises(ValueError):
+        engine.find_best_listings(_recycler(), cursor="not-a-cursor")
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.db import Base
+from backend.matching.engine import MatchingEngine, WasteListing
+from backend.matching.recycler_attributes import RecyclerAttributes
+from backend.models import Recycler
+from backend.vector_store.faiss_store import FAISSVectorStore
+
+DIM = 8
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(Recycler(id="r1", capacity=10.0, location_lat=19.0, location_lng=73.0, sustainability_goals="local"))
+        db.commit()
+    return factory
+
+
+def _race(attributes: RecyclerAttributes, callers: int, amount: float):
+    start = threading.Barrier(callers)
+    results = []
+
+    def accept():
+        start.wait()
+        results.append(attributes.decrement("r1", amount))
+
+    threads = [threading.Thread(target=accept) for _ in range(callers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_racing_decrements_never_overbook_in_memory():
+    attributes = RecyclerAttributes()
+    attributes.set("r1", remaining_capacity=10.0)
+    results = _race(attributes, 16, 3.0)
+    assert sorted(r for r in results if r is not None) == [1.0, 4.0, 7.0]
+    assert results.count(None) == 13
+    assert attributes.get("r1")["remaining_capacity"] == 1.0
+
+
+def test_racing_decrements_never_overbook_in_the_database(sessions):
+    attributes = RecyclerAttributes(session_factory=sessions)
+    attributes.refresh()
+    results = _race(attributes, 8, 3.0)
+    assert len([r for r in results if r is not None]) == 3
+    with sessions() as db:
+        assert db.get(Recycler, "r1").capacity == 1.0
+    assert attributes.get("r1")["remaining_capacity"] == 1.0
+
+
+def test_decrement_of_an_unknown_recycler_raises(sessions):
+    with pytest.raises(KeyError):
+        RecyclerAttributes().decrement("nope", 1.0)
+    with pytest.raises(KeyError):
+        RecyclerAttributes(session_factory=sessions).decrement("nope", 1.0)
+
+
+def test_refresh_picks_up_database_changes(sessions):
+    attributes = RecyclerAttributes(session_factory=sessions)
+    seen = []
+    attributes.add_listener(lambda recycler_id, values: seen.append((recycler_id, values)))
+    assert attributes.refresh() == 1
+    assert attributes.refresh() == 0  # nothing changed
+    with sessions() as db:  # another worker writes
+        db.get(Recycler, "r1").capacity = 4.0
+        db.get(Recycler, "r1").sustainability_goals = "circular, zero-waste"
+        db.commit()
+    assert attributes.refresh() == 1
+    assert attributes.get("r1") == {
+        "remaining_capacity": 4.0,
+        "location": {"lat": 19.0, "lng": 73.0},
+        "goals": ["circular", "zero-waste"],
+    }
+    assert seen[-1][0] == "r1" and seen[-1][1]["remaining_capacity"] == 4.0
+
+
+def test_set_writes_through_to_the_database(sessions):
+    attributes = RecyclerAttributes(session_factory=sessions)
+    attributes.set("r1", location={"lat": 51.5, "lng": -0.1})
+    with sessions() as db:
+        assert (db.get(Recycler, "r1").location_lat, db.get(Recycler, "r1").location_lng) == (51.5, -0.1)
+    with pytest.raises(KeyError):
+        attributes.set("nope", remaining_capacity=1.0)
+
+
+def test_radius_filter_uses_live_locations():
+    rng = np.random.default_rng(0)
+    store = FAISSVectorStore(dim=DIM, compaction_threshold=None)
+    near, far = {"lat": 19.0, "lng": 73.0}, {"lat": 28.6, "lng": 77.2}  # Mumbai, Delhi
+    store.add_embeddings(
+        ["stays", "leaves", "arrives"],
+        rng.standard_normal((3, DIM)),
+        [{"type": "recycler", "location": loc, "remaining_capacity": 10.0} for loc in (near, near, far)],
+    )
+    attributes = RecyclerAttributes()
+    engine = MatchingEngine(vector_store=store, attributes=attributes)
+    listing = WasteListing(
+        id="l1", description="", image_url=None, quantity=1.0, location=near, tags=[], vec=rng.standard_normal(DIM)
+    )
+    assert {r["recycler_id"] for r in engine.find_best_recyclers(listing, max_radius_km=100.0)} == {"stays", "leaves"}
+
+    attributes.set("leaves", location={"lat": 51.5, "lng": -0.1})  # London
+    attributes.set("arrives", location={"lat": 19.01, "lng": 73.01})
+    matches = engine.find_best_recyclers(listing, max_radius_km=100.0)
+    assert {r["recycler_id"] for r in matches} == {"stays", "arrives"}
+    assert all(r["distance_km"] <= 100.0 for r in matches)
+    batch = engine.find_best_recyclers_batch([listing], max_radius_km=100.0)[0]
+    assert {r["recycler_id"] for r in batch} == {"stays", "arrives"}
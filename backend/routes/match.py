@@ -1,48 +1,307 @@
 from __future__ import annotations
 
+import asyncio
 import os
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Awaitable, Dict, List, Optional, TypeVar
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request
+from pydantic import BaseModel, Field
 
-from backend.ai.embedding_service import get_embedding_dimension, get_waste_embedding
-from backend.db import SessionLocal
-from backend.matching.engine import MatchingEngine, WasteListing
-from backend.vector_store.faiss_store import FAISSVectorStore
-from backend.models import WasteListing as DBListing
+from backend.ai.embedding_service import get_waste_embedding
+from backend.db import SessionLocal, get_async_sessionmaker
+from backend.executors import ExecutorBusy, model_executor, search_executor
+from backend.matching.engine import MatchingEngine, RecyclerProfile, WasteListing
+from backend.matching.match_cache import MatchCache, get_match_cache
+from backend.vector_store.bitsets import split_terms
+from backend.vector_store.namespaces import LISTINGS, RECYCLERS
+from backend.models import Recycler, WasteListing as DBListing
+
+if TYPE_CHECKING:
+    from backend.matching.recycler_attributes import RecyclerAttributes
+    from backend.vector_store.faiss_store import FAISSVectorStore
+    from backend.vector_store.manager import VectorStoreManager
 
 
 router = APIRouter()
 
+MATCH_TOP_K = 10
+# Whole-request budget of GET /match/{listing_id}; past it the work is cancelled and the client gets a 504
+MATCH_TIMEOUT_SECONDS = float(os.getenv("MATCH_TIMEOUT_SECONDS", "10"))
+
+T = TypeVar("T")
+
+
+def _get_manager(request: Request) -> VectorStoreManager:
+    # Shared store loaded during warmup; the manager swaps it when the index is rebuilt
+    manager = request.app.state.warmup.manager
+    if manager is None:
+        raise HTTPException(status_code=503, detail="Matching service is warming up")
+    return manager
+
+
+def _get_store(request: Request, namespace: str = RECYCLERS) -> FAISSVectorStore:
+    return _get_manager(request).current().namespace(namespace)
+
+
+def _get_attributes(request: Request) -> RecyclerAttributes:
+    # Loaded right after the index during warmup
+    attributes = request.app.state.warmup.attributes
+    if attributes is None:
+        raise HTTPException(status_code=503, detail="Matching service is warming up")
+    return attributes
+
+
+def _to_listing(row: DBListing) -> WasteListing:
+    return WasteListing(
+        id=row.id,
+        description=row.description or "",
+        image_url=row.image_url,
+        quantity=float(row.quantity or 0.0),
+        location={"lat": row.location_lat or 0.0, "lng": row.location_lng or 0.0},
+        tags=split_terms(row.tags),
+        vec=None,
+        material_type=row.material_type,
+    )
+
+
+def _to_recycler(row: Recycler) -> RecyclerProfile:
+    return RecyclerProfile(
+        id=row.id,
+        location={"lat": row.location_lat or 0.0, "lng": row.location_lng or 0.0},
+        goals=split_terms(row.sustainability_goals),
+        remaining_capacity=float(row.capacity or 0.0),
+        vec=None,
+    )
+
+
+def _load_listings(listing_ids: List[str]) -> Dict[str, WasteListing]:
+    db = SessionLocal()
+    try:
+        rows = db.query(DBListing).filter(DBListing.id.in_(listing_ids)).all()
+        return {row.id: _to_listing(row) for row in rows}
+    finally:
+        db.close()
+
+
+async def _load_listing(listing_id: str) -> Optional[WasteListing]:
+    async with get_async_sessionmaker()() as db:
+        row = await db.get(DBListing, listing_id)
+        return _to_listing(row) if row is not None else None
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # The request has no body, so the next ASGI message is the client going away
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _bounded(request: Request, work: Awaitable[T], timeout: float) -> T:
+    """
+    Await ``work`` for at most ``timeout`` seconds while the client is connected, else cancel it:
+    504 on timeout, 499 when the client left.
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        task.cancel()  # the handler itself was cancelled
+        raise
+    finally:
+        watcher.cancel()
+    if task in done:
+        return task.result()
+    task.cancel()
+    if watcher in done:
+        raise HTTPException(status_code=499, detail="Client closed request")
+    raise HTTPException(status_code=504, detail="Matching timed out")
+
+
+async def _match(request: Request, listing_id: str, max_radius_km: Optional[float]) -> Dict[str, Any]:
+    version, current = _get_manager(request).current_versioned()
+    store = current.namespace(RECYCLERS)
+    attributes = _get_attributes(request)
+    listing = await _load_listing(listing_id)
+    if listing is None:
+        raise HTTPException(status_code=404, detail="Listing not found")
 
-def _get_store() -> FAISSVectorStore:
-    # Persist FAISS index from env path
-    index_path = os.getenv("VECTOR_INDEX_PATH", "backend/vector_index.faiss")
-    return FAISSVectorStore(dim=get_embedding_dimension(), index_path=index_path)
+    cache = get_match_cache()
+    if cache is not None:
+        cache.attach(store, version)
+        key = cache.key(listing, version, MATCH_TOP_K, max_radius_km)
+        cached = cache.get(key)
+        if cached is not None:
+            return {"listing_id": listing_id, "matches": cached, "candidates_scanned": 0, "cached": True}
+        token = cache.token()
+
+    # Blocking work runs on dedicated pools, so slow image downloads only hold model
+    # threads while searches, cache hits and other endpoints keep being served
+    listing.vec = await model_executor().run(get_waste_embedding, listing.description, listing.image_url)
+    engine = MatchingEngine(vector_store=store, attributes=attributes)
+    stats: Dict[str, int] = {}
+    ranked = await search_executor().run(
+        engine.find_best_recyclers, listing, top_k=MATCH_TOP_K, max_radius_km=max_radius_km, stats=stats
+    )
+    if cache is not None:
+        cache.put(key, listing, ranked, token=token)
+    return {
+        "listing_id": listing_id,
+        "matches": ranked,
+        "candidates_scanned": stats.get("candidates_scanned", 0),
+        "cached": False,
+    }
 
 
 @router.get("/match/{listing_id}")
-def get_matches(listing_id: str) -> Dict[str, Any]:
+async def get_matches(listing_id: str, request: Request, max_radius_km: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Best recyclers for a listing, computed on bounded executors within ``MATCH_TIMEOUT_SECONDS``
+    (503 when they are saturated).
+    """
+    try:
+        return await _bounded(request, _match(request, listing_id, max_radius_km), MATCH_TIMEOUT_SECONDS)
+    except ExecutorBusy:
+        raise HTTPException(status_code=503, detail="Matching service is overloaded", headers={"Retry-After": "1"})
+
+
+class PrewarmRequest(BaseModel):
+    listing_ids: List[str] = Field(..., min_length=1, max_length=10_000)
+    max_radius_km: Optional[float] = None
+
+
+def _prewarm(
+    cache: MatchCache, engine: MatchingEngine, version: int, listings: List[WasteListing], max_radius_km: Optional[float]
+) -> None:
+    token = cache.token()
+    ranked = engine.find_best_recyclers_batch(listings, top_k=MATCH_TOP_K, max_radius_km=max_radius_km)
+    for listing, matches in zip(listings, ranked):
+        cache.put(cache.key(listing, version, MATCH_TOP_K, max_radius_km), listing, matches, token=token)
+
+
+@router.post("/match/prewarm", status_code=202)
+def prewarm_matches(body: PrewarmRequest, request: Request, background: BackgroundTasks) -> Dict[str, Any]:
+    """
+    Compute and cache the matches of (e.g. newly created) listings in the background,
+    so their first ``GET /match/{listing_id}`` is already a cache hit.
+    """
+    cache = get_match_cache()
+    if cache is None:
+        raise HTTPException(status_code=409, detail="Match cache is disabled (MATCH_CACHE_SIZE=0)")
+    version, current = _get_manager(request).current_versioned()
+    store = current.namespace(RECYCLERS)
+    cache.attach(store, version)
+    wanted = list(dict.fromkeys(body.listing_ids))
+    found = _load_listings(wanted)
+    listings = [found[i] for i in wanted if i in found]
+    if listings:
+        engine = MatchingEngine(vector_store=store, attributes=_get_attributes(request))
+        background.add_task(_prewarm, cache, engine, version, listings, body.max_radius_km)
+    return {"scheduled": len(listings), "not_found": [i for i in wanted if i not in found]}
+
+
+class BatchMatchRequest(BaseModel):
+    listing_ids: List[str] = Field(..., min_length=1, max_length=10_000)
+    candidates_per_listing: int = Field(20, ge=1, le=200)
+    max_radius_km: Optional[float] = None
+
+
+@router.post("/match/batch")
+def assign_batch(body: BatchMatchRequest, request: Request) -> Dict[str, Any]:
+    """
+    Assign many listings at once, each to at most one recycler, without exceeding any recycler's
+    remaining capacity.
+    """
+    store = _get_store(request)
+    wanted = list(dict.fromkeys(body.listing_ids))
+    found = _load_listings(wanted)
+    listings = [found[i] for i in wanted if i in found]
+
+    engine = MatchingEngine(vector_store=store, attributes=_get_attributes(request))
+    assignments, stats = engine.assign_listings(
+        listings, candidates_per_listing=body.candidates_per_listing, max_radius_km=body.max_radius_km
+    )
+    return {
+        "assignments": assignments,
+        "not_found": [i for i in wanted if i not in found],
+        "stats": stats,
+    }
+
+
+@router.get("/recyclers/{recycler_id}/listings")
+def get_listings_for_recycler(
+    recycler_id: str,
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    max_radius_km: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Reverse matching: listings that fit a recycler's intake, best first. Pass the
+    returned ``next_cursor`` back as ``cursor`` for the next page.
+    """
+    recycler_store = _get_store(request)
+    listing_store = _get_store(request, LISTINGS)
     db = SessionLocal()
     try:
-        row = db.query(DBListing).filter(DBListing.id == listing_id).first()
+        row = db.query(Recycler).filter(Recycler.id == recycler_id).first()
         if not row:
-            raise HTTPException(status_code=404, detail="Listing not found")
-        listing = WasteListing(
-            id=row.id,
-            description=row.description or "",
-            image_url=row.image_url,
-            quantity=float(row.quantity or 0.0),
-            location={"lat": row.location_lat or 0.0, "lng": row.location_lng or 0.0},
-            tags=[t.strip() for t in (row.tags or "").split(",") if t.strip()],
-            vec=None,
-        )
+            raise HTTPException(status_code=404, detail="Recycler not found")
+        recycler = _to_recycler(row)
+        profile_text = row.profile_text or ""
     finally:
         db.close()
 
-    engine = MatchingEngine(vector_store=_get_store())
-    ranked = engine.find_best_recyclers(listing, top_k=10)
-    return {"listing_id": listing_id, "matches": ranked}
+    # Reuse the indexed profile vector; only recyclers added since the last index build need the model
+    recycler.vec = recycler_store.vector(recycler_id)
+    if recycler.vec is None:
+        recycler.vec = get_waste_embedding(profile_text)
 
+    engine = MatchingEngine(
+        vector_store=recycler_store, listing_store=listing_store, attributes=_get_attributes(request)
+    )
+    try:
+        page, next_cursor = engine.find_best_listings(
+            recycler, limit=limit, cursor=cursor, max_radius_km=max_radius_km
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"recycler_id": recycler_id, "listings": page, "next_cursor": next_cursor}
 
 
+class AcceptRequest(BaseModel):
+    quantity: float = Field(..., gt=0)
+
+
+@router.post("/recyclers/{recycler_id}/accept")
+def accept_quantity(recycler_id: str, body: AcceptRequest, request: Request) -> Dict[str, Any]:
+    """
+    Take an accepted listing's quantity off the recycler's remaining capacity.
+    Atomic across workers; 409 if the recycler does not have that much left.
+    """
+    attributes = _get_attributes(request)
+    try:
+        remaining = attributes.decrement(recycler_id, body.quantity)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Recycler not found")
+    if remaining is None:
+        raise HTTPException(status_code=409, detail="Not enough remaining capacity")
+    return {"recycler_id": recycler_id, "remaining_capacity": remaining}
+
+
+class RecyclerAttributesUpdate(BaseModel):
+    remaining_capacity: Optional[float] = Field(None, ge=0)
+    location: Optional[Dict[str, float]] = None
+    goals: Optional[List[str]] = None
+
+
+@router.patch("/recyclers/{recycler_id}")
+def update_recycler(recycler_id: str, body: RecyclerAttributesUpdate, request: Request) -> Dict[str, Any]:
+    """Change a recycler's capacity, location or goals; matching uses them right away, without re-embedding."""
+    attributes = _get_attributes(request)
+    try:
+        values = attributes.set(
+            recycler_id, remaining_capacity=body.remaining_capacity, location=body.location, goals=body.goals
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Recycler not found")
+    return {"recycler_id": recycler_id, **values}
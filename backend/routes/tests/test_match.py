@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import backend.routes.match as match_routes
+from backend.db import Base
+from backend.executors import BoundedExecutor
+from backend.matching import match_cache
+from backend.matching.recycler_attributes import RecyclerAttributes
+from backend.models import WasteListing
+from backend.vector_store.namespaced import NamespacedVectorStore
+from backend.vector_store.namespaces import RECYCLERS
+
+DIM = 8
+
+
+def _vector(text: str) -> np.ndarray:
+    return np.random.default_rng(abs(hash(text)) % 2**32).standard_normal(DIM).astype("float32")
+
+
+class _Manager:
+    def __init__(self, store: NamespacedVectorStore) -> None:
+        self.store = store
+
+    def current(self) -> NamespacedVectorStore:
+        return self.store
+
+    def current_versioned(self):
+        return 1, self.store
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(sync_engine)
+    with sessionmaker(bind=sync_engine)() as db:
+        db.add(WasteListing(id="l1", material_type="plastic", quantity=5.0, description="pet bottles", tags="circular"))
+        db.commit()
+    async_engine = create_async_engine(url.replace("sqlite:", "sqlite+aiosqlite:"))
+    monkeypatch.setattr(match_routes, "get_async_sessionmaker", lambda: async_sessionmaker(async_engine))
+
+    store = NamespacedVectorStore(dim=DIM, compaction_threshold=None)
+    rng = np.random.default_rng(0)
+    store.namespace(RECYCLERS).add_embeddings(
+        [f"r{i}" for i in range(50)],
+        rng.standard_normal((50, DIM)),
+        [{"type": "recycler", "remaining_capacity": 10.0, "accepted_materials": ["plastic"]}] * 50,
+    )
+    # The model is not loaded in tests; embeddings are deterministic per text
+    monkeypatch.setattr(match_routes, "get_waste_embedding", lambda text, image_url=None: _vector(text))
+    attributes = RecyclerAttributes()
+    cache = match_cache.MatchCache()
+    cache.watch_attributes(attributes)  # as warmup wires them
+    monkeypatch.setattr(match_cache, "_cache", cache)
+
+    app = FastAPI()
+    app.state.warmup = SimpleNamespace(manager=_Manager(store), attributes=attributes)
+    app.include_router(match_routes.router, prefix="/api")
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_match_returns_ranked_recyclers_then_a_cache_hit(client):
+    first = client.get("/api/match/l1")
+    assert first.status_code == 200
+    body = first.json()
+    assert len(body["matches"]) == match_routes.MATCH_TOP_K and body["cached"] is False
+    scores = [m["match_score"] for m in body["matches"]]
+    assert scores == sorted(scores, reverse=True)
+
+    second = client.get("/api/match/l1").json()
+    assert second["cached"] is True and second["matches"] == body["matches"]
+
+
+def test_unknown_listing_is_404(client):
+    assert client.get("/api/match/missing").status_code == 404
+
+
+def test_slow_embedding_times_out(client, monkeypatch):
+    monkeypatch.setattr(match_routes, "MATCH_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(match_routes, "get_waste_embedding", lambda text, image_url=None: time.sleep(0.3) or _vector(text))
+    assert client.get("/api/match/l1").status_code == 504
+
+
+def test_saturated_executor_sheds_load(client, monkeypatch):
+    busy = BoundedExecutor("model", workers=1, max_queue=0)
+    busy._slots.acquire()  # the only slot is taken
+    monkeypatch.setattr(match_routes, "model_executor", lambda: busy)
+    response = client.get("/api/match/l1")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_accept_takes_capacity_and_refuses_overbooking(client):
+    assert client.post("/api/recyclers/r3/accept", json={"quantity": 1.0}).status_code == 404
+    assert client.patch("/api/recyclers/r3", json={"remaining_capacity": 8.0}).status_code == 200
+    accepted = client.post("/api/recyclers/r3/accept", json={"quantity": 5.0})
+    assert accepted.status_code == 200 and accepted.json()["remaining_capacity"] == 3.0
+    refused = client.post("/api/recyclers/r3/accept", json={"quantity": 5.0})
+    assert refused.status_code == 409
+    assert client.post("/api/recyclers/r3/accept", json={"quantity": 3.0}).json()["remaining_capacity"] == 0.0
+
+
+def test_patch_changes_the_next_match(client):
+    first = client.get("/api/match/l1").json()["matches"]
+    top = first[0]["recycler_id"]
+    patched = client.patch(
+        f"/api/recyclers/{top}", json={"remaining_capacity": 0.0, "location": {"lat": 51.5, "lng": -0.1}}
+    )
+    assert patched.json()["remaining_capacity"] == 0.0
+
+    after = client.get("/api/match/l1").json()
+    assert after["cached"] is False  # the change invalidated the cached ranking
+    moved = [m for m in after["matches"] if m["recycler_id"] == top]
+    assert not moved or (moved[0]["capacity_score"] == 0.0 and moved[0]["distance_km"] > 5000)
+    assert after["matches"][0]["recycler_id"] != top
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import pytest
+
+from backend.db import async_database_url
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("sqlite:///./backend/app.db", "sqlite+aiosqlite:///./backend/app.db"),
+        ("sqlite+pysqlite:///:memory:", "sqlite+aiosqlite:///:memory:"),
+        ("postgresql://u:p%40ss@db:5432/app", "postgresql+asyncpg://u:p%40ss@db:5432/app"),
+        ("postgresql+psycopg2://u:p@db/app", "postgresql+asyncpg://u:p@db/app"),
+        ("postgres://u:p@db/app", "postgresql+asyncpg://u:p@db/app"),
+        ("postgresql+asyncpg://u:p@db/app", "postgresql+asyncpg://u:p@db/app"),
+        ("mysql+pymysql://u:p@db/app", "mysql+pymysql://u:p@db/app"),
+    ],
+)
+def test_async_database_url_swaps_the_driver(url, expected):
+    assert async_database_url(url) == expected
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+
+def test_importing_the_app_does_not_load_heavy_modules():
+    # A fresh interpreter, since other tests import faiss into this one
+    code = (
+        "import sys, backend.main; "
+        "print(','.join(m for m in ('faiss', 'torch', 'sentence_transformers') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
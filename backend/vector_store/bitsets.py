@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+WORD_BITS = 64
+
+# Set bits per byte value; numpy < 2.0 has no ``bitwise_count``
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype="uint8")
+
+
+def split_terms(csv: Optional[str]) -> List[str]:
+    """Parse a comma-separated terms column: trimmed, empties dropped, case-insensitive duplicates removed."""
+    seen = set()
+    terms: List[str] = []
+    for raw in (csv or "").split(","):
+        term = raw.strip()
+        if term and term.lower() not in seen:
+            seen.add(term.lower())
+            terms.append(term)
+    return terms
+
+
+def n_words(n_terms: int) -> int:
+    """uint64 words per bitset for a vocabulary of ``n_terms``."""
+    return max(1, -(-n_terms // WORD_BITS))
+
+
+def popcount(bits: np.ndarray) -> np.ndarray:
+    """Number of set bits in each row of an ``(n, words)`` uint64 array."""
+    bits = np.ascontiguousarray(bits, dtype="uint64")
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bits).sum(axis=1, dtype="int64")
+    return _POPCOUNT8[bits.view("uint8")].reshape(len(bits), bits.shape[1] * 8).sum(axis=1, dtype="int64")
+
+
+def pack_rows(offsets: np.ndarray, codes: np.ndarray, words: int) -> np.ndarray:
+    """Turn CSR rows of integer term codes into an ``(n, words)`` uint64 bitset per row."""
+    n = len(offsets) - 1
+    bits = np.zeros((n, words), dtype="uint64")
+    codes = np.asarray(codes, dtype="int64")
+    if len(codes):
+        rows = np.repeat(np.arange(n, dtype="int64"), np.diff(offsets))
+        masks = np.left_shift(np.uint64(1), (codes % WORD_BITS).astype("uint64"))
+        np.bitwise_or.at(bits, (rows, codes // WORD_BITS), masks)
+    return bits
+
+
+def pack_codes(codes: Iterable[int], words: int) -> np.ndarray:
+    """One ``(words,)`` bitset with the given codes set."""
+    codes = np.fromiter(codes, dtype="int64")
+    return pack_rows(np.array([0, len(codes)], dtype="int64"), codes, words)[0]
+
+
+def widen(bits: np.ndarray, words: int) -> np.ndarray:
+    """Zero-pad ``(n, w)`` bitsets to ``words`` words (the vocabulary grew since they were packed)."""
+    if bits.shape[1] >= words:
+        return bits
+    out = np.zeros((len(bits), words), dtype="uint64")
+    out[:, : bits.shape[1]] = bits
+    return out
+
+
+def query_bits(index: Dict[str, int], terms: Iterable[str], words: int) -> Tuple[np.ndarray, int]:
+    """
+    Bitset of ``terms`` over a case-folded vocabulary ``index`` and the number of distinct terms
+    (unknown terms count toward the union but never intersect).
+    """
+    wanted = {t.lower() for t in terms}
+    return pack_codes((index[t] for t in wanted if t in index), words), len(wanted)
+
+
+def jaccard_bits(rows: np.ndarray, query: np.ndarray, query_size: int) -> np.ndarray:
+    """Jaccard similarity of every row bitset with ``query`` (``query_size`` distinct terms), by popcount."""
+    words = max(rows.shape[1], len(query))
+    rows = widen(rows, words)
+    query = widen(query.reshape(1, -1), words)[0]
+    inter = popcount(rows & query)
+    union = popcount(rows) + query_size - inter
+    return np.where(union > 0, inter / np.maximum(union, 1), 0.0)
@@ -1,97 +1,816 @@
 from __future__ import annotations
 
+import base64
+import json
+import logging
 import os
 import threading
+import time
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
 
 import faiss  # type: ignore
 import numpy as np
 
+from backend.vector_store.geo import haversine_km_array
+from backend.vector_store.index_spec import IndexSpec
+from backend.vector_store.metadata import MAGIC as META_MAGIC, MetadataTable
+
 
 @dataclass
 class VectorRecord:
     item_id: str
-    vector: np.ndarray
+    vector: Optional[np.ndarray]  # not kept in memory; the index already holds it
     metadata: Dict
 
 
+@dataclass(frozen=True)
+class _Snapshot:
+    """Everything a search reads, published as one immutable unit."""
+
+    index: faiss.Index
+    meta: MetadataTable
+    dead: FrozenSet[int]
+    dead_ids: np.ndarray  # ``dead`` as a sorted array, for ``np.isin``
+    dead_selector: Optional[faiss.IDSelector]
+    delta_ids: np.ndarray
+    delta_vecs: np.ndarray
+    delta_dead: np.ndarray  # bool mask over delta_ids
+
+
+# (item_id, metadata, unit vector) of an upsert, or (item_id, None, None) of a delete
+StoreChange = Tuple[str, Optional[Dict], Optional[np.ndarray]]
+
+
+def metadata_path(index_path: str) -> str:
+    return index_path + ".meta"
+
+
+def resolve_metadata(index_path: str) -> Optional[str]:
+    """
+    The metadata table of a persisted store: ``<index_path>.meta`` itself, or the generation file it names.
+    Tables are written under fresh names because a mapped file cannot be replaced on Windows.
+    """
+    sidecar = metadata_path(index_path)
+    try:
+        with open(sidecar, "rb") as fh:
+            head = fh.read(len(META_MAGIC))
+            if head == META_MAGIC:
+                return sidecar
+            name = (head + fh.read()).decode("utf-8").strip()
+    except OSError:
+        return None
+    return os.path.join(os.path.dirname(sidecar), name) if name else None
+
+
+def store_files(index_path: str) -> List[str]:
+    """Every file that makes up a persisted store: index, metadata pointer (or table) and write-ahead log."""
+    return [index_path, metadata_path(index_path), index_path + ".wal"]
+
+
+logger = logging.getLogger(__name__)
+
+# Pending metadata rows are folded into the columns once there are this many and they
+# make up 1/FOLD_FRACTION of the table (and whenever the staging buffer is merged)
+FOLD_MIN_ROWS = 1024
+FOLD_FRACTION = 32
+
+
+def read_index_mmap(path: str) -> faiss.Index:
+    """
+    Open an index read-only with its payload memory-mapped, so every process that
+    serves the same file shares one copy in the page cache.
+    """
+    with open(path, "rb") as fh:
+        fourcc = fh.read(4)
+    # IVF indexes (fourcc "Iw..") map their inverted lists with IO_FLAG_MMAP; flat and
+    # HNSW storage (IDMap2-wrapped) needs IO_FLAG_MMAP_IFC, added in faiss 1.11
+    flags = faiss.IO_FLAG_MMAP
+    if not fourcc.startswith(b"Iw"):
+        mmap_ifc = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+        if mmap_ifc is None:
+            logger.warning("faiss %s cannot memory-map %s; every worker loads its own copy", faiss.__version__, path)
+        else:
+            flags = mmap_ifc
+    return faiss.read_index(path, flags | faiss.IO_FLAG_READ_ONLY)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    mat = np.ascontiguousarray(matrix, dtype="float32")
+    if mat.ndim == 1:
+        mat = mat.reshape(1, -1)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
 class FAISSVectorStore:
     """
-    Lightweight FAISS-backed vector store with in-memory metadata map.
-    Persists index to a file when ``index_path`` is provided.
+    Lightweight FAISS-backed vector store with a columnar metadata table, searched lock-free from snapshots.
+    Persists index to a file when ``index_path`` is provided, logging writes to ``<index_path>.wal`` until a flush.
     """
 
-    def __init__(self, dim: int, index_path: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        dim: int,
+        index_path: Optional[str] = None,
+        flush_every: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        use_wal: bool = True,
+        index_spec: Optional[IndexSpec] = None,
+        compaction_threshold: Optional[float] = 0.2,
+        merge_threshold: int = 10_000,
+        read_only: bool = False,
+    ) -> None:
         self.dim = dim
+        self.index_spec = index_spec or IndexSpec()
         self.index_path = index_path
-        self._index = faiss.IndexFlatIP(dim)
-        self._id_to_meta: Dict[int, VectorRecord] = {}
-        self._next_int_id = 0
-        self._lock = threading.Lock()
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.read_only = read_only
+        self.use_wal = use_wal and index_path is not None and not read_only
+        self.compaction_threshold = compaction_threshold
+        self.merge_threshold = merge_threshold
+        # Writer-side state; only touched with ``_write_lock`` held
+        self._index = self.index_spec.build(dim)
+        self._meta = MetadataTable()
+        self._item_to_id: Dict[str, int] = {}
+        self._delta_ids = np.empty(0, dtype="int64")
+        self._delta_vecs = np.empty((0, dim), dtype="float32")
+        self._write_lock = threading.Lock()
+        self._dead_changed = True  # tombstones added or dropped since the last snapshot
+        self._compacting = False
+        self._listeners: List[Callable[[List[StoreChange]], None]] = []
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._flush_timer: Optional[threading.Timer] = None
 
         # Load existing index if present
         if index_path and os.path.exists(index_path):
             try:
-                self._index = faiss.read_index(index_path)
-                # We still need metadata; keep it separate in a sidecar npz if present
-                sidecar = index_path + ".meta.npz"
-                if os.path.exists(sidecar):
-                    data = np.load(sidecar, allow_pickle=True)
-                    stored = data.get("records", [])
-                    for rec in stored:
-                        self._id_to_meta[int(rec[0])] = VectorRecord(
-                            item_id=str(rec[1]), vector=rec[2], metadata=rec[3]
-                        )
-                    if len(self._id_to_meta) > 0:
-                        self._next_int_id = max(self._id_to_meta.keys()) + 1
+                raw = read_index_mmap(index_path) if read_only else faiss.read_index(index_path)
+                self._index = self._ensure_id_mapped(raw)
+                self.index_spec.apply_defaults(self._index)
+                # We still need metadata; keep it separate in a sidecar table if present
+                sidecar = resolve_metadata(index_path)
+                if sidecar is not None:
+                    self._meta = MetadataTable.load(sidecar)
+                elif os.path.exists(index_path + ".meta.npz"):
+                    self._meta = MetadataTable.from_legacy_npz(index_path + ".meta.npz")
+                self._item_to_id = {item_id: internal_id for internal_id, item_id in self._meta.item_ids()}
             except Exception:
+                logger.exception("Could not load vector index %s; starting empty", index_path)
                 # Start fresh if loading fails
-                self._index = faiss.IndexFlatIP(dim)
-                self._id_to_meta = {}
-                self._next_int_id = 0
+                self._index = self.index_spec.build(dim)
+                self._meta = MetadataTable()
+                self._item_to_id = {}
+
+        if self.use_wal:
+            self._replay_wal()
+        self._publish()
+
+    def _ensure_id_mapped(self, index: faiss.Index) -> faiss.Index:
+        """Indexes written before ids were explicit used row positions as ids; wrap them in an IDMap2."""
+        if isinstance(faiss.downcast_index(index), faiss.IndexIDMap) or faiss.try_extract_index_ivf(index) is not None:
+            return index
+        mapped = self.index_spec.build(self.dim)
+        if index.ntotal:
+            vectors = index.reconstruct_n(0, index.ntotal)
+            self._train_index(mapped, vectors)
+            mapped.add_with_ids(vectors, np.arange(index.ntotal, dtype="int64"))
+        return mapped
+
+    @property
+    def wal_path(self) -> Optional[str]:
+        return self.index_path + ".wal" if self.index_path else None
+
+    def __len__(self) -> int:
+        return len(self._item_to_id)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._item_to_id
+
+    def item_ids(self) -> List[str]:
+        with self._write_lock:
+            return list(self._item_to_id)
+
+    def metadata(self, item_id: str) -> Optional[Dict]:
+        """Stored metadata of ``item_id``, or None if it is not present."""
+        internal_id = self._item_to_id.get(item_id)
+        row = self._snap.meta.get(internal_id) if internal_id is not None else None
+        return row[1] if row is not None else None
+
+    def vector(self, item_id: str) -> Optional[np.ndarray]:
+        """Stored (unit-length) vector of ``item_id``, or None if absent or not reconstructible."""
+        internal_id = self._item_to_id.get(item_id)
+        if internal_id is None:
+            return None
+        snap = self._snap
+        staged = np.flatnonzero(snap.delta_ids == internal_id)
+        if len(staged):
+            return snap.delta_vecs[staged[0]].copy()
+        exact = snap.meta.vectors_for(np.array([internal_id], dtype="int64"))
+        if exact is not None and not np.isnan(exact[0]).any():
+            return exact[0].astype("float32")
+        try:
+            return snap.index.reconstruct(internal_id)
+        except RuntimeError:
+            return None
+
+    @property
+    def ntotal(self) -> int:
+        """Vectors physically stored, including tombstones and the staging buffer."""
+        snap = self._snap
+        return snap.index.ntotal + len(snap.delta_ids)
+
+    @property
+    def dead_fraction(self) -> float:
+        total = self.ntotal
+        return len(self._snap.dead) / total if total else 0.0
+
+    # -- snapshots -----------------------------------------------------------------
+
+    def _fold_due(self) -> bool:
+        # Folding copies every column, so it waits until pending rows are a small fraction of the table
+        pending = self._meta.pending_rows
+        return pending > 0 and pending >= max(FOLD_MIN_ROWS, len(self._meta) // FOLD_FRACTION)
+
+    def _publish(self) -> None:
+        """Expose the current writer state to readers as a new immutable snapshot."""
+        if self._fold_due():
+            self._meta.fold_pending()
+        if self._dead_changed:
+            dead = frozenset(self._meta.deleted)
+            dead_ids = np.sort(np.fromiter(dead, dtype="int64", count=len(dead)))
+            selector: Optional[faiss.IDSelector] = None
+            if dead:
+                batch = faiss.IDSelectorBatch(dead_ids)
+                selector = faiss.IDSelectorNot(batch)
+                selector.referenced_objects = [batch]  # keep the wrapped selector alive
+            delta_dead = np.isin(self._delta_ids, dead_ids)
+            self._dead_changed = False
+        else:
+            # Most writes only add live rows: reuse the dead set and selector instead of rebuilding them
+            prev = self._snap
+            dead, dead_ids, selector = prev.dead, prev.dead_ids, prev.dead_selector
+            delta_dead = np.isin(self._delta_ids, prev.delta_ids[prev.delta_dead])
+        self._snap = _Snapshot(
+            index=self._index,
+            meta=self._meta,
+            dead=dead,
+            dead_ids=dead_ids,
+            dead_selector=selector,
+            delta_ids=self._delta_ids,
+            delta_vecs=self._delta_vecs,
+            delta_dead=delta_dead,
+        )
+
+    def _merge_delta(self, ids: Optional[np.ndarray] = None, mat: Optional[np.ndarray] = None) -> None:
+        """Fold the staging buffer (plus ``ids``/``mat``) into a copy of the index and swap it in."""
+        if ids is not None:
+            all_ids = np.concatenate([self._delta_ids, ids])
+            all_vecs = np.vstack([self._delta_vecs, mat])
+        else:
+            all_ids, all_vecs = self._delta_ids, self._delta_vecs
+        if not len(all_ids):
+            return
+        # Readers may be searching self._index right now, so never mutate it in place
+        fresh = faiss.clone_index(self._index)
+        self._train_index(fresh, all_vecs)
+        fresh.add_with_ids(all_vecs, all_ids)
+        self.index_spec.apply_defaults(fresh)
+        self._index = fresh
+        self._delta_ids = np.empty(0, dtype="int64")
+        self._delta_vecs = np.empty((0, self.dim), dtype="float32")
+        # The merged rows' metadata moves into the columns too, so lookups stay vectorized
+        self._meta.fold_pending()
+
+    # -- write-ahead log -----------------------------------------------------------
+
+    def _replay_wal(self) -> None:
+        path = self.wal_path
+        if not path or not os.path.exists(path):
+            return
+        # Consecutive adds are re-inserted as one batch (an untrained IVF index needs a real sample)
+        batch: List[Dict] = []
+
+        def apply_batch() -> None:
+            if batch:
+                mat = np.vstack([np.frombuffer(base64.b64decode(e["vector"]), dtype="float32") for e in batch])
+                self._insert([e["item_id"] for e in batch], mat, [e["metadata"] for e in batch], batch[0]["id"])
+                batch.clear()
+
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-append; everything before it is intact
+                    break
+                self._unflushed += 1
+                internal_id = int(entry["id"])
+                if entry.get("op") == "delete":
+                    apply_batch()
+                    self._tombstone(internal_id)
+                elif internal_id >= self._meta.next_id + len(batch):  # older entries are already in the snapshot
+                    if batch and internal_id != batch[-1]["id"] + 1:
+                        apply_batch()
+                    batch.append(entry)
+        apply_batch()
+
+    def _append_wal(self, entries: List[Dict]) -> None:
+        with open(self.wal_path, "a", encoding="utf-8") as fh:
+            fh.write("\n".join(json.dumps(e) for e in entries) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    # -- persistence ---------------------------------------------------------------
+
+    def _write_files(self, index_path: str) -> str:
+        """Write index and metadata table for ``index_path``; returns the table's path."""
+        # The snapshot on disk has no staging buffer
+        self._merge_delta()
+        # Write to temp files and rename so readers polling the paths never see a half-written file
+        tmp_index = index_path + ".tmp"
+        faiss.write_index(self._index, tmp_index)
+        os.replace(tmp_index, index_path)
+        # The live table and readers' snapshots may map the previous table, which Windows will not
+        # let us replace: write a new file and swap the small ``.meta`` pointer to it instead
+        pointer = metadata_path(index_path)
+        generation = time.time_ns()
+        current = resolve_metadata(index_path) or ""
+        suffix = current.rsplit(".", 1)[-1]
+        if suffix.isdigit():
+            generation = max(generation, int(suffix) + 1)  # coarse clocks (Windows) can repeat
+        table = f"{pointer}.{generation:020d}"
+        self._meta.write(table)
+        with open(pointer + ".tmp", "w", encoding="utf-8") as fh:
+            fh.write(os.path.basename(table))
+        os.replace(pointer + ".tmp", pointer)
+        self._remove_old_tables(pointer, keep=table)
+        return table
+
+    @staticmethod
+    def _remove_old_tables(pointer: str, keep: str) -> None:
+        directory = os.path.dirname(pointer) or "."
+        prefix = os.path.basename(pointer) + "."
+        for name in os.listdir(directory):
+            if name.startswith(prefix) and name[len(prefix) :].isdigit() and os.path.join(directory, name) != keep:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass  # still mapped (Windows); removed by a later flush
 
     def _persist(self) -> None:
         if not self.index_path:
             return
-        faiss.write_index(self._index, self.index_path)
-        # persist sidecar metadata
-        sidecar = self.index_path + ".meta.npz"
-        records = []
-        for internal_id, rec in self._id_to_meta.items():
-            records.append(np.array([internal_id, rec.item_id, rec.vector, rec.metadata], dtype=object))
-        np.savez_compressed(sidecar, records=np.array(records, dtype=object))
+        table = self._write_files(self.index_path)
+        # Serve from the mapping again instead of the freshly concatenated in-memory columns
+        self._meta = MetadataTable.load(table)
+        legacy = self.index_path + ".meta.npz"
+        if os.path.exists(legacy):
+            os.remove(legacy)
+        # The snapshot now covers everything in the log
+        if self.use_wal and os.path.exists(self.wal_path):
+            os.remove(self.wal_path)
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
 
-    def add_embedding(self, item_id: str, vector: np.ndarray, metadata: Dict) -> None:
-        vec = vector.astype("float32")
+    def _maybe_flush(self) -> bool:
+        if not self._unflushed:
+            return False
+        if not self.use_wal:
+            # Without a log the only durable copy is the snapshot
+            due = self.flush_every is None or self._unflushed >= self.flush_every
+        else:
+            due = self.flush_every is not None and self._unflushed >= self.flush_every
+        if self.flush_interval is not None:
+            remaining = self.flush_interval - (time.monotonic() - self._last_flush)
+            if remaining <= 0:
+                due = True
+            elif self._flush_timer is None:
+                # Without further writes nothing would check the interval again
+                self._flush_timer = threading.Timer(remaining, self._flush_in_background)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+        if due:
+            self._persist()
+        return due
+
+    def _flush_in_background(self) -> None:
+        try:
+            with self._write_lock:
+                self._flush_timer = None
+                if self._maybe_flush():
+                    self._publish()
+        except Exception:
+            logger.exception("Vector store flush failed for %s", self.index_path)
+
+    def export(self, index_path: str) -> None:
+        """Write the current index and metadata to ``index_path`` (e.g. a new serving generation)."""
+        with self._write_lock:
+            self._write_files(index_path)
+            self._publish()
+
+    def flush(self) -> None:
+        """Rewrite the index and sidecar now and truncate the write-ahead log."""
+        self._check_writable()
+        with self._write_lock:
+            if self._unflushed:
+                self._persist()
+                self._publish()
+
+    # -- training ------------------------------------------------------------------
+
+    def _train_index(self, index: faiss.Index, sample: np.ndarray) -> None:
+        if index.is_trained:
+            return
+        needed = self.index_spec.min_train_size
+        if len(sample) < needed:
+            raise ValueError(
+                f"{self.index_spec.kind} index needs at least {needed} vectors to train, got {len(sample)}; "
+                "insert a larger first batch with add_embeddings() or call train()"
+            )
+        if len(sample) > self.index_spec.train_size:
+            rng = np.random.default_rng(0)
+            sample = sample[rng.choice(len(sample), self.index_spec.train_size, replace=False)]
+        index.train(np.ascontiguousarray(sample, dtype="float32"))
+
+    def train(self, sample: np.ndarray) -> None:
+        """Train an untrained (IVF) index on a representative sample before inserting."""
+        self._check_writable()
+        with self._write_lock:
+            if self._index.is_trained:
+                return
+            fresh = faiss.clone_index(self._index)
+            self._train_index(fresh, _normalize_rows(sample))
+            self.index_spec.apply_defaults(fresh)
+            self._index = fresh
+            self._publish()
+
+    # -- writes --------------------------------------------------------------------
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise RuntimeError(f"Vector store {self.index_path} is a read-only serving replica")
+
+    def _tombstone(self, internal_id: int) -> None:
+        row = self._meta.get(internal_id)
+        if row is None or internal_id in self._meta.deleted:
+            return
+        self._meta.deleted.add(internal_id)
+        self._dead_changed = True
+        if self._item_to_id.get(row[0]) == internal_id:
+            del self._item_to_id[row[0]]
+
+    def _insert(self, ids: Sequence[str], mat: np.ndarray, metadatas: Sequence[Dict], first_id: int) -> List[Dict]:
+        """Tombstone previous versions of ``ids`` and stage the new rows; returns the log entries."""
+        if not self._index.is_trained and len(mat) < self.index_spec.min_train_size:
+            self._train_index(self._index, mat)  # raises with a helpful message
+        entries: List[Dict] = []
+        for offset, item_id in enumerate(ids):
+            old = self._item_to_id.get(item_id)
+            if old is not None:
+                self._tombstone(old)
+                entries.append({"op": "delete", "id": old})
+            self._item_to_id[item_id] = first_id + offset
+        for offset, (item_id, md) in enumerate(zip(ids, metadatas)):
+            # Metadata first: a reader can only see the new ids once the vectors are published
+            vector = mat[offset] if self.index_spec.rerank else None
+            self._meta.append(first_id + offset, item_id, md, vector=vector)
+            if self._item_to_id[item_id] != first_id + offset:
+                # The same id appeared twice in one batch; the last one wins
+                self._meta.deleted.add(first_id + offset)
+                self._dead_changed = True
+                entries.append({"op": "delete", "id": first_id + offset})
+            entries.append(
+                {
+                    "op": "add",
+                    "id": first_id + offset,
+                    "item_id": item_id,
+                    "vector": base64.b64encode(mat[offset].tobytes()).decode("ascii"),
+                    "metadata": md,
+                }
+            )
+
+        internal_ids = np.arange(first_id, first_id + len(ids), dtype="int64")
+        if not self._index.is_trained or len(self._delta_ids) + len(ids) >= self.merge_threshold:
+            self._merge_delta(internal_ids, mat)
+        else:
+            # Copy-on-write: readers keep the arrays of the snapshot they started with
+            self._delta_ids = np.concatenate([self._delta_ids, internal_ids])
+            self._delta_vecs = np.vstack([self._delta_vecs, mat])
+
+        # Deletes must follow the add they refer to when the log is replayed
+        entries.sort(key=lambda e: (e["id"], e["op"] == "delete"))
+        return entries
+
+    def add_listener(self, callback: Callable[[List[StoreChange]], None]) -> None:
+        """Call ``callback`` with the changed items after every upsert or delete (e.g. to invalidate caches)."""
+        self._listeners.append(callback)
+
+    def _notify(self, changes: List[StoreChange]) -> None:
+        for callback in list(self._listeners):
+            try:
+                callback(changes)
+            except Exception:
+                logger.exception("Vector store listener failed for %s", self.index_path)
+
+    def _after_write(self, entries: List[Dict]) -> None:
+        if self.use_wal and entries:
+            self._append_wal(entries)
+        self._unflushed += len(entries)
+        self._maybe_flush()
+        self._publish()
+        self._maybe_schedule_compaction()
+
+    def add_embeddings(self, ids: Sequence[str], matrix: np.ndarray, metadatas: Sequence[Dict]) -> None:
+        """Upsert many vectors with a single ``index.add`` call; existing ``ids`` are replaced."""
+        if len(ids) != len(metadatas):
+            raise ValueError("ids and metadatas must have the same length")
         # Expect cosine similarity; normalize to unit length -> inner product == cosine
-        norm = np.linalg.norm(vec)
-        if norm > 0:
-            vec = vec / norm
-        with self._lock:
-            internal_id = self._next_int_id
-            self._next_int_id += 1
-            self._index.add(vec.reshape(1, -1))
-            self._id_to_meta[internal_id] = VectorRecord(item_id=item_id, vector=vec, metadata=metadata)
+        mat = _normalize_rows(matrix)
+        if mat.shape != (len(ids), self.dim):
+            raise ValueError(f"expected a ({len(ids)}, {self.dim}) matrix, got {mat.shape}")
+        if not len(ids):
+            return
+        self._check_writable()
+        with self._write_lock:
+            entries = self._insert(ids, mat, metadatas, self._meta.next_id)
+            self._after_write(entries)
+        if self._listeners:
+            self._notify(list(zip(ids, metadatas, mat)))
+
+    def add_embedding(self, item_id: str, vector: np.ndarray, metadata: Dict) -> None:
+        self.add_embeddings([item_id], vector.reshape(1, -1), [metadata])
+
+    def upsert(self, item_id: str, vector: np.ndarray, metadata: Dict) -> None:
+        """Insert ``item_id`` or replace its vector and metadata."""
+        self.add_embedding(item_id, vector, metadata)
+
+    def delete(self, item_id: str) -> bool:
+        """Remove ``item_id``; returns False if it was not present."""
+        self._check_writable()
+        with self._write_lock:
+            internal_id = self._item_to_id.get(item_id)
+            if internal_id is None:
+                return False
+            self._tombstone(internal_id)
+            self._after_write([{"op": "delete", "id": internal_id}])
+        self._notify([(item_id, None, None)])
+        return True
+
+    # -- compaction ----------------------------------------------------------------
+
+    def _maybe_schedule_compaction(self) -> None:
+        if self.compaction_threshold is None or self._compacting:
+            return
+        if self.dead_fraction <= self.compaction_threshold:
+            return
+        self._compacting = True
+        threading.Thread(target=self._compact_in_background, name="vector-store-compact", daemon=True).start()
+
+    def _compact_in_background(self) -> None:
+        try:
+            self.compact()
+        except Exception:
+            logger.exception("Vector store compaction failed for %s", self.index_path)
+        finally:
+            self._compacting = False
+
+    def compact(self) -> int:
+        """Drop tombstoned rows from the index and metadata; returns how many were removed."""
+        self._check_writable()
+        with self._write_lock:
+            dead = np.fromiter(self._meta.deleted, dtype="int64", count=len(self._meta.deleted))
+            if not len(dead):
+                return 0
+            self._merge_delta()
+            fresh = faiss.clone_index(self._index)
+            try:
+                removed = fresh.remove_ids(faiss.IDSelectorBatch(dead))
+            except RuntimeError:
+                # HNSW cannot remove in place; rebuild from the live vectors instead
+                live = np.fromiter(self._item_to_id.values(), dtype="int64", count=len(self._item_to_id))
+                live.sort()
+                fresh = self.index_spec.build(self.dim)
+                if len(live):
+                    vectors = self._index.reconstruct_batch(live)
+                    # Quantized storage only decodes approximately; prefer the exact copies
+                    exact = self._meta.vectors_for(live)
+                    if exact is not None:
+                        known = ~np.isnan(exact).any(axis=1)
+                        vectors[known] = exact[known]
+                    self._train_index(fresh, vectors)
+                    fresh.add_with_ids(vectors, live)
+                removed = len(dead)
+            self.index_spec.apply_defaults(fresh)
+            self._index = fresh
+            self._meta.drop(dead.tolist())
+            self._dead_changed = True
+            # The compacted index is the new snapshot; the log only holds changes it already has
             self._persist()
+            self._publish()
+            return int(removed)
 
-    def search_similar(self, vector: np.ndarray, top_k: int = 10) -> List[Tuple[float, VectorRecord]]:
-        if self._index.ntotal == 0:
-            return []
-        query = vector.astype("float32")
-        norm = np.linalg.norm(query)
-        if norm > 0:
-            query = query / norm
-        with self._lock:
-            scores, ids = self._index.search(query.reshape(1, -1), top_k)
-        results: List[Tuple[float, VectorRecord]] = []
-        for score, internal_id in zip(scores[0].tolist(), ids[0].tolist()):
-            if internal_id == -1:
-                continue
-            rec = self._id_to_meta.get(int(internal_id))
-            if rec is None:
-                continue
-            results.append((float(score), rec))
-        return results
+    # -- reads ---------------------------------------------------------------------
 
+    def search_similar(
+        self,
+        vector: np.ndarray,
+        top_k: int = 10,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        restrict_to: Optional[np.ndarray] = None,
+    ) -> List[Tuple[float, VectorRecord]]:
+        """
+        Search the index; ``nprobe`` (IVF) and ``ef_search`` (HNSW) override the spec
+        defaults, and ``restrict_to`` limits the search to those internal ids.
+        """
+        return self.search_similar_batch(
+            vector.reshape(1, -1), top_k=top_k, nprobe=nprobe, ef_search=ef_search, restrict_to=restrict_to
+        )[0]
 
+    def search_similar_batch(
+        self,
+        matrix: np.ndarray,
+        top_k: int = 10,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        restrict_to: Optional[np.ndarray] = None,
+    ) -> List[List[Tuple[float, VectorRecord]]]:
+        """
+        Search many query vectors with one ``index.search`` call (one BLAS matrix
+        multiply for flat indexes) and return the hits for each row, in order.
+        """
+        snap = self._snap
+        scores, ids = self._search_snapshot(snap, matrix, top_k, nprobe, ef_search, restrict_to)
+        return self._decode_hits(snap, scores, ids)
+
+    def search_candidates_batch(
+        self,
+        matrix: np.ndarray,
+        top_k: int = 10,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        restrict_to: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, MetadataTable]:
+        """
+        Like ``search_similar_batch`` but returns raw ``(scores, internal_ids, meta)`` (id -1 for empty
+        slots) so hits can be re-ranked with array operations via ``meta.gather``.
+        """
+        snap = self._snap
+        scores, ids = self._search_snapshot(snap, matrix, top_k, nprobe, ef_search, restrict_to)
+        ids = np.where(np.isfinite(scores), ids, -1)
+        if snap.dead and ids.size:
+            ids = np.where(np.isin(ids, snap.dead_ids), -1, ids)
+        return scores, ids, snap.meta
+
+    def _search_snapshot(
+        self,
+        snap: _Snapshot,
+        matrix: np.ndarray,
+        top_k: int,
+        nprobe: Optional[int],
+        ef_search: Optional[int],
+        restrict_to: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        queries = _normalize_rows(matrix)
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"expected queries of dimension {self.dim}, got {queries.shape[1]}")
+        n = len(queries)
+        empty = restrict_to is not None and not len(restrict_to)
+        if not n or empty or snap.index.ntotal + len(snap.delta_ids) == 0:
+            return np.empty((n, 0), dtype="float32"), np.empty((n, 0), dtype="int64")
+
+        selector = snap.dead_selector
+        delta_skip = snap.delta_dead
+        if restrict_to is not None:
+            allowed = np.ascontiguousarray(restrict_to, dtype="int64")
+            batch = faiss.IDSelectorBatch(allowed)
+            # ``batch`` stays referenced by this frame for the duration of the search
+            selector = faiss.IDSelectorAnd(batch, snap.dead_selector) if snap.dead_selector is not None else batch
+            delta_skip = delta_skip | ~np.isin(snap.delta_ids, allowed)
+
+        scores = np.empty((n, 0), dtype="float32")
+        ids = np.empty((n, 0), dtype="int64")
+        exact = None
+        if restrict_to is not None and snap.index.ntotal and len(allowed) <= top_k:
+            # Every allowed id is wanted anyway: score them all instead of trusting an
+            # approximate index to find them through the selector (HNSW may not)
+            exact = self._score_exactly(snap, queries, allowed)
+        elif restrict_to is None and snap.index.ntotal and top_k >= snap.index.ntotal:
+            # Likewise when every row is wanted; HNSW cannot reach all of them
+            exact = self._score_exactly(snap, queries, snap.meta.internal_ids())
+        if exact is not None:
+            scores, ids = exact
+        elif snap.index.ntotal:
+            selectivity = min(1.0, len(allowed) / snap.index.ntotal) if restrict_to is not None else 1.0
+            params = self.index_spec.search_parameters(
+                snap.index, nprobe=nprobe, ef_search=ef_search, sel=selector, selectivity=selectivity
+            )
+            rerank = self.index_spec.rerank
+            scores, ids = snap.index.search(queries, top_k * rerank if rerank else top_k, params=params)
+            if rerank:
+                scores, ids = self._rerank(snap, queries, scores, ids, top_k)
+        if len(snap.delta_ids):
+            # Exact scan of the staging buffer, merged with the index hits by score
+            delta_scores = queries @ snap.delta_vecs.T
+            delta_scores[:, delta_skip] = -np.inf
+            k = min(top_k, len(snap.delta_ids))
+            top = np.argpartition(-delta_scores, k - 1, axis=1)[:, :k]
+            scores = np.hstack([scores, np.take_along_axis(delta_scores, top, axis=1)])
+            ids = np.hstack([ids, snap.delta_ids[top]])
+            order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+            scores = np.take_along_axis(scores, order, axis=1)
+            ids = np.take_along_axis(ids, order, axis=1)
+        return scores, ids
+
+    def ids_within(
+        self,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        relocated: Optional[Callable[[MetadataTable], Tuple[np.ndarray, np.ndarray, np.ndarray]]] = None,
+    ) -> np.ndarray:
+        """
+        Internal ids of the live items located within ``radius_km``, for ``restrict_to``. ``relocated`` maps
+        the metadata table to ``(internal_ids, lats, lngs)`` that override the stored locations.
+        """
+        snap = self._snap
+        found = snap.meta.within_radius(lat, lng, radius_km)
+        if relocated is not None:
+            moved, lats, lngs = relocated(snap.meta)
+            if len(moved):
+                close = moved[haversine_km_array(lat, lng, lats, lngs) <= radius_km]
+                found = np.union1d(np.setdiff1d(found, moved), close)
+        if snap.dead and len(found):
+            found = found[~np.isin(found, snap.dead_ids)]
+        return found
+
+    def ids_accepting(self, material: str) -> np.ndarray:
+        """
+        Internal ids of the live items whose ``accepted_materials`` include ``material``
+        (ignoring case) or that list no accepted materials at all, for ``restrict_to``.
+        """
+        snap = self._snap
+        found = snap.meta.ids_with_term("accepted_materials", material, include_missing=True)
+        if snap.dead and len(found):
+            found = found[~np.isin(found, snap.dead_ids)]
+        return found
+
+    @staticmethod
+    def _score_exactly(
+        snap: _Snapshot, queries: np.ndarray, allowed: np.ndarray
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Best-first scores of the live, indexed ``allowed`` ids; None if the index can't reconstruct them."""
+        ids = allowed[~np.isin(allowed, snap.delta_ids)]
+        if snap.dead:
+            ids = ids[~np.isin(ids, snap.dead_ids)]
+        if not len(ids):
+            return np.empty((len(queries), 0), dtype="float32"), np.empty((len(queries), 0), dtype="int64")
+        vecs = snap.meta.vectors_for(ids)
+        if vecs is None or np.isnan(vecs).any():
+            try:
+                vecs = snap.index.reconstruct_batch(ids)
+            except RuntimeError:
+                return None  # e.g. IVF without a direct map
+        scores = queries @ vecs.T
+        order = np.argsort(-scores, axis=1, kind="stable")
+        return np.take_along_axis(scores, order, axis=1), ids[order]
+
+    @staticmethod
+    def _rerank(
+        snap: _Snapshot, queries: np.ndarray, scores: np.ndarray, ids: np.ndarray, top_k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Re-score compressed-index candidates with the exact vectors and keep the best ``top_k``."""
+        exact = snap.meta.vectors_for(ids.ravel())
+        if exact is None:
+            return scores[:, :top_k], ids[:, :top_k]
+        exact = exact.reshape(ids.shape + (-1,))
+        rescored = np.einsum("nkd,nd->nk", exact, queries)
+        # Rows without an exact copy (older rows, -1 padding) keep their approximate score
+        rescored = np.where(np.isnan(rescored), scores, rescored).astype("float32")
+        order = np.argsort(-rescored, axis=1, kind="stable")[:, :top_k]
+        return np.take_along_axis(rescored, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+    @staticmethod
+    def _decode_hits(snap: _Snapshot, scores: np.ndarray, ids: np.ndarray) -> List[List[Tuple[float, VectorRecord]]]:
+        # Decode each distinct hit once even if many queries share it
+        records: Dict[int, Optional[VectorRecord]] = {}
+        results: List[List[Tuple[float, VectorRecord]]] = []
+        for row_scores, row_ids in zip(scores.tolist(), ids.tolist()):
+            hits: List[Tuple[float, VectorRecord]] = []
+            for score, internal_id in zip(row_scores, row_ids):
+                if internal_id == -1 or internal_id in snap.dead or score == -np.inf:
+                    continue
+                if internal_id not in records:
+                    row = snap.meta.get(internal_id)
+                    records[internal_id] = (
+                        VectorRecord(item_id=row[0], vector=None, metadata=row[1]) if row is not None else None
+                    )
+                rec = records[internal_id]
+                if rec is not None:
+                    hits.append((float(score), rec))
+            results.append(hits)
+        return results
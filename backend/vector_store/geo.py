@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180.0
+
+
+def haversine_km_array(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from one point to many."""
+    phi1 = np.radians(lat)
+    phi2 = np.radians(lats)
+    dphi = phi2 - phi1
+    dlambda = np.radians(lngs - lng)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+class GeoGrid:
+    """
+    Immutable lat/lng grid over point locations; a radius query visits only the cells covering its
+    bounding box before an exact haversine check. Points without a location are not indexed.
+    """
+
+    def __init__(self, ids: np.ndarray, lats: np.ndarray, lngs: np.ndarray, cell_deg: float = 1.0) -> None:
+        self.cell_deg = cell_deg
+        self.n_rows = int(np.ceil(180.0 / cell_deg))
+        self.n_cols = int(np.ceil(360.0 / cell_deg))
+        valid = ~(np.isnan(lats) | np.isnan(lngs))
+        ids, lats, lngs = ids[valid], lats[valid], lngs[valid]
+        cells = self._cells(lats, lngs)
+        order = np.argsort(cells, kind="stable")
+        self.keys, starts = np.unique(cells[order], return_index=True)
+        self.bounds = np.append(starts, len(order)).astype("int64")
+        self.ids = ids[order]
+        self.lats = lats[order]
+        self.lngs = lngs[order]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _row(self, lats: np.ndarray) -> np.ndarray:
+        return np.clip(((np.asarray(lats) + 90.0) // self.cell_deg).astype("int64"), 0, self.n_rows - 1)
+
+    def _col(self, lngs: np.ndarray) -> np.ndarray:
+        return (((np.asarray(lngs) + 180.0) // self.cell_deg).astype("int64")) % self.n_cols
+
+    def _cells(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        return self._row(lats) * self.n_cols + self._col(lngs)
+
+    def query(self, lat: float, lng: float, radius_km: float) -> np.ndarray:
+        """Ids of the points within ``radius_km`` of (lat, lng)."""
+        if not len(self.ids) or radius_km < 0:
+            return np.empty(0, dtype="int64")
+        dlat = radius_km / KM_PER_DEGREE
+        lo, hi = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+        rows = np.arange(self._row(lo), self._row(hi) + 1)
+        # Longitude span widens with latitude; near a pole every column can be in range
+        widest = max(abs(lo), abs(hi))
+        cos_lat = np.cos(np.radians(widest))
+        if widest >= 89.9 or dlat / max(cos_lat, 1e-9) >= 180.0:
+            cols = np.arange(self.n_cols)
+        else:
+            dlng = dlat / cos_lat
+            first = int(self._col(lng - dlng))
+            span = int(np.ceil(2 * dlng / self.cell_deg)) + 1
+            cols = (first + np.arange(min(span, self.n_cols) + 1)) % self.n_cols
+        wanted = np.unique((rows[:, None] * self.n_cols + cols[None, :]).ravel())
+        pos = np.searchsorted(self.keys, wanted)
+        inside = pos < len(self.keys)
+        pos, wanted = pos[inside], wanted[inside]
+        pos = pos[self.keys[pos] == wanted]  # only cells that hold points
+        if not len(pos):
+            return np.empty(0, dtype="int64")
+        lengths = self.bounds[pos + 1] - self.bounds[pos]
+        idx = np.repeat(self.bounds[pos], lengths) + (
+            np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        )
+        close = haversine_km_array(lat, lng, self.lats[idx], self.lngs[idx]) <= radius_km
+        return self.ids[idx[close]]
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import dataclass, fields
+from typing import Optional
+
+import faiss  # type: ignore
+
+
+INDEX_KINDS = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+# Per-vector encoding inside flat, IVF and HNSW indexes -> faiss factory code
+STORAGE_CODES = {"float32": "Flat", "fp16": "SQfp16", "int8": "SQ8"}
+# Cap on the efSearch a restrictive ID selector can raise an HNSW search to
+MAX_FILTERED_EF_SEARCH = 1024
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """
+    Which FAISS index a ``FAISSVectorStore`` builds (flat, ivf_flat, ivf_pq, hnsw), how vectors are stored
+    in it (float32, fp16, int8) and its default search knobs; ``rerank=N`` re-scores quantized hits exactly.
+    """
+
+    kind: str = "flat"
+    nlist: int = 1024
+    pq_m: int = 16
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 40
+    nprobe: int = 16
+    ef_search: int = 64
+    train_size: int = 50_000
+    storage: str = "float32"
+    rerank: int = 0
+
+    def __post_init__(self) -> None:
+        if self.kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index kind {self.kind!r}; expected one of {', '.join(INDEX_KINDS)}")
+        if self.storage not in STORAGE_CODES:
+            raise ValueError(f"Unknown storage {self.storage!r}; expected one of {', '.join(STORAGE_CODES)}")
+        if self.kind == "ivf_pq" and self.storage != "float32":
+            raise ValueError("ivf_pq already compresses vectors; storage applies to flat, ivf_flat and hnsw")
+
+    @classmethod
+    def parse(cls, text: str) -> "IndexSpec":
+        """Parse ``"kind"`` or ``"kind:key=value,key=value"``, e.g. ``"hnsw:storage=int8,rerank=4"``."""
+        kind, _, params = text.strip().partition(":")
+        known = {f.name: f.type for f in fields(cls)}
+        values = {}
+        for pair in filter(None, (p.strip() for p in params.split(","))):
+            key, _, raw = pair.partition("=")
+            key = key.strip()
+            if key not in known or key == "kind":
+                raise ValueError(f"Unknown index spec parameter {key!r}")
+            values[key] = raw.strip() if known[key] in ("str", str) else int(raw)
+        return cls(kind=kind.strip().lower() or "flat", **values)
+
+    @classmethod
+    def from_env(cls, namespace: Optional[str] = None) -> "IndexSpec":
+        """``VECTOR_INDEX_SPEC_<NAMESPACE>`` if set, else ``VECTOR_INDEX_SPEC``, else flat."""
+        text = os.getenv(f"VECTOR_INDEX_SPEC_{namespace.upper()}") if namespace else None
+        return cls.parse(text or os.getenv("VECTOR_INDEX_SPEC", "flat"))
+
+    @property
+    def needs_training(self) -> bool:
+        return self.kind in ("ivf_flat", "ivf_pq") or self.storage == "int8"
+
+    @property
+    def min_train_size(self) -> int:
+        if not self.needs_training:
+            return 0
+        if self.kind not in ("ivf_flat", "ivf_pq"):
+            return 1  # int8 ranges can be fitted on any sample
+        size = self.nlist
+        if self.kind == "ivf_pq":
+            size = max(size, 2 ** self.pq_nbits)
+        return size
+
+    def factory_string(self) -> str:
+        code = STORAGE_CODES[self.storage]
+        if self.kind == "ivf_flat":
+            return f"IVF{self.nlist},{code}"
+        if self.kind == "ivf_pq":
+            return f"IVF{self.nlist},PQ{self.pq_m}x{self.pq_nbits}"
+        if self.kind == "hnsw":
+            return f"IDMap2,HNSW{self.hnsw_m}" + (f"_{code}" if self.storage != "float32" else "")
+        return f"IDMap2,{code}"
+
+    def build(self, dim: int) -> faiss.Index:
+        if self.kind == "ivf_pq" and dim % self.pq_m:
+            raise ValueError(f"pq_m={self.pq_m} must divide the embedding dimension {dim}")
+        index = faiss.index_factory(dim, self.factory_string(), faiss.METRIC_INNER_PRODUCT)
+        if self.kind == "hnsw":
+            _as_hnsw(index).hnsw.efConstruction = self.ef_construction
+        self.apply_defaults(index)
+        return index
+
+    def apply_defaults(self, index: faiss.Index) -> None:
+        """Set the spec's default query-time knobs on an index built or loaded from disk."""
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = self.nprobe
+            return
+        hnsw = _as_hnsw(index)
+        if hnsw is not None:
+            hnsw.hnsw.efSearch = self.ef_search
+
+    def search_parameters(
+        self,
+        index: faiss.Index,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        sel: Optional[faiss.IDSelector] = None,
+        selectivity: float = 1.0,
+    ) -> Optional[faiss.SearchParameters]:
+        """
+        Per-call search parameters, so concurrent queries with different knobs don't race.
+        HNSW ``efSearch`` grows by ``1 / selectivity`` (up to ``MAX_FILTERED_EF_SEARCH``) behind a selector.
+        """
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            if nprobe is None and sel is None:
+                return None
+            return faiss.SearchParametersIVF(nprobe=int(nprobe or ivf.nprobe), sel=sel)
+        hnsw = _as_hnsw(index)
+        if hnsw is not None:
+            if ef_search is None and sel is None:
+                return None
+            ef = int(ef_search or hnsw.hnsw.efSearch)
+            if selectivity < 1.0:
+                ef = max(ef, min(MAX_FILTERED_EF_SEARCH, math.ceil(ef / max(selectivity, 1e-9))))
+            return faiss.SearchParametersHNSW(efSearch=ef, sel=sel)
+        return faiss.SearchParameters(sel=sel) if sel is not None else None
+
+
+def _as_hnsw(index: faiss.Index) -> Optional[faiss.IndexHNSW]:
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    return index if isinstance(index, faiss.IndexHNSW) else None
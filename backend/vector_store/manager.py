@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Mapping, Optional, Sequence, Tuple
+
+from backend.vector_store.index_spec import IndexSpec
+from backend.vector_store.namespaced import NAMESPACES, NamespacedVectorStore, namespaced_store_files
+from backend.vector_store.publish import current_pointer_path, resolve_current
+
+
+logger = logging.getLogger(__name__)
+
+FileSignature = Optional[Tuple[int, int]]
+
+
+def _file_signature(path: str) -> FileSignature:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class VectorStoreManager:
+    """
+    Process-wide owner of a long-lived ``NamespacedVectorStore``, swapped for a fresh one when its files
+    are rewritten (or, with ``read_only=True``, when ``publish_generation`` moves the ``.current`` pointer).
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        index_path: str,
+        poll_interval: float = 2.0,
+        index_specs: Optional[Mapping[str, IndexSpec]] = None,
+        namespaces: Sequence[str] = NAMESPACES,
+        read_only: bool = False,
+    ) -> None:
+        self.dim = dim
+        self.index_path = index_path
+        self.poll_interval = poll_interval
+        self.index_specs = index_specs
+        self.namespaces = tuple(namespaces)
+        self.read_only = read_only
+        self._signature = self._current_signature()
+        # (version, store), swapped as one reference so readers never pair a version with the wrong store
+        self._generation: Tuple[int, NamespacedVectorStore] = (1, self._load())
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def version(self) -> int:
+        return self._generation[0]
+
+    def current(self) -> NamespacedVectorStore:
+        return self._generation[1]
+
+    def current_versioned(self) -> Tuple[int, NamespacedVectorStore]:
+        """The current store together with its version, e.g. for cache keys."""
+        return self._generation
+
+    def _serving_path(self) -> str:
+        if self.read_only:
+            # Fall back to the working files until a generation has been published
+            return resolve_current(self.index_path) or self.index_path
+        return self.index_path
+
+    def _load(self) -> NamespacedVectorStore:
+        return NamespacedVectorStore(
+            dim=self.dim,
+            index_path=self._serving_path(),
+            namespaces=self.namespaces,
+            index_specs=self.index_specs,
+            read_only=self.read_only,
+        )
+
+    def _current_signature(self) -> Tuple[FileSignature, ...]:
+        paths = namespaced_store_files(self._serving_path(), self.namespaces)
+        if self.read_only:
+            paths.insert(0, current_pointer_path(self.index_path))
+        return tuple(_file_signature(path) for path in paths)
+
+    def reload_if_changed(self) -> bool:
+        with self._reload_lock:
+            signature = self._current_signature()
+            if signature == self._signature:
+                return False
+            try:
+                fresh = self._load()
+            except Exception:
+                logger.exception("Failed to reload vector index from %s", self.index_path)
+                return False
+            # If the files changed again while loading, the next poll picks that up
+            self._generation = (self._generation[0] + 1, fresh)
+            self._signature = signature
+            logger.info("Reloaded vector index %s (version %d)", self.index_path, self.version)
+            return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.reload_if_changed()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="vector-store-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1.0)
+            self._thread = None
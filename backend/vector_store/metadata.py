@@ -0,0 +1,585 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from backend.vector_store.bitsets import n_words, pack_codes, pack_rows
+from backend.vector_store.geo import GeoGrid, haversine_km_array
+
+
+MAGIC = b"WMMETA01"
+ALIGN = 64
+
+# Metadata keys with a typed column; anything else is kept as JSON in ``extras``
+LIST_FIELDS = ("goals", "accepted_materials", "tags")
+SCALAR_FIELDS = ("remaining_capacity", "quantity")
+
+# Bits of the per-row ``present`` column, so rows round-trip with exactly the keys they had
+_HAS_LOCATION = 1 << 0
+_HAS_TYPE = 1 << 1
+_FIELD_BITS = {name: 1 << (2 + i) for i, name in enumerate(SCALAR_FIELDS + LIST_FIELDS)}
+
+Row = Tuple[int, str, Dict]
+
+
+def _empty_columns() -> Dict[str, np.ndarray]:
+    cols = {
+        "ids": np.empty(0, dtype="<i8"),
+        "item_offsets": np.zeros(1, dtype="<i8"),
+        "item_bytes": np.empty(0, dtype="u1"),
+        "present": np.empty(0, dtype="u1"),
+        "lat": np.empty(0, dtype="<f8"),
+        "lng": np.empty(0, dtype="<f8"),
+        "type": np.empty(0, dtype="<i2"),
+    }
+    for name in SCALAR_FIELDS:
+        cols[name] = np.empty(0, dtype="<f8")
+    for name in LIST_FIELDS:
+        cols[f"{name}_offsets"] = np.zeros(1, dtype="<i8")
+        cols[f"{name}_codes"] = np.empty(0, dtype="<i4")
+    return cols
+
+
+def _is_str_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+class Vocabulary:
+    """Append-only string interner; codes stay stable for the lifetime of an index."""
+
+    def __init__(self, terms: Sequence[str] = ()) -> None:
+        self.terms: List[str] = list(terms)
+        self._codes: Dict[str, int] = {t: i for i, t in enumerate(self.terms)}
+        self._casefolded: Optional[Tuple[np.ndarray, Dict[str, int]]] = None
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def code(self, term: str) -> int:
+        code = self._codes.get(term)
+        if code is None:
+            code = len(self.terms)
+            self.terms.append(term)
+            self._codes[term] = code
+        return code
+
+    def lookup(self, term: str) -> Optional[int]:
+        return self._codes.get(term)
+
+    def casefolded(self) -> Tuple[np.ndarray, Dict[str, int]]:
+        """``(canonical, index)``: per code, the code of its first case-insensitive equal; lowercased term -> code."""
+        cached = self._casefolded
+        n = len(self.terms)
+        if cached is None or len(cached[0]) != n:
+            index: Dict[str, int] = {}
+            canonical = np.fromiter(
+                (index.setdefault(t.lower(), i) for i, t in enumerate(self.terms[:n])), dtype="int64", count=n
+            )
+            cached = (canonical, index)
+            self._casefolded = cached
+        return cached
+
+
+class _Postings:
+    """Inverted index of one list column: case-folded term code -> sorted internal ids."""
+
+    def __init__(self, cols: Dict[str, np.ndarray], name: str, canonical: np.ndarray) -> None:
+        offsets = np.asarray(cols[f"{name}_offsets"], dtype="int64")
+        codes = canonical[np.asarray(cols[f"{name}_codes"], dtype="int64")]
+        ids = np.asarray(cols["ids"], dtype="int64")
+        lengths = np.diff(offsets)
+        width = int(ids.max()) + 1 if len(ids) else 1
+        # Unique (code, id) pairs: a row listing the same term twice is posted once
+        pairs = np.unique(codes * width + np.repeat(ids, lengths))
+        pair_codes, pair_ids = pairs // width, pairs % width  # sorted by code, then id
+        self.keys, starts = np.unique(pair_codes, return_index=True)
+        self.bounds = np.append(starts, len(pair_ids)).astype("int64")
+        self.ids = pair_ids
+        self.missing = ids[lengths == 0]
+
+    def lookup(self, code: int) -> np.ndarray:
+        pos = int(np.searchsorted(self.keys, code))
+        if pos == len(self.keys) or int(self.keys[pos]) != code:
+            return np.empty(0, dtype="int64")
+        return self.ids[self.bounds[pos] : self.bounds[pos + 1]]
+
+
+class MetadataTable:
+    """
+    Columnar metadata for the vectors of a ``FAISSVectorStore``: typed arrays and CSR term lists, saved
+    as a JSON header plus raw column bytes that load with a single ``mmap``.
+    """
+
+    def __init__(self) -> None:
+        self.terms = Vocabulary()
+        self.types = Vocabulary()
+        self.extras: Dict[int, Dict] = {}
+        self.deleted: Set[int] = set()
+        self.next_id = 0
+        self._cols = _empty_columns()
+        self._pending: Dict[int, Tuple[str, Dict]] = {}
+        self._pending_vectors: Dict[int, np.ndarray] = {}
+        self.vector_dim: Optional[int] = None
+        self._geo: Optional[Tuple[Dict[str, np.ndarray], GeoGrid]] = None
+        self._bits: Dict[str, Tuple[Dict[str, np.ndarray], np.ndarray]] = {}
+        self._postings: Dict[str, Tuple[Dict[str, np.ndarray], "_Postings"]] = {}
+
+    def __len__(self) -> int:
+        return len(self._cols["ids"]) + len(self._pending)
+
+    @property
+    def vector_nbytes(self) -> int:
+        """Bytes of the exact float32 vectors kept for re-ranking (0 without ``rerank``)."""
+        stored = self._cols.get("vectors")
+        return (stored.nbytes if stored is not None else 0) + sum(v.nbytes for v in self._pending_vectors.values())
+
+    @property
+    def pending_rows(self) -> int:
+        """Rows appended since the last ``fold_pending``; lookups decode these one by one."""
+        return len(self._pending)
+
+    def __contains__(self, internal_id: int) -> bool:
+        return internal_id in self._pending or self._row_of(internal_id) is not None
+
+    def max_id(self) -> int:
+        best = int(self._cols["ids"][-1]) if len(self._cols["ids"]) else -1
+        if self._pending:
+            best = max(best, max(self._pending))
+        return best
+
+    def append(self, internal_id: int, item_id: str, metadata: Dict, vector: Optional[np.ndarray] = None) -> None:
+        if vector is not None:
+            self._pending_vectors[internal_id] = np.asarray(vector, dtype="float32")
+            self.vector_dim = len(vector)
+        for name in LIST_FIELDS:
+            # Interned now so ``gather`` can return codes for rows that are still pending
+            if _is_str_list(metadata.get(name)):
+                for term in metadata[name]:
+                    self.terms.code(term)
+        self._pending[internal_id] = (item_id, metadata)
+        self.next_id = max(self.next_id, internal_id + 1)
+
+    # -- lookups -----------------------------------------------------------------
+
+    @staticmethod
+    def _row_in(cols: Dict[str, np.ndarray], internal_id: int) -> Optional[int]:
+        ids = cols["ids"]
+        row = int(np.searchsorted(ids, internal_id))
+        if row < len(ids) and int(ids[row]) == internal_id:
+            return row
+        return None
+
+    def _row_of(self, internal_id: int) -> Optional[int]:
+        return self._row_in(self._cols, internal_id)
+
+    def get(self, internal_id: int) -> Optional[Tuple[str, Dict]]:
+        # Safe to call while a single writer appends or folds: the writer swaps ``_cols``
+        # before it forgets pending rows, and a lookup uses one ``_cols`` generation throughout
+        pending = self._pending.get(internal_id)
+        if pending is not None:
+            return pending
+        cols = self._cols
+        row = self._row_in(cols, internal_id)
+        if row is None:
+            return None
+        return self._decode(row, cols)
+
+    def vectors_for(self, internal_ids: np.ndarray) -> Optional[np.ndarray]:
+        """Exact vectors for ``internal_ids`` (NaN rows where none is stored), or None if the table keeps none."""
+        # Pending before columns, the same ordering ``get`` relies on
+        pending = self._pending_vectors
+        cols = self._cols
+        if self.vector_dim is None:
+            return None
+        ids = np.asarray(internal_ids, dtype="int64")
+        out = np.full((len(ids), self.vector_dim), np.nan, dtype="float32")
+        stored = cols.get("vectors")
+        if stored is not None and len(cols["ids"]):
+            rows = np.minimum(np.searchsorted(cols["ids"], ids), len(cols["ids"]) - 1)
+            found = cols["ids"][rows] == ids
+            out[found] = stored[rows[found]]
+        if pending:
+            for i, internal_id in enumerate(ids.tolist()):
+                vec = pending.get(internal_id)
+                if vec is not None:
+                    out[i] = vec
+        return out
+
+    def _column_bits(self, name: str, cols: Dict[str, np.ndarray]) -> np.ndarray:
+        """Bitsets of list field ``name`` for every row of ``cols``, packed once per columns generation."""
+        cached = self._bits.get(name)
+        if cached is None or cached[0] is not cols:
+            canonical, _ = self.terms.casefolded()
+            codes = np.asarray(cols[f"{name}_codes"], dtype="int64")
+            bits = pack_rows(np.asarray(cols[f"{name}_offsets"]), canonical[codes], n_words(len(canonical)))
+            cached = (cols, bits)
+            self._bits[name] = cached
+        return cached[1]
+
+    def gather(
+        self, internal_ids: np.ndarray, lists: Sequence[str] = LIST_FIELDS, bits: Sequence[str] = ()
+    ) -> Dict[str, np.ndarray]:
+        """
+        Typed column values for ``internal_ids`` in order (NaN where missing), plus CSR ``lists`` and
+        bitset ``bits`` list fields; ``found`` is False for unknown ids.
+        """
+        # Pending before columns, the same ordering ``get`` relies on
+        pending = self._pending
+        cols = self._cols
+        ids = np.asarray(internal_ids, dtype="int64")
+        n = len(ids)
+        total = len(cols["ids"])
+        if total:
+            rows = np.minimum(np.searchsorted(cols["ids"], ids), total - 1)
+            in_cols = cols["ids"][rows] == ids
+            present = np.where(in_cols, cols["present"][rows], 0)
+        else:
+            rows = np.zeros(n, dtype="int64")
+            in_cols = np.zeros(n, dtype=bool)
+            present = np.zeros(n, dtype="u1")
+        # Rows written since the last fold are decoded one by one; there are only a few
+        from_pending = {i: pending[int(x)][1] for i, x in enumerate(ids.tolist()) if not in_cols[i] and int(x) in pending}
+
+        out: Dict[str, np.ndarray] = {"found": in_cols.copy()}
+        has_loc = (present & _HAS_LOCATION) != 0
+        for name in ("lat", "lng"):
+            out[name] = np.where(has_loc, cols[name][rows], np.nan) if total else np.full(n, np.nan)
+        for name in SCALAR_FIELDS:
+            has = (present & _FIELD_BITS[name]) != 0
+            out[name] = np.where(has, cols[name][rows], np.nan) if total else np.full(n, np.nan)
+        for i, md in from_pending.items():
+            out["found"][i] = True
+            loc = md.get("location")
+            if isinstance(loc, dict):
+                out["lat"][i] = float(loc.get("lat", 0.0))
+                out["lng"][i] = float(loc.get("lng", 0.0))
+            for name in SCALAR_FIELDS:
+                if isinstance(md.get(name), (int, float)):
+                    out[name][i] = float(md[name])
+
+        for name in lists:
+            offsets = cols[f"{name}_offsets"]
+            has = in_cols & ((present & _FIELD_BITS[name]) != 0)
+            starts = offsets[rows] if total else np.zeros(n, dtype="int64")
+            lengths = np.where(has, offsets[np.minimum(rows + 1, total)] - starts, 0) if total else np.zeros(n, "int64")
+            extra: Dict[int, List[int]] = {}
+            for i, md in from_pending.items():
+                values = md.get(name)
+                if _is_str_list(values):
+                    codes = [self.terms.lookup(v) for v in values]
+                    extra[i] = [c for c in codes if c is not None]
+                    lengths[i] = len(extra[i])
+            out_offsets = np.concatenate([[0], np.cumsum(lengths)]).astype("int64")
+            out_codes = np.empty(int(out_offsets[-1]), dtype="int64")
+            col_rows = np.nonzero(has)[0]
+            col_lengths = lengths[col_rows]
+            within = np.arange(int(col_lengths.sum())) - np.repeat(np.cumsum(col_lengths) - col_lengths, col_lengths)
+            out_codes[np.repeat(out_offsets[col_rows], col_lengths) + within] = cols[f"{name}_codes"][
+                np.repeat(starts[col_rows], col_lengths) + within
+            ]
+            for i, codes in extra.items():
+                out_codes[out_offsets[i] : out_offsets[i + 1]] = codes
+            out[f"{name}_offsets"] = out_offsets
+            out[f"{name}_codes"] = out_codes
+
+        if bits:
+            # Read after the pending rows, so it covers every term they were interned with
+            canonical, _ = self.terms.casefolded()
+            words = n_words(len(canonical))
+        for name in bits:
+            col_bits = self._column_bits(name, cols) if total else None
+            # A concurrent append may have grown the vocabulary since ``words`` was read
+            width = max(words, col_bits.shape[1]) if col_bits is not None else words
+            out_bits = np.zeros((n, width), dtype="uint64")
+            if col_bits is not None:
+                has = in_cols & ((present & _FIELD_BITS[name]) != 0)
+                out_bits[:, : col_bits.shape[1]] = np.where(has[:, None], col_bits[rows], np.uint64(0))
+            for i, md in from_pending.items():
+                values = md.get(name)
+                if _is_str_list(values):
+                    codes = (self.terms.lookup(v) for v in values)
+                    out_bits[i] = pack_codes((int(canonical[c]) for c in codes if c is not None), width)
+            out[f"{name}_bits"] = out_bits
+        return out
+
+    def _column_postings(self, name: str, cols: Dict[str, np.ndarray]) -> "_Postings":
+        cached = self._postings.get(name)
+        if cached is None or cached[0] is not cols:
+            canonical, _ = self.terms.casefolded()
+            cached = (cols, _Postings(cols, name, canonical))
+            self._postings[name] = cached
+        return cached[1]
+
+    def ids_with_term(self, name: str, term: str, include_missing: bool = False) -> np.ndarray:
+        """
+        Sorted internal ids whose list field ``name`` contains ``term`` (ignoring case, tombstones included);
+        with ``include_missing``, also the rows with no value for the field.
+        """
+        pending = self._pending.copy()
+        cols = self._cols
+        postings = self._column_postings(name, cols)
+        _, index = self.terms.casefolded()
+        code = index.get(term.lower())
+        parts = [postings.lookup(code) if code is not None else np.empty(0, dtype="int64")]
+        if include_missing:
+            parts.append(postings.missing)
+        wanted = term.lower()
+        extra = [
+            internal_id
+            for internal_id, (_, md) in pending.items()
+            if (_is_str_list(md.get(name)) and any(v.lower() == wanted for v in md[name]))
+            or (include_missing and not md.get(name))
+        ]
+        parts.append(np.array(extra, dtype="int64"))
+        return np.unique(np.concatenate(parts))
+
+    def within_radius(self, lat: float, lng: float, radius_km: float) -> np.ndarray:
+        """Internal ids of the rows located within ``radius_km`` (tombstones included)."""
+        pending = self._pending.copy()
+        cols = self._cols
+        cached = self._geo
+        if cached is None or cached[0] is not cols:
+            has_loc = (cols["present"] & _HAS_LOCATION) != 0
+            lats = np.where(has_loc, cols["lat"], np.nan)
+            lngs = np.where(has_loc, cols["lng"], np.nan)
+            cached = (cols, GeoGrid(np.asarray(cols["ids"], dtype="int64"), lats, lngs))
+            self._geo = cached
+        found = cached[1].query(lat, lng, radius_km)
+        located = [
+            (internal_id, md["location"])
+            for internal_id, (_, md) in pending.items()
+            if isinstance(md.get("location"), dict)
+        ]
+        if located:
+            ids = np.fromiter((i for i, _ in located), dtype="int64", count=len(located))
+            lats = np.array([float(loc.get("lat", 0.0)) for _, loc in located])
+            lngs = np.array([float(loc.get("lng", 0.0)) for _, loc in located])
+            found = np.concatenate([found, ids[haversine_km_array(lat, lng, lats, lngs) <= radius_km]])
+        return found
+
+    def _decode(self, row: int, cols: Optional[Dict[str, np.ndarray]] = None) -> Tuple[str, Dict]:
+        c = self._cols if cols is None else cols
+        item_id = bytes(c["item_bytes"][c["item_offsets"][row] : c["item_offsets"][row + 1]]).decode("utf-8")
+        present = int(c["present"][row])
+        md: Dict = {}
+        if present & _HAS_LOCATION:
+            md["location"] = {"lat": float(c["lat"][row]), "lng": float(c["lng"][row])}
+        for name in SCALAR_FIELDS:
+            if present & _FIELD_BITS[name]:
+                md[name] = float(c[name][row])
+        for name in LIST_FIELDS:
+            if present & _FIELD_BITS[name]:
+                offsets = c[f"{name}_offsets"]
+                codes = c[f"{name}_codes"][offsets[row] : offsets[row + 1]]
+                md[name] = [self.terms.terms[int(code)] for code in codes]
+        if present & _HAS_TYPE:
+            md["type"] = self.types.terms[int(c["type"][row])]
+        extra = self.extras.get(int(c["ids"][row]))
+        if extra:
+            md.update(extra)
+        return item_id, md
+
+    def internal_ids(self) -> np.ndarray:
+        """Internal ids of every row, tombstones included."""
+        pending = np.fromiter(self._pending, dtype="int64", count=len(self._pending))
+        return np.concatenate([self._cols["ids"].astype("int64"), pending])
+
+    def item_ids(self) -> Iterator[Tuple[int, str]]:
+        """``(internal_id, item_id)`` for every live row, without decoding the rest of the metadata."""
+        c = self._cols
+        blob = bytes(c["item_bytes"])
+        offsets = c["item_offsets"].tolist()
+        for row, internal_id in enumerate(c["ids"].tolist()):
+            if internal_id not in self.deleted:
+                yield internal_id, blob[offsets[row] : offsets[row + 1]].decode("utf-8")
+        for internal_id in sorted(self._pending):
+            if internal_id not in self.deleted:
+                yield internal_id, self._pending[internal_id][0]
+
+    def items(self) -> Iterator[Tuple[int, str, Dict]]:
+        for row in range(len(self._cols["ids"])):
+            item_id, md = self._decode(row)
+            yield int(self._cols["ids"][row]), item_id, md
+        for internal_id in sorted(self._pending):
+            item_id, md = self._pending[internal_id]
+            yield internal_id, item_id, md
+
+    # -- encoding ----------------------------------------------------------------
+
+    def _encode(self, rows: Sequence[Row]) -> Dict[str, np.ndarray]:
+        n = len(rows)
+        cols = {
+            "ids": np.fromiter((r[0] for r in rows), dtype="<i8", count=n),
+            "present": np.zeros(n, dtype="u1"),
+            "lat": np.zeros(n, dtype="<f8"),
+            "lng": np.zeros(n, dtype="<f8"),
+            "type": np.full(n, -1, dtype="<i2"),
+        }
+        encoded_ids = [r[1].encode("utf-8") for r in rows]
+        cols["item_offsets"] = np.concatenate([[0], np.cumsum([len(b) for b in encoded_ids])]).astype("<i8")
+        cols["item_bytes"] = np.frombuffer(b"".join(encoded_ids), dtype="u1").copy()
+        for name in SCALAR_FIELDS:
+            cols[name] = np.zeros(n, dtype="<f8")
+        lists: Dict[str, List[List[int]]] = {name: [] for name in LIST_FIELDS}
+
+        for i, (internal_id, _, md) in enumerate(rows):
+            present = 0
+            extra: Dict = {}
+            for key, value in md.items():
+                if key == "location" and isinstance(value, dict) and set(value) <= {"lat", "lng"}:
+                    cols["lat"][i] = float(value.get("lat", 0.0))
+                    cols["lng"][i] = float(value.get("lng", 0.0))
+                    present |= _HAS_LOCATION
+                elif key == "type" and isinstance(value, str):
+                    cols["type"][i] = self.types.code(value)
+                    present |= _HAS_TYPE
+                elif key in SCALAR_FIELDS and isinstance(value, (int, float)):
+                    cols[key][i] = float(value)
+                    present |= _FIELD_BITS[key]
+                elif key in LIST_FIELDS and _is_str_list(value):
+                    lists[key].append([self.terms.code(v) for v in value])
+                    present |= _FIELD_BITS[key]
+                else:
+                    extra[key] = value
+            for name in LIST_FIELDS:
+                if not present & _FIELD_BITS[name]:
+                    lists[name].append([])
+            cols["present"][i] = present
+            if extra:
+                self.extras[int(internal_id)] = extra
+
+        for name in LIST_FIELDS:
+            lengths = [len(codes) for codes in lists[name]]
+            cols[f"{name}_offsets"] = np.concatenate([[0], np.cumsum(lengths)]).astype("<i8")
+            flat = [code for codes in lists[name] for code in codes]
+            cols[f"{name}_codes"] = np.asarray(flat, dtype="<i4")
+        return cols
+
+    @staticmethod
+    def _concat(a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        out: Dict[str, np.ndarray] = {}
+        for name, col in a.items():
+            if name.endswith("_offsets"):
+                out[name] = np.concatenate([col, b[name][1:] + col[-1]])
+            else:
+                out[name] = np.concatenate([col, b[name]])
+        return out
+
+    def drop(self, internal_ids: Iterable[int]) -> None:
+        """Physically remove rows (after the index dropped their vectors) and forget their tombstones."""
+        self.fold_pending()
+        doomed = np.fromiter(internal_ids, dtype="<i8")
+        if not len(doomed):
+            return
+        keep = ~np.isin(self._cols["ids"], doomed)
+        cols: Dict[str, np.ndarray] = {"ids": self._cols["ids"][keep], "present": self._cols["present"][keep]}
+        for name in ("lat", "lng", "type") + SCALAR_FIELDS:
+            cols[name] = self._cols[name][keep]
+        if "vectors" in self._cols:
+            cols["vectors"] = self._cols["vectors"][keep]
+        for offsets_name, data_name in [("item_offsets", "item_bytes")] + [
+            (f"{name}_offsets", f"{name}_codes") for name in LIST_FIELDS
+        ]:
+            offsets = self._cols[offsets_name]
+            lengths = np.diff(offsets)[keep]
+            cols[offsets_name] = np.concatenate([[0], np.cumsum(lengths)]).astype("<i8")
+            # Element-level mask: repeat each row's keep flag over its slice
+            element_keep = np.repeat(keep, np.diff(offsets))
+            cols[data_name] = self._cols[data_name][element_keep]
+        self._cols = cols
+        dropped = set(doomed.tolist())
+        self.deleted -= dropped
+        self.extras = {k: v for k, v in self.extras.items() if k not in dropped}
+
+    def fold_pending(self) -> None:
+        """Merge pending rows into the (in-memory) columns."""
+        if not self._pending:
+            return
+        order = sorted(self._pending)
+        new = self._encode([(i, *self._pending[i]) for i in order])
+        cols = self._cols
+        if self.vector_dim is not None:
+            if "vectors" not in cols:
+                cols = {**cols, "vectors": np.full((len(cols["ids"]), self.vector_dim), np.nan, dtype="<f4")}
+            new["vectors"] = np.full((len(order), self.vector_dim), np.nan, dtype="<f4")
+            for row, internal_id in enumerate(order):
+                vec = self._pending_vectors.get(internal_id)
+                if vec is not None:
+                    new["vectors"][row] = vec
+        self._cols = self._concat(cols, new)
+        # Only after the columns hold these rows
+        self._pending = {}
+        self._pending_vectors = {}
+
+    # -- persistence -------------------------------------------------------------
+
+    def write(self, path: str) -> None:
+        self.fold_pending()
+        columns = {}
+        offset = 0
+        for name, col in self._cols.items():
+            columns[name] = {"dtype": col.dtype.str, "shape": list(col.shape), "offset": offset}
+            offset += -(-col.nbytes // ALIGN) * ALIGN
+        header = json.dumps(
+            {
+                "rows": len(self._cols["ids"]),
+                "terms": self.terms.terms,
+                "types": self.types.terms,
+                "extras": {str(k): v for k, v in self.extras.items()},
+                "deleted": sorted(self.deleted),
+                "next_id": self.next_id,
+                "columns": columns,
+            }
+        ).encode("utf-8")
+        data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+        with open(path, "wb") as fh:
+            fh.write(MAGIC)
+            fh.write(struct.pack("<Q", len(header)))
+            fh.write(header)
+            for name, col in self._cols.items():
+                fh.seek(data_start + columns[name]["offset"])
+                fh.write(np.ascontiguousarray(col).tobytes())
+            fh.truncate(data_start + offset)
+
+    @classmethod
+    def load(cls, path: str) -> "MetadataTable":
+        table = cls()
+        with open(path, "rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a metadata table")
+            (header_len,) = struct.unpack("<Q", fh.read(8))
+            header = json.loads(fh.read(header_len).decode("utf-8"))
+        data_start = -(-(len(MAGIC) + 8 + header_len) // ALIGN) * ALIGN
+        table.terms = Vocabulary(header["terms"])
+        table.types = Vocabulary(header["types"])
+        table.extras = {int(k): v for k, v in header["extras"].items()}
+        table.deleted = set(header.get("deleted", []))
+
+        size = os.path.getsize(path)
+        buf = np.memmap(path, dtype="u1", mode="r") if size > data_start else np.empty(0, dtype="u1")
+        cols: Dict[str, np.ndarray] = {}
+        for name, spec in header["columns"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            start = data_start + spec["offset"]
+            # Zero-copy views into the shared mapping
+            cols[name] = buf[start : start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+        table._cols = cols
+        if "vectors" in cols:
+            table.vector_dim = int(cols["vectors"].shape[1])
+        table.next_id = max(int(header.get("next_id", 0)), table.max_id() + 1)
+        return table
+
+    @classmethod
+    def from_legacy_npz(cls, path: str) -> "MetadataTable":
+        """Read the old pickled ``.meta.npz`` sidecar so existing indexes keep working."""
+        table = cls()
+        data = np.load(path, allow_pickle=True)
+        for rec in data.get("records", []):
+            table.append(int(rec[0]), str(rec[1]), rec[3])
+        table.fold_pending()
+        return table
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import os
+from typing import Dict, List, Mapping, Optional, Sequence
+
+from backend.vector_store.faiss_store import FAISSVectorStore, store_files
+from backend.vector_store.index_spec import IndexSpec
+from backend.vector_store.namespaces import LISTINGS, NAMESPACES, RECYCLERS
+
+
+def namespace_index_path(index_path: str, namespace: str) -> str:
+    """``backend/vector_index.faiss`` -> ``backend/vector_index.recycler.faiss``."""
+    root, ext = os.path.splitext(index_path)
+    return f"{root}.{namespace}{ext or '.faiss'}"
+
+
+def namespaced_store_files(index_path: str, namespaces: Sequence[str] = NAMESPACES) -> List[str]:
+    files: List[str] = []
+    for namespace in namespaces:
+        files.extend(store_files(namespace_index_path(index_path, namespace)))
+    return files
+
+
+def index_specs_from_env(namespaces: Sequence[str] = NAMESPACES) -> Dict[str, IndexSpec]:
+    return {namespace: IndexSpec.from_env(namespace) for namespace in namespaces}
+
+
+class NamespacedVectorStore:
+    """One ``FAISSVectorStore`` per namespace (recyclers, listings), so a recycler query only scans recyclers."""
+
+    def __init__(
+        self,
+        dim: int,
+        index_path: Optional[str] = None,
+        namespaces: Sequence[str] = NAMESPACES,
+        index_specs: Optional[Mapping[str, IndexSpec]] = None,
+        **store_kwargs,
+    ) -> None:
+        self.dim = dim
+        self.index_path = index_path
+        self._stores: Dict[str, FAISSVectorStore] = {}
+        for namespace in namespaces:
+            path = namespace_index_path(index_path, namespace) if index_path else None
+            spec = (index_specs or {}).get(namespace)
+            self._stores[namespace] = FAISSVectorStore(dim=dim, index_path=path, index_spec=spec, **store_kwargs)
+
+    @property
+    def namespaces(self) -> List[str]:
+        return list(self._stores)
+
+    def namespace(self, name: str) -> FAISSVectorStore:
+        try:
+            return self._stores[name]
+        except KeyError:
+            raise KeyError(f"Unknown vector namespace {name!r}; expected one of {', '.join(self._stores)}") from None
+
+    @property
+    def recyclers(self) -> FAISSVectorStore:
+        return self.namespace(RECYCLERS)
+
+    @property
+    def listings(self) -> FAISSVectorStore:
+        return self.namespace(LISTINGS)
+
+    def flush(self) -> None:
+        for store in self._stores.values():
+            store.flush()
+
+    def export(self, index_path: str) -> None:
+        """Write every namespace under another base path, e.g. a new serving generation."""
+        for namespace, store in self._stores.items():
+            store.export(namespace_index_path(index_path, namespace))
@@ -0,0 +1,6 @@
+from __future__ import annotations
+
+# Kept free of FAISS imports so request handlers can name namespaces before the index loads
+RECYCLERS = "recycler"
+LISTINGS = "listing"
+NAMESPACES = (RECYCLERS, LISTINGS)
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import os
+import shutil
+import time
+from typing import List, Optional
+
+from backend.vector_store.namespaced import NamespacedVectorStore
+
+
+def current_pointer_path(index_path: str) -> str:
+    return index_path + ".current"
+
+
+def generations_dir(index_path: str) -> str:
+    return index_path + ".generations"
+
+
+def resolve_current(index_path: str) -> Optional[str]:
+    """Base index path of the currently published generation, or None if nothing was published."""
+    try:
+        with open(current_pointer_path(index_path), "r", encoding="utf-8") as fh:
+            generation = fh.read().strip()
+    except OSError:
+        return None
+    if not generation:
+        return None
+    return os.path.join(generations_dir(index_path), generation, os.path.basename(index_path))
+
+
+def publish_generation(store: NamespacedVectorStore, index_path: str, keep: int = 3) -> str:
+    """
+    Write ``store`` as a new generation directory, atomically point ``<index_path>.current`` at it and
+    keep only the ``keep`` newest on disk. Returns the new generation's name.
+    """
+    root = generations_dir(index_path)
+    generation = f"{time.time_ns():020d}"
+    target = os.path.join(root, generation)
+    os.makedirs(target)
+    store.export(os.path.join(target, os.path.basename(index_path)))
+
+    pointer = current_pointer_path(index_path)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as fh:
+        fh.write(generation)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(pointer + ".tmp", pointer)
+
+    _prune_generations(root, keep=max(1, keep), current=generation)
+    return generation
+
+
+def _prune_generations(root: str, keep: int, current: str) -> None:
+    generations: List[str] = sorted(name for name in os.listdir(root) if name.isdigit())
+    for name in generations[:-keep]:
+        if name != current:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.vector_store.bitsets import jaccard_bits, pack_codes, popcount
+
+
+@pytest.fixture(params=["native", "table"])
+def popcount_impl(request, monkeypatch):
+    if request.param == "table":
+        monkeypatch.delattr(np, "bitwise_count", raising=False)
+    return request.param
+
+
+@pytest.mark.parametrize("words", [1, 3])
+def test_popcount_of_zero_rows(popcount_impl, words):
+    assert popcount(np.zeros((0, words), dtype="uint64")).tolist() == []
+    assert jaccard_bits(np.zeros((0, words), dtype="uint64"), pack_codes([1], words), 1).tolist() == []
+
+
+def test_popcount_counts_every_word(popcount_impl):
+    bits = np.array([[0, 0], [1, 2**63], [2**64 - 1, 5]], dtype="uint64")
+    assert popcount(bits).tolist() == [0, 2, 66]
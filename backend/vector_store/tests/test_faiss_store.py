@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import os
+import time
+
+import faiss
+import numpy as np
+import pytest
+
+from backend.vector_store.faiss_store import FAISSVectorStore, read_index_mmap
+from backend.vector_store.index_spec import IndexSpec
+
+DIM = 16
+
+
+def _vectors(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype("float32")
+
+
+@pytest.mark.parametrize("spec", ["flat", "hnsw", "ivf_flat:nlist=16"])
+def test_read_only_replica_serves_the_same_results(tmp_path, spec):
+    path = str(tmp_path / "index.faiss")
+    writer = FAISSVectorStore(dim=DIM, index_path=path, index_spec=IndexSpec.parse(spec), compaction_threshold=None)
+    data = _vectors(2000)
+    writer.add_embeddings([f"r{i}" for i in range(len(data))], data, [{"type": "recycler"}] * len(data))
+    writer.flush()
+
+    replica = FAISSVectorStore(dim=DIM, index_path=path, index_spec=IndexSpec.parse(spec), read_only=True)
+    queries = _vectors(5, seed=1)
+    expected = [[rec.item_id for _, rec in hits] for hits in writer.search_similar_batch(queries, top_k=5)]
+    got = [[rec.item_id for _, rec in hits] for hits in replica.search_similar_batch(queries, top_k=5)]
+    assert got == expected
+    with pytest.raises(RuntimeError):
+        replica.upsert("x", data[0], {"type": "recycler"})
+
+
+def test_read_index_mmap_reads_the_file_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "index.faiss")
+    index = IndexSpec().build(DIM)
+    index.add_with_ids(_vectors(10), np.arange(10, dtype="int64"))
+    faiss.write_index(index, path)
+
+    calls = []
+    real = faiss.read_index
+    monkeypatch.setattr(faiss, "read_index", lambda *args: calls.append(args) or real(*args))
+    assert read_index_mmap(path).ntotal == 10
+    assert len(calls) == 1
+    assert os.path.exists(path)
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="needs /proc/self/maps")
+@pytest.mark.parametrize("spec", ["flat", "hnsw", "ivf_flat:nlist=16"])
+def test_read_index_mmap_maps_the_file(tmp_path, caplog, spec):
+    path = str(tmp_path / "index.faiss")
+    index = IndexSpec.parse(spec).build(DIM)
+    data = _vectors(500)
+    if not index.is_trained:
+        index.train(data)
+    index.add_with_ids(data, np.arange(len(data), dtype="int64"))
+    faiss.write_index(index, path)
+
+    mapped = read_index_mmap(path)
+    with open("/proc/self/maps", encoding="utf-8") as fh:
+        assert path in fh.read()
+    assert mapped.ntotal == len(data)
+    assert "cannot memory-map" not in caplog.text
+
+
+def _store(path: str, **kwargs) -> FAISSVectorStore:
+    return FAISSVectorStore(dim=DIM, index_path=path, compaction_threshold=None, merge_threshold=8, **kwargs)
+
+
+def test_unflushed_writes_are_replayed_from_the_wal(tmp_path):
+    path = str(tmp_path / "index.faiss")
+    store = _store(path)
+    data = _vectors(20)
+    store.add_embeddings([f"r{i}" for i in range(10)], data[:10], [{"type": "recycler"}] * 10)
+    store.flush()
+    store.add_embeddings([f"r{i}" for i in range(10, 20)], data[10:], [{"type": "recycler", "n": 1}] * 10)
+    store.upsert("r3", data[0], {"type": "recycler", "replaced": True})
+    store.delete("r5")
+    # No flush: a crash now leaves only the snapshot of the first ten plus the log
+
+    reloaded = _store(path)
+    assert sorted(reloaded.item_ids()) == sorted(store.item_ids())
+    assert "r5" not in reloaded and reloaded.metadata("r3")["replaced"] is True
+    np.testing.assert_allclose(reloaded.vector("r15"), store.vector("r15"), atol=1e-6)
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="needs /proc/self/maps")
+def test_flush_never_replaces_a_mapped_table(tmp_path, monkeypatch):
+    path = str(tmp_path / "index.faiss")
+    store = _store(path)
+    store.add_embeddings(["a", "b"], _vectors(2), [{"type": "recycler"}] * 2)
+    store.flush()
+
+    # Windows refuses to replace a file that is memory-mapped
+    real = os.replace
+
+    def replace(src, dst):
+        with open("/proc/self/maps", encoding="utf-8") as fh:
+            if os.path.abspath(dst) in {line.split()[-1] for line in fh if "/" in line}:
+                raise PermissionError(dst)
+        real(src, dst)
+
+    monkeypatch.setattr(os, "replace", replace)
+    reloaded = _store(path)
+    held = reloaded._snap.meta
+    for i in range(3):
+        reloaded.upsert(f"c{i}", _vectors(1, seed=i)[0], {"type": "recycler", "n": i})
+        reloaded.flush()
+    assert sorted(_store(path).item_ids()) == ["a", "b", "c0", "c1", "c2"]
+    assert held.get(reloaded._item_to_id["a"])[0] == "a"  # an old snapshot still reads its mapping
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("index.faiss.meta.")]) == 1
+
+
+def test_torn_last_wal_line_is_ignored(tmp_path):
+    path = str(tmp_path / "index.faiss")
+    store = _store(path)
+    store.add_embeddings(["a", "b"], _vectors(2), [{"type": "recycler"}] * 2)
+    with open(store.wal_path, "a", encoding="utf-8") as fh:
+        fh.write('{"op": "add", "id": 2, "item_id": "c", "vec')
+    assert sorted(_store(path).item_ids()) == ["a", "b"]
+
+
+def test_flush_truncates_the_wal(tmp_path):
+    path = str(tmp_path / "index.faiss")
+    store = _store(path, flush_every=5)
+    store.add_embeddings(["a", "b"], _vectors(2), [{"type": "recycler"}] * 2)
+    assert os.path.exists(store.wal_path)
+    store.add_embeddings(["c", "d", "e"], _vectors(3, seed=1), [{"type": "recycler"}] * 3)
+    assert not os.path.exists(store.wal_path)
+    assert sorted(FAISSVectorStore(dim=DIM, index_path=path, use_wal=False).item_ids()) == list("abcde")
+
+
+def test_flush_interval_flushes_without_another_write(tmp_path):
+    path = str(tmp_path / "index.faiss")
+    store = _store(path, flush_interval=0.2)
+    time.sleep(0.25)
+    store.add_embedding("a", _vectors(1)[0], {"type": "recycler"})  # interval already passed: flushed now
+    store.add_embedding("b", _vectors(1, seed=1)[0], {"type": "recycler"})
+    assert os.path.exists(store.wal_path)
+    deadline = time.monotonic() + 5
+    while os.path.exists(store.wal_path) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not os.path.exists(store.wal_path)
+    assert sorted(FAISSVectorStore(dim=DIM, index_path=path, use_wal=False).item_ids()) == ["a", "b"]
+
+
+@pytest.mark.parametrize("spec", ["flat", "hnsw", "ivf_flat:nlist=16,nprobe=4"])
+def test_batch_search_equals_per_query_search(spec):
+    store = FAISSVectorStore(dim=DIM, index_spec=IndexSpec.parse(spec), compaction_threshold=None, merge_threshold=300)
+    data = _vectors(1000)
+    store.add_embeddings([f"r{i}" for i in range(900)], data[:900], [{"type": "recycler"}] * 900)
+    # Some rows still in the staging buffer, some deleted
+    store.add_embeddings([f"r{i}" for i in range(900, 1000)], data[900:], [{"type": "recycler"}] * 100)
+    for i in range(0, 1000, 7):
+        store.delete(f"r{i}")
+
+    queries = _vectors(12, seed=3)
+    batch = store.search_similar_batch(queries, top_k=8)
+    assert len(batch) == len(queries)
+    for query, hits in zip(queries, batch):
+        single = store.search_similar(query, top_k=8)
+        assert [rec.item_id for _, rec in hits] == [rec.item_id for _, rec in single]
+        np.testing.assert_allclose([s for s, _ in hits], [s for s, _ in single], rtol=1e-5)
+
+
+SPECS = ["flat", "hnsw", "ivf_flat:nlist=16,nprobe=16"]
+
+
+def _filled(spec: str, n: int = 600, path=None, **kwargs) -> FAISSVectorStore:
+    kwargs.setdefault("compaction_threshold", None)
+    store = FAISSVectorStore(dim=DIM, index_path=path, index_spec=IndexSpec.parse(spec), **kwargs)
+    store.add_embeddings([f"r{i}" for i in range(n)], _vectors(n), [{"type": "recycler", "n": i} for i in range(n)])
+    return store
+
+
+def _top_ids(store: FAISSVectorStore, query: np.ndarray, top_k: int = 5):
+    return [rec.item_id for _, rec in store.search_similar(query, top_k=top_k)]
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_upsert_replaces_vector_and_metadata(spec):
+    store = _filled(spec)
+    target = _vectors(1, seed=9)[0]
+    assert _top_ids(store, target, 1) != ["r5"]
+    store.upsert("r5", target, {"type": "recycler", "replaced": True})
+    assert len(store) == 600
+    assert _top_ids(store, target, 1) == ["r5"]
+    assert store.metadata("r5") == {"type": "recycler", "replaced": True}
+    np.testing.assert_allclose(store.vector("r5"), target / np.linalg.norm(target), atol=1e-5)
+    # The old vector is gone: its own top hit is no longer r5
+    assert "r5" not in _top_ids(store, _vectors(600)[5], 1)
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_duplicate_id_in_one_batch_keeps_the_last_write(spec):
+    store = _filled(spec)
+    vecs = _vectors(3, seed=11)
+    store.add_embeddings(["dup", "other", "dup"], vecs, [{"v": 1}, {"v": 2}, {"v": 3}])
+    assert len(store) == 602
+    assert store.metadata("dup") == {"v": 3}
+    assert _top_ids(store, vecs[2], 1) == ["dup"]
+    np.testing.assert_allclose(store.vector("dup"), vecs[2] / np.linalg.norm(vecs[2]), atol=1e-5)
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_deleted_ids_never_come_back(spec):
+    store = _filled(spec)
+    data = _vectors(600)
+    deleted = {f"r{i}" for i in range(0, 600, 3)}
+    for item_id in deleted:
+        assert store.delete(item_id)
+    assert not store.delete("r0") and len(store) == 400
+    for hits in store.search_similar_batch(data[:60], top_k=50):
+        assert not {rec.item_id for _, rec in hits} & deleted
+    for query in data[:60:3]:
+        assert not set(_top_ids(store, query, 50)) & deleted
+
+
+def test_dead_set_is_rebuilt_only_when_it_changes():
+    store = _filled("flat", merge_threshold=50)
+    store.delete("r1")
+    selector = store._snap.dead_selector
+    vecs = _vectors(3, seed=13)
+    store.upsert("new0", vecs[0], {})
+    assert store._snap.dead_selector is selector
+    # A tombstone in the staging buffer, then more live rows staged after it
+    store.delete("new0")
+    assert store._snap.dead_selector is not selector
+    selector = store._snap.dead_selector
+    store.upsert("new1", vecs[1], {})
+    store.upsert("new2", vecs[2], {})
+    assert store._snap.dead_selector is selector
+    assert store._snap.delta_dead.tolist() == [True, False, False]
+    assert "new0" not in _top_ids(store, vecs[0], 5)
+    assert _top_ids(store, vecs[2], 1) == ["new2"]
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_compaction_keeps_the_live_set_across_reload(tmp_path, spec):
+    path = str(tmp_path / "index.faiss")
+    store = _filled(spec, path=path)
+    for i in range(0, 600, 2):
+        store.delete(f"r{i}")
+    before = sorted(store.item_ids())
+    queries = _vectors(5, seed=4)
+    expected = [_top_ids(store, q) for q in queries]
+    assert store.compact() == 300
+    assert store.ntotal == 300 and sorted(store.item_ids()) == before
+    reloaded = FAISSVectorStore(dim=DIM, index_path=path, index_spec=IndexSpec.parse(spec))
+    assert sorted(reloaded.item_ids()) == before and reloaded.ntotal == 300
+    assert reloaded.metadata("r7") == {"type": "recycler", "n": 7}
+    if spec == "flat":
+        assert [_top_ids(reloaded, q) for q in queries] == expected
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_background_compaction_keeps_the_live_set(spec):
+    store = _filled(spec, compaction_threshold=0.2)
+    for i in range(200):
+        store.delete(f"r{i}")
+    deadline = time.monotonic() + 10
+    while store._compacting and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Compacted once a fifth of the rows were dead; later tombstones wait for the next round
+    assert 400 <= store.ntotal < 600 and store.dead_fraction <= 0.2
+    assert sorted(store.item_ids()) == sorted(f"r{i}" for i in range(200, 600))
+    hits = store.search_similar_batch(_vectors(600)[:200], top_k=20)
+    assert all(int(rec.item_id[1:]) >= 200 for row in hits for _, rec in row)
+
+
+def _regenerate(store: FAISSVectorStore, rows) -> None:
+    # What scripts/generate_embeddings.py does per namespace
+    ids = [item_id for item_id, _ in rows]
+    store.add_embeddings(ids, np.vstack([vec for _, vec in rows]), [{"type": "recycler"}] * len(rows))
+    for stale in set(store.item_ids()) - set(ids):
+        store.delete(stale)
+    store.compact()
+    store.flush()
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_regenerating_embeddings_adds_no_duplicates(tmp_path, spec):
+    path = str(tmp_path / "index.faiss")
+    data = _vectors(600)
+    rows = [(f"r{i}", data[i]) for i in range(600)]
+    for run in range(3):
+        store = FAISSVectorStore(dim=DIM, index_path=path, index_spec=IndexSpec.parse(spec))
+        _regenerate(store, rows if run < 2 else rows[:500])
+    reloaded = FAISSVectorStore(dim=DIM, index_path=path, index_spec=IndexSpec.parse(spec))
+    assert len(reloaded) == 500 and reloaded.ntotal == 500
+    assert sorted(reloaded.item_ids()) == sorted(f"r{i}" for i in range(500))
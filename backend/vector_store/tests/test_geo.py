@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.vector_store.geo import GeoGrid, haversine_km_array
+
+
+def _points(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    lats = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))  # uniform over the sphere
+    lngs = rng.uniform(-180, 180, n)
+    # Pile some points onto the edges a grid gets wrong first
+    lats[:20], lngs[20:40] = rng.choice([-90.0, 90.0, 89.95, -89.95], 20), rng.choice([-180.0, 179.99], 20)
+    lats[40:50] = np.nan
+    return np.arange(n, dtype="int64") * 3, lats, lngs
+
+
+@pytest.mark.parametrize("cell_deg", [0.5, 1.0, 5.0])
+def test_radius_query_equals_brute_force(cell_deg):
+    ids, lats, lngs = _points(5000)
+    grid = GeoGrid(ids, lats, lngs, cell_deg=cell_deg)
+    assert len(grid) == 4990
+    rng = np.random.default_rng(1)
+    centres = [(0.0, 179.9), (0.0, -180.0), (89.9, 10.0), (-88.0, -45.0), (19.0, 73.0)]
+    centres += [(float(la), float(lo)) for la, lo in zip(rng.uniform(-90, 90, 25), rng.uniform(-180, 180, 25))]
+    for lat, lng in centres:
+        for radius in (0.0, 25.0, 300.0, 2500.0, 21000.0):
+            known = ~np.isnan(lats)
+            distance = haversine_km_array(lat, lng, lats[known], lngs[known])
+            expected = np.sort(ids[known][distance <= radius])
+            assert np.array_equal(np.sort(grid.query(lat, lng, radius)), expected), (lat, lng, radius)
+
+
+def test_empty_grid_and_negative_radius():
+    empty = np.empty(0)
+    assert len(GeoGrid(empty.astype("int64"), empty, empty).query(0.0, 0.0, 100.0)) == 0
+    ids, lats, lngs = _points(100)
+    assert len(GeoGrid(ids, lats, lngs).query(0.0, 0.0, -1.0)) == 0
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.vector_store.faiss_store import FAISSVectorStore
+from backend.vector_store.index_spec import IndexSpec
+
+DIM = 32
+N = 5000
+K = 10
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    base = rng.standard_normal((N, DIM)).astype("float32")
+    queries = rng.standard_normal((100, DIM)).astype("float32")
+    unit = base / np.linalg.norm(base, axis=1, keepdims=True)
+    truth = np.argsort(-(queries @ unit.T), axis=1)[:, :K]
+    return base, queries, truth
+
+
+def _store(spec: str, base: np.ndarray, **kwargs) -> FAISSVectorStore:
+    store = FAISSVectorStore(dim=DIM, index_spec=IndexSpec.parse(spec), compaction_threshold=None, **kwargs)
+    store.add_embeddings([str(i) for i in range(len(base))], base, [{"type": "recycler"}] * len(base))
+    return store
+
+
+def _recall(store: FAISSVectorStore, queries: np.ndarray, truth: np.ndarray) -> float:
+    hits = store.search_similar_batch(queries, top_k=K)
+    return float(np.mean([len({int(rec.item_id) for _, rec in row} & set(t)) / K for row, t in zip(hits, truth)]))
+
+
+@pytest.mark.parametrize(
+    "spec", ["flat:storage=fp16,rerank=2", "flat:storage=int8,rerank=4", "hnsw:storage=int8,rerank=4"]
+)
+def test_quantized_storage_with_rerank_reaches_flat_recall(data, spec):
+    base, queries, truth = data
+    flat = _recall(_store("flat", base), queries, truth)
+    assert flat == 1.0
+    assert _recall(_store(spec, base), queries, truth) >= flat - 0.005
+    # Exact re-scoring: the reported scores are float32 cosines, not decoded approximations
+    store = _store(spec, base)
+    score, rec = store.search_similar(queries[0], top_k=1)[0]
+    unit = base[int(rec.item_id)] / np.linalg.norm(base[int(rec.item_id)])
+    assert score == pytest.approx(float(unit @ (queries[0] / np.linalg.norm(queries[0]))), abs=1e-5)
+
+
+def test_int8_without_rerank_loses_recall_that_rerank_restores(data):
+    base, queries, truth = data
+    assert _recall(_store("flat:storage=int8", base), queries, truth) < 1.0
+    assert _recall(_store("flat:storage=int8,rerank=4", base), queries, truth) == 1.0
+
+
+def test_ivf_pq_recall(data):
+    base, queries, truth = data
+    spec = "ivf_pq:nlist=32,pq_m=16,pq_nbits=4,nprobe=32"
+    assert _recall(_store(spec, base), queries, truth) >= 0.4
+    assert _recall(_store(spec + ",rerank=10", base), queries, truth) >= 0.95
+
+
+@pytest.mark.parametrize(
+    "spec", ["flat:storage=int8,rerank=4", "hnsw:storage=fp16,rerank=2", "ivf_flat:nlist=32,storage=int8,rerank=4"]
+)
+def test_read_only_mmap_load_matches_read_write(tmp_path, data, spec):
+    base, queries, _ = data
+    path = str(tmp_path / "index.faiss")
+    writer = _store(spec, base, index_path=path)
+    writer.flush()
+    reader = FAISSVectorStore(dim=DIM, index_path=path, index_spec=IndexSpec.parse(spec), read_only=True)
+    pairs = zip(reader.search_similar_batch(queries, top_k=K), writer.search_similar_batch(queries, top_k=K))
+    for got, expected in pairs:
+        assert [rec.item_id for _, rec in got] == [rec.item_id for _, rec in expected]
+        np.testing.assert_allclose([s for s, _ in got], [s for s, _ in expected], rtol=1e-6)
+
+
+def test_hnsw_compaction_rebuilds_from_exact_vectors(data, monkeypatch):
+    base, queries, truth = data
+    store = _store("hnsw:storage=int8,rerank=4", base)
+    for i in range(0, N, 4):
+        store.delete(str(i))
+    trained = []
+    real = store._train_index
+    monkeypatch.setattr(
+        store, "_train_index", lambda index, sample: trained.append(sample.copy()) or real(index, sample)
+    )
+    assert store.compact() == N // 4
+
+    live = np.array([i for i in range(N) if i % 4], dtype="int64")
+    exact = base[live] / np.linalg.norm(base[live], axis=1, keepdims=True)
+    np.testing.assert_allclose(trained[0], exact, atol=1e-6)  # not the int8-decoded codes
+    np.testing.assert_allclose(store.vector("1"), exact[0], atol=1e-6)
+    kept = np.isin(truth, live)
+    hits = store.search_similar_batch(queries, top_k=K)
+    found = [{int(rec.item_id) for _, rec in row} for row in hits]
+    assert np.mean([len(f & set(t[m])) / max(1, m.sum()) for f, t, m in zip(found, truth, kept)]) >= 0.99
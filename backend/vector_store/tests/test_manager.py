@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import numpy as np
+
+from backend.vector_store.manager import VectorStoreManager
+from backend.vector_store.namespaced import NamespacedVectorStore
+
+DIM = 8
+
+
+def _write(index_path: str, item_ids) -> None:
+    writer = NamespacedVectorStore(dim=DIM, index_path=index_path, compaction_threshold=None)
+    vecs = np.random.default_rng(len(item_ids)).standard_normal((len(item_ids), DIM))
+    writer.recyclers.add_embeddings(item_ids, vecs, [{"type": "recycler"}] * len(item_ids))
+    writer.flush()
+
+
+def test_reload_picks_up_rewritten_files(tmp_path):
+    path = str(tmp_path / "vector_index.faiss")
+    _write(path, ["r0"])
+    manager = VectorStoreManager(dim=DIM, index_path=path)
+    first = manager.current()
+    assert manager.version == 1 and "r0" in first.recyclers
+    assert not manager.reload_if_changed()
+    assert manager.current() is first  # shared, not rebuilt per request
+
+    _write(path, ["r1", "r2"])  # another process rewrites the index
+    assert manager.reload_if_changed()
+    version, current = manager.current_versioned()
+    assert version == 2 and current is not first
+    assert sorted(current.recyclers.item_ids()) == ["r0", "r1", "r2"]
+    assert not manager.reload_if_changed()
+
+
+def test_unreadable_files_keep_the_current_store(tmp_path, monkeypatch):
+    path = str(tmp_path / "vector_index.faiss")
+    _write(path, ["r0"])
+    manager = VectorStoreManager(dim=DIM, index_path=path)
+    first = manager.current()
+    _write(path, ["r1"])
+
+    def broken(*args, **kwargs):
+        raise OSError("truncated")
+
+    monkeypatch.setattr(manager, "_load", broken)
+    assert not manager.reload_if_changed()
+    assert manager.current() is first and manager.version == 1
+    monkeypatch.undo()
+    assert manager.reload_if_changed()  # retried on the next poll
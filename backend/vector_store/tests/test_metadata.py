@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import numpy as np
+
+from backend.vector_store.faiss_store import FOLD_MIN_ROWS, FAISSVectorStore
+from backend.vector_store.geo import haversine_km_array
+from backend.vector_store.metadata import MetadataTable
+
+MATERIALS = ["Plastic", "metal", "glass", "paper"]
+
+
+def _metadata(rng: np.random.Generator) -> dict:
+    return {
+        "type": "recycler",
+        "location": {"lat": float(rng.uniform(8, 35)), "lng": float(rng.uniform(68, 97))},
+        "accepted_materials": list(rng.choice(MATERIALS, size=int(rng.integers(0, 3)), replace=False)),
+        "remaining_capacity": float(rng.uniform(0, 500)),
+    }
+
+
+def _in_memory_store(n: int, batch: int, dim: int = 8) -> tuple:
+    rng = np.random.default_rng(0)
+    store = FAISSVectorStore(dim=dim, compaction_threshold=None)
+    metadatas = [_metadata(rng) for _ in range(n)]
+    for start in range(0, n, batch):
+        ids = [f"r{i}" for i in range(start, min(start + batch, n))]
+        store.add_embeddings(ids, rng.standard_normal((len(ids), dim)), metadatas[start : start + batch])
+    return store, metadatas
+
+
+def test_in_memory_store_folds_pending_rows():
+    store, _ = _in_memory_store(5000, batch=50)
+    meta = store._snap.meta
+    assert meta.pending_rows < max(FOLD_MIN_ROWS, len(meta) // 32) + 50
+
+
+def test_merge_folds_pending_rows():
+    store, _ = _in_memory_store(300, batch=300)
+    store._write_lock.acquire()
+    try:
+        store._merge_delta()
+        store._publish()
+    finally:
+        store._write_lock.release()
+    assert store._snap.meta.pending_rows == 0
+
+
+def test_queries_on_in_memory_store_match_brute_force():
+    store, metadatas = _in_memory_store(3000, batch=40)
+    meta = store._snap.meta
+    by_item = {item_id: internal_id for internal_id, item_id in meta.item_ids()}
+
+    expected = {by_item[f"r{i}"] for i, md in enumerate(metadatas) if "metal" in md["accepted_materials"]}
+    assert set(meta.ids_with_term("accepted_materials", "METAL").tolist()) == expected
+
+    lats = np.array([md["location"]["lat"] for md in metadatas])
+    lngs = np.array([md["location"]["lng"] for md in metadatas])
+    near = np.flatnonzero(haversine_km_array(20.0, 80.0, lats, lngs) <= 500.0)
+    assert set(meta.within_radius(20.0, 80.0, 500.0).tolist()) == {by_item[f"r{i}"] for i in near}
+
+    ids = np.array([by_item[f"r{i}"] for i in range(len(metadatas))], dtype="int64")
+    values = meta.gather(ids)
+    assert values["found"].all()
+    np.testing.assert_allclose(values["remaining_capacity"], [md["remaining_capacity"] for md in metadatas])
+    np.testing.assert_allclose(values["lat"], lats)
+
+
+def test_gather_mixes_pending_and_column_rows():
+    table = MetadataTable()
+    table.append(0, "a", {"location": {"lat": 1.0, "lng": 2.0}, "goals": ["x"]})
+    table.fold_pending()
+    table.append(1, "b", {"remaining_capacity": 5.0, "goals": ["X", "y"]})
+    values = table.gather(np.array([1, 0, 7]), bits=("goals",))
+    assert values["found"].tolist() == [True, True, False]
+    assert values["lat"][1] == 1.0 and np.isnan(values["lat"][0])
+    assert values["remaining_capacity"][0] == 5.0
+    # "X" and "x" share a case-folded bit
+    assert (values["goals_bits"][0] & values["goals_bits"][1]).any()
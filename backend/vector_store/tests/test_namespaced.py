@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pytest
+
+from backend.vector_store.namespaced import NamespacedVectorStore, namespace_index_path
+from backend.vector_store.namespaces import RECYCLERS
+
+DIM = 8
+
+
+def _store(index_path=None) -> NamespacedVectorStore:
+    return NamespacedVectorStore(dim=DIM, index_path=index_path, compaction_threshold=None)
+
+
+def test_namespaces_are_searched_separately():
+    store = _store()
+    rng = np.random.default_rng(0)
+    query = rng.standard_normal(DIM)
+    store.recyclers.add_embeddings(["r0", "r1"], rng.standard_normal((2, DIM)), [{"type": "recycler"}] * 2)
+    # Listings identical to the query would win any search they shared with recyclers
+    store.listings.add_embeddings(["l0", "l1"], np.vstack([query, query]), [{"type": "listing"}] * 2)
+
+    recyclers = [rec.item_id for _, rec in store.recyclers.search_similar(query, top_k=4)]
+    listings = [rec.item_id for _, rec in store.listings.search_similar(query, top_k=4)]
+    assert sorted(recyclers) == ["r0", "r1"]
+    assert sorted(listings) == ["l0", "l1"]
+    assert store.listings.delete("r0") is False and "r0" in store.recyclers
+
+
+def test_same_id_can_live_in_both_namespaces():
+    store = _store()
+    store.recyclers.upsert("x", np.ones(DIM), {"type": "recycler"})
+    store.listings.upsert("x", -np.ones(DIM), {"type": "listing"})
+    assert store.recyclers.metadata("x")["type"] == "recycler"
+    assert store.listings.metadata("x")["type"] == "listing"
+
+
+def test_each_namespace_persists_to_its_own_files(tmp_path):
+    path = str(tmp_path / "vector_index.faiss")
+    store = _store(path)
+    store.recyclers.upsert("r0", np.ones(DIM), {"type": "recycler"})
+    store.listings.upsert("l0", np.ones(DIM), {"type": "listing"})
+    store.flush()
+    assert os.path.exists(namespace_index_path(path, RECYCLERS))
+    reloaded = _store(path)
+    assert reloaded.recyclers.item_ids() == ["r0"] and reloaded.listings.item_ids() == ["l0"]
+
+
+def test_unknown_namespace_is_rejected():
+    with pytest.raises(KeyError):
+        _store().namespace("bogus")
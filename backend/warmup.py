@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from backend.matching.recycler_attributes import RecyclerAttributes
+    from backend.vector_store.manager import VectorStoreManager
+
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """
+    Loads the embedding model, the vector index and the recycler attributes in a background thread;
+    ``/ready`` reports ready only once the model has encoded and the index has answered a search.
+    """
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, float] = {}
+        self.manager: Optional["VectorStoreManager"] = None
+        self.attributes: Optional["RecyclerAttributes"] = None
+        self.error: Optional[str] = None
+        self._ready = threading.Event()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until warmup succeeded or failed; returns whether the service is ready."""
+        self._done.wait(timeout)
+        return self.ready
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self.manager is not None:
+            self.manager.stop()
+        if self.attributes is not None:
+            self.attributes.stop()
+
+    def _timed(self, name: str, started: float) -> float:
+        now = time.perf_counter()
+        self.timings[name] = round(now - started, 3)
+        return now
+
+    def _run(self) -> None:
+        started = time.perf_counter()
+        try:
+            from backend.ai import embedding_service
+            from backend.db import SessionLocal
+            from backend.matching.match_cache import get_match_cache
+            from backend.matching.recycler_attributes import RecyclerAttributes
+            from backend.vector_store.manager import VectorStoreManager
+            from backend.vector_store.namespaced import index_specs_from_env
+
+            t = self._timed("lazy_import_s", started)
+            dim = embedding_service.warmup()
+            t = self._timed("model_s", t)
+
+            # One long-lived store per process, hot-reloaded when the index files change
+            manager = VectorStoreManager(
+                dim=dim,
+                index_path=os.getenv("VECTOR_INDEX_PATH", "backend/vector_index.faiss"),
+                poll_interval=float(os.getenv("VECTOR_INDEX_POLL_SECONDS", 2.0)),
+                index_specs=index_specs_from_env(),
+                # VECTOR_STORE_MMAP=1: serve the published generation read-only and memory-mapped,
+                # so all worker processes on a host share one copy of the index
+                read_only=os.getenv("VECTOR_STORE_MMAP", "0") == "1",
+            )
+            probe = np.random.default_rng(0).standard_normal(dim).astype("float32")
+            for namespace in manager.current().namespaces:
+                # Touches the index pages (mmap) and the search code paths once
+                manager.current().namespace(namespace).search_similar(probe, top_k=1)
+            manager.start()
+            self.manager = manager
+            t = self._timed("index_s", t)
+
+            attributes = RecyclerAttributes(session_factory=SessionLocal)
+            try:
+                attributes.refresh()
+            except Exception:
+                logger.exception("Could not load recycler attributes; scoring uses the index metadata")
+            # Picks up capacity changes written by other worker processes
+            attributes.start(float(os.getenv("RECYCLER_ATTRIBUTES_REFRESH_SECONDS", 30.0)))
+            cache = get_match_cache()
+            if cache is not None:
+                cache.watch_attributes(attributes)
+            self.attributes = attributes
+            self._timed("attributes_s", t)
+            self._timed("warmup_s", started)
+            self._ready.set()
+            logger.info("Warmup finished: %s", self.timings)
+        except Exception as exc:
+            self.error = f"{type(exc).__name__}: {exc}"
+            logger.exception("Warmup failed")
+        finally:
+            self._done.set()
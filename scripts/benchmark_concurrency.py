@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import argparse
+import os
+import threading
+import time
+from typing import List
+
+import faiss  # type: ignore
+import numpy as np
+
+from backend.vector_store.faiss_store import FAISSVectorStore
+from backend.vector_store.index_spec import IndexSpec
+
+
+def run(store: FAISSVectorStore, queries: np.ndarray, threads: int, seconds: float, k: int, writer: bool) -> dict:
+    stop = threading.Event()
+    counts: List[int] = [0] * threads
+    writes = [0]
+
+    def reader(slot: int) -> None:
+        i = slot
+        while not stop.is_set():
+            store.search_similar(queries[i % len(queries)], top_k=k)
+            counts[slot] += 1
+            i += threads
+
+    def write_loop() -> None:
+        rng = np.random.default_rng(1)
+        while not stop.is_set():
+            # Upserts keep the index size stable while still exercising the write path
+            item = f"w{writes[0] % 1000}"
+            store.upsert(item, rng.standard_normal(store.dim).astype("float32"), {"type": "recycler"})
+            writes[0] += 1
+            time.sleep(0.001)
+
+    workers = [threading.Thread(target=reader, args=(slot,)) for slot in range(threads)]
+    if writer:
+        workers.append(threading.Thread(target=write_loop))
+    for w in workers:
+        w.start()
+    time.sleep(seconds)
+    stop.set()
+    for w in workers:
+        w.join()
+    return {"threads": threads, "qps": sum(counts) / seconds, "writes_per_s": writes[0] / seconds}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Search QPS of one shared FAISSVectorStore vs reader threads")
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=30)
+    parser.add_argument("--spec", default="hnsw")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--writer", action="store_true", help="run a concurrent upsert loop while searching")
+    args = parser.parse_args()
+
+    # One OpenMP thread per query, so scaling comes from concurrent requests as under uvicorn
+    faiss.omp_set_num_threads(1)
+
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((args.n, args.dim)).astype("float32")
+    store = FAISSVectorStore(dim=args.dim, index_spec=IndexSpec.parse(args.spec), compaction_threshold=None)
+    store.add_embeddings([str(i) for i in range(args.n)], data, [{"type": "recycler"}] * args.n)
+    queries = rng.standard_normal((1000, args.dim)).astype("float32")
+
+    print(f"{args.n} vectors, dim={args.dim}, spec={args.spec}, k={args.k}, {os.cpu_count()} CPUs, writer={args.writer}")
+    print(f"{'threads':>8} {'qps':>10} {'speedup':>8} {'writes/s':>9}")
+    baseline = None
+    for threads in args.threads:
+        r = run(store, queries, threads, args.seconds, args.k, args.writer)
+        baseline = baseline or r["qps"]
+        print(f"{r['threads']:>8} {r['qps']:>10.1f} {r['qps'] / baseline:>8.2f} {r['writes_per_s']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
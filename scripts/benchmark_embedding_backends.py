@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from backend.ai.embedding_service import DEFAULT_MODEL
+from backend.ai.model_backends import BACKENDS, load_model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CPU latency and throughput of each embedding backend")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", DEFAULT_MODEL))
+    parser.add_argument("--backend", choices=BACKENDS, action="append")
+    parser.add_argument("--single", type=int, default=200, help="batch-of-one calls for latency")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--batches", type=int, default=20)
+    args = parser.parse_args()
+
+    texts = [f"Listing {i}: mixed plastic packaging waste, baled, about {i % 40 + 1} tonnes" for i in range(512)]
+    print(f"model={args.model}, {os.cpu_count()} CPUs")
+    print(f"{'backend':<10} {'load s':>7} {'p50 ms':>8} {'p99 ms':>8} {'batch texts/s':>14}")
+    for backend in args.backend or BACKENDS:
+        start = time.perf_counter()
+        model = load_model(args.model, backend)
+        load_s = time.perf_counter() - start
+        model.encode(texts[:8])  # warmup
+
+        latencies = []
+        for i in range(args.single):
+            start = time.perf_counter()
+            model.encode([texts[i % len(texts)]])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        for i in range(args.batches):
+            offset = (i * args.batch_size) % len(texts)
+            model.encode(texts[offset : offset + args.batch_size], batch_size=args.batch_size)
+        throughput = args.batches * args.batch_size / (time.perf_counter() - start)
+
+        print(
+            f"{backend:<10} {load_s:>7.1f} {np.percentile(latencies, 50):>8.2f} "
+            f"{np.percentile(latencies, 99):>8.2f} {throughput:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import argparse
+import os
+import threading
+import time
+from typing import List
+
+import numpy as np
+
+from backend.ai import embedding_service
+from backend.ai.embedding_service import get_waste_embedding
+
+
+SAMPLE_TEXTS = [
+    "Shredded PET bottles, clear, baled",
+    "Mixed cardboard offcuts from packaging line",
+    "Used cooking oil in 200 l drums",
+    "Aluminium swarf, lightly oiled",
+    "Post-consumer HDPE crates, broken",
+    "Glass cullet, green and brown",
+    "Textile scraps, 100% cotton",
+    "E-waste: old laptops and monitors",
+]
+
+
+def run(clients: int, seconds: float, batching: bool) -> dict:
+    os.environ["EMBEDDING_MICROBATCH"] = "1" if batching else "0"
+    batcher = embedding_service._get_batcher("text")
+    before = (batcher.batches, batcher.items) if batcher else (0, 0)
+    stop = threading.Event()
+    latencies: List[List[float]] = [[] for _ in range(clients)]
+
+    def client(slot: int) -> None:
+        i = slot
+        while not stop.is_set():
+            start = time.perf_counter()
+            get_waste_embedding(f"{SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]} #{i}")
+            latencies[slot].append(time.perf_counter() - start)
+            i += clients
+
+    threads = [threading.Thread(target=client, args=(slot,)) for slot in range(clients)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    flat = np.array([x for per_client in latencies for x in per_client]) * 1000
+    batches = batcher.batches - before[0] if batcher else len(flat)
+    items = batcher.items - before[1] if batcher else len(flat)
+    return {
+        "clients": clients,
+        "batching": batching,
+        "qps": len(flat) / seconds,
+        "p50_ms": float(np.percentile(flat, 50)) if len(flat) else 0.0,
+        "p99_ms": float(np.percentile(flat, 99)) if len(flat) else 0.0,
+        "mean_batch": items / batches if batches else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Embedding throughput with and without micro-batching")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    os.environ["EMBEDDING_MAX_BATCH"] = str(args.max_batch)
+    os.environ["EMBEDDING_MAX_WAIT_MS"] = str(args.max_wait_ms)
+    # Load the model and run one forward pass before timing anything
+    get_waste_embedding("warmup")
+
+    print(f"model={os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')}, {os.cpu_count()} CPUs, "
+          f"max_batch={args.max_batch}, max_wait={args.max_wait_ms} ms, {args.seconds} s per run")
+    print(f"{'clients':>8} {'batching':>9} {'qps':>9} {'p50 ms':>8} {'p99 ms':>8} {'batch':>6}")
+    for clients in args.clients:
+        for batching in (False, True):
+            r = run(clients, args.seconds, batching)
+            print(
+                f"{r['clients']:>8} {'on' if r['batching'] else 'off':>9} {r['qps']:>9.1f} "
+                f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['mean_batch']:>6.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
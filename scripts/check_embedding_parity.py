@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from backend.ai.embedding_service import DEFAULT_MODEL
+from backend.ai.model_backends import BACKENDS, PARITY_MIN_COSINE, TORCH, load_model
+
+
+SAMPLE_TEXTS = [
+    "Shredded PET bottles, clear, baled",
+    "Mixed cardboard offcuts from packaging line",
+    "Used cooking oil in 200 l drums",
+    "Aluminium swarf, lightly oiled",
+    "Post-consumer HDPE crates, broken",
+    "Glass cullet, green and brown",
+    "Textile scraps, 100% cotton",
+    "E-waste: old laptops and monitors, some with cracked screens",
+    "Wood pallets, mostly intact, heat treated",
+    "Copper wire offcuts with PVC insulation",
+]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cosine agreement of an ONNX embedding backend with PyTorch")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", DEFAULT_MODEL))
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != TORCH], action="append")
+    parser.add_argument("--min-cosine", type=float, default=None, help="default: 0.999 for onnx, 0.98 for onnx-int8")
+    args = parser.parse_args()
+
+    reference = load_model(args.model, TORCH).encode(SAMPLE_TEXTS, normalize_embeddings=True)
+    failed = False
+    for backend in args.backend or [b for b in BACKENDS if b != TORCH]:
+        vecs = load_model(args.model, backend).encode(SAMPLE_TEXTS, normalize_embeddings=True)
+        cosines = np.sum(reference * vecs, axis=1)
+        # Rankings matter more than raw values: does each text still pick the same nearest neighbour?
+        same_nn = np.mean(
+            np.argsort(-(reference @ reference.T), axis=1)[:, 1] == np.argsort(-(vecs @ vecs.T), axis=1)[:, 1]
+        )
+        threshold = args.min_cosine if args.min_cosine is not None else PARITY_MIN_COSINE[backend]
+        ok = cosines.min() >= threshold
+        failed |= not ok
+        print(
+            f"{backend:<10} min cos {cosines.min():.5f}  mean cos {cosines.mean():.5f}  "
+            f"same nearest neighbour {same_nn:.0%}  {'OK' if ok else f'FAIL (< {threshold})'}"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
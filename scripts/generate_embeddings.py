@@ -10,57 +10,81 @@ from sentence_transformers import SentenceTransformer
 from backend.ai.embedding_service import get_embedding_dimension
 from backend.db import SessionLocal, engine
 from backend.models import Recycler, WasteListing as DBListing
-from backend.vector_store.faiss_store import FAISSVectorStore
-
-
-def as_list(csv: str | None) -> List[str]:
-    if not csv:
-        return []
-    return [s.strip() for s in csv.split(",") if s.strip()]
+from backend.vector_store.bitsets import split_terms
+from backend.vector_store.namespaced import LISTINGS, RECYCLERS, NamespacedVectorStore, index_specs_from_env
+from backend.vector_store.publish import publish_generation
 
 
 def main() -> None:
     load_dotenv()
     index_path = os.getenv("VECTOR_INDEX_PATH", "backend/vector_index.faiss")
     model_name = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
 
     # Ensure DB tables exist (no migrations here for simplicity)
     from backend.db import Base
     Base.metadata.create_all(bind=engine)
 
     model = SentenceTransformer(model_name)
-    store = FAISSVectorStore(dim=get_embedding_dimension(), index_path=index_path)
+    # VECTOR_INDEX_SPEC[_RECYCLER|_LISTING] picks the index type, e.g. "hnsw" or "ivf_flat:nlist=4096,nprobe=32"
+    store = NamespacedVectorStore(
+        dim=get_embedding_dimension(), index_path=index_path, index_specs=index_specs_from_env()
+    )
 
     db = SessionLocal()
     try:
         recyclers: List[Recycler] = db.query(Recycler).all()
-        for r in recyclers:
-            text = r.profile_text or ""
-            vec = model.encode([text], convert_to_numpy=True, normalize_embeddings=True)[0]
-            md: Dict = {
-                "goals": as_list(r.sustainability_goals),
-                "location": {"lat": r.location_lat or 0.0, "lng": r.location_lng or 0.0},
-                "remaining_capacity": float(r.capacity or 0.0),
-                "accepted_materials": as_list(r.accepted_materials),
-                "type": "recycler",
-            }
-            store.add_embedding(item_id=r.id, vector=vec, metadata=md)
+        if recyclers:
+            texts = [r.profile_text or "" for r in recyclers]
+            vecs = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+            mds: List[Dict] = [
+                {
+                    "goals": split_terms(r.sustainability_goals),
+                    "location": {"lat": r.location_lat or 0.0, "lng": r.location_lng or 0.0},
+                    "remaining_capacity": float(r.capacity or 0.0),
+                    "accepted_materials": split_terms(r.accepted_materials),
+                    "type": "recycler",
+                }
+                for r in recyclers
+            ]
+            store.recyclers.add_embeddings([r.id for r in recyclers], vecs, mds)
 
         listings: List[DBListing] = db.query(DBListing).all()
-        for l in listings:
+        if listings:
             # Build listing text for embedding
-            text_parts = [l.description or "", l.material_type or ""]
-            text = ". ".join([p for p in text_parts if p])
-            vec = model.encode([text], convert_to_numpy=True, normalize_embeddings=True)[0]
-            md = {
-                "location": {"lat": l.location_lat or 0.0, "lng": l.location_lng or 0.0},
-                "quantity": float(l.quantity or 0.0),
-                "tags": as_list(l.tags),
-                "type": "listing",
-            }
-            store.add_embedding(item_id=f"L:{l.id}", vector=vec, metadata=md)
-
+            texts = [". ".join([p for p in [l.description or "", l.material_type or ""] if p]) for l in listings]
+            vecs = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+            mds = [
+                {
+                    "location": {"lat": l.location_lat or 0.0, "lng": l.location_lng or 0.0},
+                    "quantity": float(l.quantity or 0.0),
+                    "tags": split_terms(l.tags),
+                    "type": "listing",
+                }
+                for l in listings
+            ]
+            # Listings get their own namespace, so they never compete with recyclers for top_k slots
+            store.listings.add_embeddings([l.id for l in listings], vecs, mds)
+
+        # add_embeddings upserts by id; drop whatever no longer exists in the database
+        live_ids = {
+            RECYCLERS: {r.id for r in recyclers},
+            LISTINGS: {l.id for l in listings},
+        }
+        for namespace, keep in live_ids.items():
+            ns_store = store.namespace(namespace)
+            for stale in set(ns_store.item_ids()) - keep:
+                ns_store.delete(stale)
+            ns_store.compact()
+
+        # One snapshot write for the whole run instead of one per item
+        store.flush()
         print(f"Embeddings generated and stored in {index_path}")
+
+        if os.getenv("VECTOR_STORE_MMAP", "0") == "1":
+            # API workers serving read-only pick this up when the pointer file flips
+            generation = publish_generation(store, index_path)
+            print(f"Published serving generation {generation}")
     finally:
         db.close()
 
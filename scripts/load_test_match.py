@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import argparse
+import collections
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def listing_ids_from_db(limit: int) -> List[str]:
+    from backend.db import SessionLocal
+    from backend.models import WasteListing
+
+    db = SessionLocal()
+    try:
+        return [row.id for row in db.query(WasteListing.id).limit(limit).all()]
+    finally:
+        db.close()
+
+
+def run(url: str, listing_ids: List[str], users: int, seconds: float, timeout: float, radius) -> Dict:
+    """``users`` clients each sending their next request as soon as the previous one returns."""
+    stop = threading.Event()
+    latencies: List[List[float]] = [[] for _ in range(users)]
+    statuses: "collections.Counter[str]" = collections.Counter()
+    lock = threading.Lock()
+    params = {"max_radius_km": radius} if radius is not None else None
+
+    def user(slot: int) -> None:
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        i = slot
+        while not stop.is_set():
+            listing_id = listing_ids[i % len(listing_ids)]
+            i += users
+            start = time.perf_counter()
+            try:
+                status = str(session.get(f"{url}/api/match/{listing_id}", params=params, timeout=timeout).status_code)
+            except requests.RequestException as exc:
+                status = type(exc).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[status] += 1
+            if status == "200":
+                latencies[slot].append(elapsed)
+
+    threads = [threading.Thread(target=user, args=(slot,), daemon=True) for slot in range(users)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join(timeout + 1.0)
+    ok = np.array([x for per_user in latencies for x in per_user]) * 1e3
+    return {
+        "users": users,
+        "rps": len(ok) / seconds,
+        "p50_ms": float(np.percentile(ok, 50)) if len(ok) else float("nan"),
+        "p99_ms": float(np.percentile(ok, 99)) if len(ok) else float("nan"),
+        "statuses": dict(statuses),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Closed-loop load test of GET /api/match/{listing_id}: sustained RPS and latency per concurrency"
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--listing-ids", default="", help="comma-separated ids (default: the first --limit in the DB)")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 8, 32, 64, 128])
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--max-radius-km", type=float, default=None)
+    args = parser.parse_args()
+
+    listing_ids = [i for i in args.listing_ids.split(",") if i] or listing_ids_from_db(args.limit)
+    if not listing_ids:
+        raise SystemExit("No listing ids to request")
+    # Repeated ids hit the match cache; run the server with MATCH_CACHE_SIZE=0 to measure the full path
+    print(f"{args.url}, {len(listing_ids)} listings, {args.seconds:.0f}s per level")
+    print(f"{'users':>6} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9}  statuses")
+    for users in args.users:
+        r = run(args.url, listing_ids, users, args.seconds, args.timeout, args.max_radius_km)
+        print(f"{r['users']:>6} {r['rps']:>9.1f} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f}  {r['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Break API startup down into import time and warmup time")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    import backend.main  # noqa: F401  (what uvicorn does before it can accept connections)
+
+    import_s = time.perf_counter() - start
+    heavy = [m for m in ("torch", "sentence_transformers") if m in sys.modules]
+    print(f"import backend.main: {import_s:.3f} s (heavy modules already imported: {', '.join(heavy) or 'none'})")
+
+    from backend.warmup import Warmup
+
+    warmup = Warmup()
+    warmup.start()
+    if not warmup.wait(args.timeout):
+        print(f"warmup not finished after {args.timeout} s: {warmup.error or 'still running'}")
+        sys.exit(1)
+    for name, seconds in warmup.timings.items():
+        print(f"{name:<16} {seconds:.3f} s")
+    warmup.stop()
+
+
+if __name__ == "__main__":
+    main()